@@ -31,6 +31,60 @@ DB_CONFIG = {
 # 打印数据库配置信息（不包含密码）
 logger.info(f"数据库配置: {DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']} (用户: {DB_CONFIG['user']})")
 
+# 从环境变量读取读副本列表
+def get_replica_configs():
+    """
+    从环境变量获取读副本连接配置列表
+    
+    DB_REPLICAS 格式为 host:port，多个副本用逗号分隔；副本的库名、用户名、密码默认与主库相同，
+    可通过 DB_REPLICA_USER / DB_REPLICA_PASSWORD 单独指定
+    """
+    replicas = []
+    for item in os.getenv('DB_REPLICAS', '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(':')
+        replica = dict(DB_CONFIG)
+        replica['host'] = host
+        replica['port'] = int(port) if port else DB_CONFIG['port']
+        replica['user'] = os.getenv('DB_REPLICA_USER', DB_CONFIG['user'])
+        replica['password'] = os.getenv('DB_REPLICA_PASSWORD', DB_CONFIG['password'])
+        replicas.append(replica)
+    return replicas
+
+# 读副本配置（只读查询轮询分配到这些副本，写操作始终走主库）
+DB_REPLICA_CONFIGS = get_replica_configs()
+
+# 读写分离配置
+DB_ROUTING_CONFIG = {
+    'replica_retry_interval': int(os.getenv('DB_REPLICA_RETRY_INTERVAL', 30))    # 不可用的副本多少秒后再重试
+}
+
+if DB_REPLICA_CONFIGS:
+    replica_hosts = [f"{replica['host']}:{replica['port']}" for replica in DB_REPLICA_CONFIGS]
+    logger.info(f"读副本配置: {', '.join(replica_hosts)}")
+
+# 从环境变量读取连接建立后执行的会话初始化语句（分号分隔）
+def get_session_init_statements():
+    """从环境变量获取会话初始化语句列表"""
+    statements = os.getenv('DB_SESSION_INIT', '')
+    return [statement.strip() for statement in statements.split(';') if statement.strip()]
+
+# 数据库连接池配置
+DB_POOL_CONFIG = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),                        # 常驻连接数
+    'max_overflow': int(os.getenv('DB_POOL_MAX_OVERFLOW', 10)),             # 高峰期允许临时创建的额外连接数
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 5)),                      # 等待可用连接的最长时间（秒）
+    'max_waiters': int(os.getenv('DB_POOL_MAX_WAITERS', 50)),               # 等待队列长度上限，超过直接拒绝
+    'pre_ping_idle': float(os.getenv('DB_POOL_PRE_PING_IDLE', 30)),         # 空闲超过该时间（秒）的连接取用前先ping
+    'recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),                     # 连接最大存活时间（秒），应小于MySQL的wait_timeout
+    'session_init': get_session_init_statements(),                          # 每个连接建立时执行一次的会话设置
+    'warm_size': int(os.getenv('DB_POOL_WARM_SIZE', 2))                     # 每个worker启动后预先建立的连接数
+}
+
+logger.info(f"连接池配置: 常驻={DB_POOL_CONFIG['pool_size']}, 溢出={DB_POOL_CONFIG['max_overflow']}, 等待超时={DB_POOL_CONFIG['timeout']}秒, 最大存活={DB_POOL_CONFIG['recycle']}秒")
+
 # API配置
 API_CONFIG = {
     'server_host': os.getenv('SERVER_HOST', '0.0.0.0'),
@@ -42,7 +96,7 @@ logger.info(f"API服务器配置: {API_CONFIG['server_host']}:{API_CONFIG['serve
 # 从环境变量读取排除路径列表
 def get_exclude_paths():
     """从环境变量获取排除路径列表"""
-    paths = os.getenv('TOKEN_EXCLUDE_PATHS', '/api/health,/api/docs,/api/swagger.json,/api/auth/validate')
+    paths = os.getenv('TOKEN_EXCLUDE_PATHS', '/api/health,/api/docs,/api/swagger.json,/api/auth/validate,/api/metrics')
     return paths.split(',')
 
 # API令牌配置
@@ -57,6 +111,105 @@ TOKEN_CONFIG = {
 
 logger.info(f"令牌配置: 启用状态={TOKEN_CONFIG['enabled']}, 默认令牌={TOKEN_CONFIG['default_token'][:4]}***, 有效期={TOKEN_CONFIG['token_lifetime']/86400}天")
 
+# Gunicorn配置（gunicorn.conf.py 读取）
+GUNICORN_CONFIG = {
+    'workers': int(os.getenv('GUNICORN_WORKERS', 4)),
+    # 线程worker的心跳由主线程发送，导出等长时间的请求不会因超过 timeout 被重启，也只占用一个线程
+    'worker_class': os.getenv('GUNICORN_WORKER_CLASS', 'gthread'),
+    'threads': int(os.getenv('GUNICORN_THREADS', 4)),                      # 每个worker的线程数，不应超过 DB_POOL_SIZE
+    'timeout': int(os.getenv('GUNICORN_TIMEOUT', 120)),
+    'max_requests': int(os.getenv('GUNICORN_MAX_REQUESTS', 0)),             # worker处理多少请求后自动重启，0表示不重启
+    'max_requests_jitter': int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+}
+
+# 运行指标配置
+METRICS_CONFIG = {
+    # gunicorn多worker时各进程写入指标文件的目录，启动时会被清空
+    'multiproc_dir': os.getenv('PROMETHEUS_MULTIPROC_DIR', '/tmp/mdtj_metrics')
+}
+
+# 分页配置
+PAGINATION_CONFIG = {
+    'count_cache_ttl': int(os.getenv('PAGINATION_COUNT_CACHE_TTL', 10)),        # 列表总数缓存时间（秒），0表示不缓存
+    'count_cache_size': int(os.getenv('PAGINATION_COUNT_CACHE_SIZE', 1024))     # 最多缓存多少个查询条件的总数
+}
+
+# 用户查询缓存配置（身份验证和验证状态接口按身份证号查询用户）
+USER_CACHE_CONFIG = {
+    'enabled': os.getenv('USER_CACHE_ENABLED', 'True').lower() in ('true', '1', 't'),
+    'ttl': int(os.getenv('USER_CACHE_TTL', 60)),              # 缓存时间（秒）
+    'max_size': int(os.getenv('USER_CACHE_SIZE', 10000)),     # 最多缓存的用户数
+    'negative_ttl': int(os.getenv('USER_CACHE_NEGATIVE_TTL', 30)),  # 不存在的身份证号的缓存时间（秒），0表示不缓存
+    # 已知身份证号的布隆过滤器，判断一定不存在的身份证号不查询数据库
+    'bloom_enabled': os.getenv('USER_BLOOM_ENABLED', 'True').lower() in ('true', '1', 't'),
+    'bloom_error_rate': float(os.getenv('USER_BLOOM_ERROR_RATE', 0.001)),       # 目标误判率
+    'bloom_rebuild_interval': int(os.getenv('USER_BLOOM_REBUILD_INTERVAL', 300)),  # 重建间隔（秒）
+    # 增量加入其他进程/服务器/外部系统新增用户的间隔（秒）；同步失败或滞后时不再根据过滤器判断不存在
+    'bloom_sync_interval': float(os.getenv('USER_BLOOM_SYNC_INTERVAL', 2))
+}
+
+# 跨进程共享缓存配置（同一台服务器的所有worker共用，缓存受理单摘要和按案件编号查询的受理单）
+SHARED_CACHE_CONFIG = {
+    'enabled': os.getenv('SHARED_CACHE_ENABLED', 'True').lower() in ('true', '1', 't'),
+    'path': os.getenv('SHARED_CACHE_PATH', '/dev/shm/mdtj_cache/cache.sqlite3' if os.path.isdir('/dev/shm')
+                      else '/tmp/mdtj_cache/cache.sqlite3'),
+    'ttl': int(os.getenv('SHARED_CACHE_TTL', 60)),                  # 缓存时间（秒）
+    'max_entries': int(os.getenv('SHARED_CACHE_MAX_ENTRIES', 50000))  # 最多缓存的条目数
+}
+
+# 多节点缓存配置（多台API服务器共用的Redis，缓存受理单摘要和受理单，并广播失效消息）
+REDIS_CACHE_CONFIG = {
+    'url': os.getenv('REDIS_CACHE_URL', ''),        # 如 redis://10.0.0.5:6379/0，为空时只使用本机共享缓存
+    'channel': os.getenv('REDIS_CACHE_CHANNEL', 'mdtj:cache:invalidate'),  # 失效消息的发布订阅频道
+    'key_prefix': os.getenv('REDIS_CACHE_KEY_PREFIX', 'mdtj:'),            # 缓存键前缀
+    'socket_timeout': float(os.getenv('REDIS_CACHE_SOCKET_TIMEOUT', 0.2)),  # 连接和读写超时（秒）
+    'retry_interval': int(os.getenv('REDIS_CACHE_RETRY_INTERVAL', 30))      # 访问失败后只使用本机缓存的时间（秒）
+}
+
+# 请求合并配置（同一worker内对同一身份证号的并发摘要/搜索查询只执行一次）
+SINGLEFLIGHT_CONFIG = {
+    # 只在线程worker（GUNICORN_WORKER_CLASS=gthread 且 GUNICORN_THREADS 大于1）中起作用
+    'enabled': os.getenv('SINGLEFLIGHT_ENABLED', 'True').lower() in ('true', '1', 't'),
+    'timeout': float(os.getenv('SINGLEFLIGHT_TIMEOUT', 5.0))   # 等待其他调用结果的最长时间（秒），超时后单独执行
+}
+
+# 批量写入配置
+BATCH_CONFIG = {
+    'max_records': int(os.getenv('BATCH_MAX_RECORDS', 5000)),   # 单次批量请求最多包含的记录数
+    'chunk_size': int(os.getenv('BATCH_CHUNK_SIZE', 500))       # 每个事务写入的记录数
+}
+
+# 导出配置（GET /api/appeals/export 流式导出）
+EXPORT_CONFIG = {
+    'chunk_size': int(os.getenv('EXPORT_CHUNK_SIZE', 500)),                     # 每次从数据库读取并输出的行数
+    'max_rows_per_second': int(os.getenv('EXPORT_MAX_ROWS_PER_SECOND', 2000))   # 单个导出的速率上限，0表示不限速
+}
+
+# 分区与归档配置（appeal_records 按创建时间月份分区，已结案的旧受理单移入 appeal_records_archive）
+ARCHIVE_CONFIG = {
+    'partition_months_ahead': int(os.getenv('ARCHIVE_PARTITION_MONTHS_AHEAD', 3)),    # 提前创建的月份分区数
+    'retention_days': int(os.getenv('ARCHIVE_RETENTION_DAYS', 730)),                 # 创建超过多少天的受理单可以归档
+    'statuses': [status.strip() for status in os.getenv('ARCHIVE_STATUSES', '已结案').split(',') if status.strip()],
+    'batch_size': int(os.getenv('ARCHIVE_BATCH_SIZE', 500))                          # 每个事务归档的记录数
+}
+
+# 幂等键配置（POST /api/appeals 和 /api/appeals/batch 的 Idempotency-Key 请求头）
+IDEMPOTENCY_CONFIG = {
+    'header': os.getenv('IDEMPOTENCY_HEADER', 'Idempotency-Key'),
+    'ttl': int(os.getenv('IDEMPOTENCY_TTL', 86400)),          # 保存的响应在多少秒内可以重放
+    'max_key_length': 128
+}
+
+# 异步写入配置（身份验证结果和验证日志）
+WRITE_BEHIND_CONFIG = {
+    'enabled': os.getenv('WRITE_BEHIND_ENABLED', 'True').lower() in ('true', '1', 't'),
+    'max_size': int(os.getenv('WRITE_BEHIND_MAX_SIZE', 10000)),           # 队列容量
+    'batch_size': int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 200)),         # 每批最多写入条数
+    'flush_interval': float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 0.5)),  # 凑批最长等待时间(秒)
+    'overflow': os.getenv('WRITE_BEHIND_OVERFLOW', 'sync'),               # 队列满时的策略: block/drop/sync
+    'block_timeout': float(os.getenv('WRITE_BEHIND_BLOCK_TIMEOUT', 1.0))  # block策略的最长等待时间(秒)
+}
+
 # 日志配置
 LOG_CONFIG = {
     'level': os.getenv('LOG_LEVEL', 'INFO'),
@@ -2,55 +2,427 @@
 数据库连接池管理模块 - 提供数据库连接池功能
 """
 import mysql.connector
-from mysql.connector import pooling
+import collections
+import itertools
+import os
 import threading
 import logging
 import time
 from contextlib import contextmanager
-from app.config import DB_CONFIG
+from flask import g, has_request_context, jsonify
+from app.config import DB_CONFIG, DB_POOL_CONFIG, DB_REPLICA_CONFIGS, DB_ROUTING_CONFIG
+from app.utils import metrics
 
 # 配置日志
 logger = logging.getLogger("db_pool")
 
 # 全局连接池对象
 _pool = None
+_replica_router = None
 _pool_lock = threading.Lock()
 _initialized = False
+_pool_pid = None
 
-# 连接池配置
-POOL_NAME = "mdtj_mysql_pool"
-POOL_SIZE = 10
-POOL_RESET_SESSION = True
-MAX_RETRIES = 3
-RETRY_DELAY = 1  # 秒
+class PoolTimeoutError(Exception):
+    """在checkout超时时间内没有等到可用连接"""
+
+class PoolExhaustedError(Exception):
+    """连接池已满且等待队列也已满，直接拒绝"""
+
+class PooledConnection:
+    """
+    连接池中的连接 - 透传原始连接的属性和方法，close()时归还连接池而不是真正断开
+    """
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._created_at = time.monotonic()
+        self._last_used = self._created_at
+    
+    def close(self):
+        """归还连接池"""
+        self._pool.put(self)
+    
+    def invalidate(self):
+        """断开连接并从连接池移除（连接已不可用时调用）"""
+        self._pool.put(self, discard=True)
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+class ConnectionPool:
+    """
+    数据库连接池
+    
+    - 常驻 pool_size 个连接，高峰期最多再临时创建 max_overflow 个，归还时多余的连接直接关闭
+    - 连接用尽时进入有界等待队列，超过 timeout 秒仍拿不到连接则抛出 PoolTimeoutError
+    - 空闲超过 pre_ping_idle 秒的连接在交出前先 ping 一次，已被服务端断开的连接自动重建
+    - 存活超过 recycle 秒的连接在下次取用时重建，避免撞上 MySQL 的 wait_timeout
+    - session_init 中的语句只在连接建立时执行一次，取用/归还时不再重置会话
+    """
+    def __init__(self, creator, pool_size=10, max_overflow=10, timeout=5, max_waiters=50,
+                 pre_ping_idle=30, recycle=1800, session_init=None, warm_size=0, name='primary'):
+        self._creator = creator
+        self.name = name
+        self.pool_size = pool_size
+        self.warm_size = min(warm_size, pool_size)
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.max_waiters = max_waiters
+        self.pre_ping_idle = pre_ping_idle
+        self.recycle = recycle
+        self.session_init = list(session_init or [])
+        
+        self._idle = collections.deque()
+        self._size = 0
+        self._waiters = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+    
+    def get(self):
+        """
+        取出一个可用连接
+        
+        Returns:
+            PooledConnection: 连接对象
+            
+        Raises:
+            PoolExhaustedError: 等待队列已满
+            PoolTimeoutError: 等待超时
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise Exception("数据库连接池已关闭")
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._size < self.pool_size + self.max_overflow:
+                    self._size += 1
+                    pooled = None
+                    break
+                if self._waiters >= self.max_waiters:
+                    metrics.record_pool_exhausted(self.name, 'queue_full')
+                    raise PoolExhaustedError(f"数据库连接池已耗尽，等待队列已满（{self.max_waiters}）")
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.record_pool_exhausted(self.name, 'timeout')
+                    raise PoolTimeoutError(f"等待数据库连接超时（{self.timeout}秒）")
+                
+                self._waiters += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiters -= 1
+        
+        if pooled is None:
+            pooled = self._connect_or_release_slot()
+        else:
+            pooled = self._validate(pooled)
+        
+        metrics.observe_checkout_wait(self.name, time.monotonic() - started)
+        self._report_usage()
+        return pooled
+    
+    def put(self, pooled, discard=False):
+        """
+        归还连接；未结束的事务会被回滚，超出常驻数量或已失效的连接直接关闭
+        
+        Args:
+            pooled: 连接对象
+            discard: 是否直接丢弃该连接
+        """
+        if not discard and getattr(pooled._conn, 'in_transaction', True):
+            try:
+                pooled._conn.rollback()
+            except Exception as e:
+                logger.warning(f"归还连接时回滚失败，丢弃该连接: {e}")
+                discard = True
+        
+        with self._cond:
+            if discard or self._closed or len(self._idle) >= self.pool_size:
+                self._size -= 1
+                keep = False
+            else:
+                pooled._last_used = time.monotonic()
+                self._idle.append(pooled)
+                keep = True
+            self._cond.notify()
+        
+        if not keep:
+            self._close_raw(pooled._conn)
+        self._report_usage()
+    
+    def warm_up(self, count=None):
+        """
+        预先建立若干连接放入空闲队列，避免首批请求承担建连延迟
+        
+        Args:
+            count: 预建连接数，默认使用 warm_size
+            
+        Returns:
+            int: 实际建立的连接数
+        """
+        count = self.warm_size if count is None else min(count, self.pool_size)
+        opened = []
+        try:
+            while len(opened) < count:
+                with self._cond:
+                    if self._size >= self.pool_size:
+                        break
+                    self._size += 1
+                opened.append(self._connect_or_release_slot())
+        except Exception as e:
+            logger.warning(f"预建数据库连接失败，已建立 {len(opened)} 个: {e}")
+        finally:
+            for pooled in opened:
+                self.put(pooled)
+        return len(opened)
+    
+    def status(self):
+        """
+        获取连接池状态
+        
+        Returns:
+            dict: 连接总数、空闲数、使用中数量和等待数
+        """
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'waiters': self._waiters
+            }
+    
+    def close(self):
+        """关闭连接池中的所有空闲连接，使用中的连接归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        
+        for pooled in idle:
+            self._close_raw(pooled._conn)
+    
+    def _connect_or_release_slot(self):
+        """新建连接；失败时释放占用的名额并唤醒等待者"""
+        try:
+            return PooledConnection(self, self._connect())
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+    
+    def _connect(self):
+        """建立新的数据库连接并执行一次性会话初始化"""
+        conn = self._creator()
+        if self.session_init:
+            cursor = conn.cursor()
+            try:
+                for statement in self.session_init:
+                    cursor.execute(statement)
+            finally:
+                cursor.close()
+        return conn
+    
+    def _validate(self, pooled):
+        """检查连接的寿命和存活状态，必要时重建"""
+        now = time.monotonic()
+        
+        if self.recycle and now - pooled._created_at > self.recycle:
+            logger.info("连接已超过最大存活时间，重建连接")
+            return self._replace(pooled, 'recycle')
+        
+        if self.pre_ping_idle is not None and now - pooled._last_used > self.pre_ping_idle:
+            try:
+                pooled._conn.ping(reconnect=False)
+            except Exception as e:
+                logger.warning(f"空闲连接已失效，重建连接: {e}")
+                return self._replace(pooled, 'ping_failed')
+        
+        return pooled
+    
+    def _replace(self, pooled, reason):
+        """关闭旧连接并在同一名额上建立新连接"""
+        metrics.record_reconnect(self.name, reason)
+        self._close_raw(pooled._conn)
+        return self._connect_or_release_slot()
+    
+    def _report_usage(self):
+        """把当前连接数同步到运行指标"""
+        status = self.status()
+        metrics.set_pool_connections(self.name, status['in_use'], status['idle'])
+    
+    @staticmethod
+    def _close_raw(conn):
+        try:
+            conn.close()
+        except Exception as e:
+            logger.warning(f"关闭数据库连接失败: {e}")
+
+class ReplicaRouter:
+    """
+    读副本路由 - 以轮询方式在健康的副本之间分配只读连接
+
+    取连接失败（连接不上、认证失败等）的副本会被标记为不健康，冷却 retry_interval 秒后再重新尝试；
+    副本只是繁忙（等待超时）时不标记。所有副本都不可用时返回None，由调用方回退到主库。
+    """
+    def __init__(self, pools, retry_interval=30):
+        self._pools = list(pools)
+        self._unhealthy_until = [0.0] * len(self._pools)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.retry_interval = retry_interval
+    
+    def checkout(self):
+        """
+        从下一个健康的副本取出连接
+        
+        Returns:
+            PooledConnection: 副本连接，没有可用副本时返回None
+        """
+        count = len(self._pools)
+        if not count:
+            return None
+        
+        start = next(self._counter)
+        for offset in range(count):
+            index = (start + offset) % count
+            if time.monotonic() < self._unhealthy_until[index]:
+                continue
+            
+            pool = self._pools[index]
+            try:
+                return pool.get()
+            except (PoolTimeoutError, PoolExhaustedError) as e:
+                logger.warning(f"读副本 {pool.name} 繁忙: {e}")
+            except Exception as e:
+                logger.error(f"读副本 {pool.name} 不可用，{self.retry_interval}秒内不再使用: {e}")
+                with self._lock:
+                    self._unhealthy_until[index] = time.monotonic() + self.retry_interval
+        
+        return None
+    
+    def warm_up(self):
+        """预热所有副本的连接池"""
+        return sum(pool.warm_up() for pool in self._pools)
+    
+    def status(self):
+        """
+        获取各副本的状态
+        
+        Returns:
+            list: 每个副本的连接池状态及健康标记
+        """
+        now = time.monotonic()
+        return [
+            dict(pool.status(), name=pool.name, healthy=now >= self._unhealthy_until[index])
+            for index, pool in enumerate(self._pools)
+        ]
+    
+    def close(self):
+        """关闭所有副本的连接池"""
+        for pool in self._pools:
+            pool.close()
+
+class TrackedCursor:
+    """
+    游标包装类 - 统计当前请求执行的SQL次数和数据库往返次数，并按查询名称记录执行时间，
+    其余属性透传给原始游标
+    """
+    def __init__(self, cursor, name=None):
+        self._cursor = cursor
+        self._name = name
+    
+    def execute(self, operation, params=None, multi=False):
+        _record_queries(1)
+        _record_round_trips(1)
+        # 只传入调用方给出的参数：multi 是 mysql-connector 特有的参数，其他DB-API驱动的游标不接受
+        args = (operation,) if params is None else (operation, params)
+        kwargs = {'multi': True} if multi else {}
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(*args, **kwargs)
+        finally:
+            metrics.observe_query(self._name, time.perf_counter() - started)
+    
+    def executemany(self, operation, seq_params):
+        seq_params = list(seq_params)
+        _record_queries(len(seq_params))
+        # mysql-connector 会把 INSERT ... VALUES 合并为一条多行语句发送，其余语句逐条执行
+        if operation.lstrip().upper().startswith('INSERT'):
+            _record_round_trips(1)
+        else:
+            _record_round_trips(len(seq_params))
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params)
+        finally:
+            metrics.observe_query(self._name, time.perf_counter() - started)
+    
+    def __iter__(self):
+        return iter(self._cursor)
+    
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
 
 def init_pool():
     """
-    初始化数据库连接池
+    初始化数据库连接池（连接在首次使用时才建立）
     
     Returns:
         bool: 初始化是否成功
     """
-    global _pool, _initialized
+    global _pool, _replica_router, _initialized, _pool_pid
     
-    if _initialized:
+    if _initialized and _pool_pid == os.getpid():
         return True
     
     with _pool_lock:
-        if _initialized:
+        if _initialized and _pool_pid == os.getpid():
             return True
         
+        if _initialized:
+            # 连接池是在fork之前创建的，子进程不能复用父进程的socket
+            _discard_inherited_pool()
+        
         try:
             logger.info(f"正在初始化数据库连接池，连接到 {DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}")
-            # 创建连接池
-            _pool = mysql.connector.pooling.MySQLConnectionPool(
-                pool_name=POOL_NAME,
-                pool_size=POOL_SIZE,
-                pool_reset_session=POOL_RESET_SESSION,
-                **DB_CONFIG
+            _pool = ConnectionPool(
+                creator=lambda: mysql.connector.connect(**DB_CONFIG),
+                **DB_POOL_CONFIG
+            )
+            _replica_router = ReplicaRouter(
+                [
+                    ConnectionPool(
+                        creator=lambda config=config: mysql.connector.connect(**config),
+                        name=f"replica-{index}",
+                        **DB_POOL_CONFIG
+                    )
+                    for index, config in enumerate(DB_REPLICA_CONFIGS)
+                ],
+                retry_interval=DB_ROUTING_CONFIG['replica_retry_interval']
             )
             _initialized = True
-            logger.info(f"数据库连接池初始化成功，连接池大小：{POOL_SIZE}")
+            _pool_pid = os.getpid()
+            logger.info(
+                f"数据库连接池初始化成功，常驻连接：{_pool.pool_size}，"
+                f"最大溢出：{_pool.max_overflow}，等待超时：{_pool.timeout}秒，"
+                f"读副本：{len(DB_REPLICA_CONFIGS)}个"
+            )
             return True
         except Exception as e:
             logger.error(f"数据库连接池初始化失败: {e}")
@@ -61,22 +433,65 @@ def get_pool():
     获取数据库连接池
     
     Returns:
-        MySQLConnectionPool: MySQL连接池对象
+        ConnectionPool: 连接池对象
     """
-    global _pool
-    
-    if not _initialized:
+    if not _initialized or _pool_pid != os.getpid():
         init_pool()
     
     return _pool
 
+def _checkout_connection(readonly=False):
+    """
+    从连接池中取出一个连接
+    
+    Args:
+        readonly: 是否为只读连接；配置了读副本时优先从副本取，副本都不可用时回退到主库
+        
+    Returns:
+        PooledConnection: 数据库连接对象
+        
+    Raises:
+        Exception: 无法获取数据库连接时抛出异常
+    """
+    if not _initialized or _pool_pid != os.getpid():
+        init_pool()
+    
+    if readonly:
+        conn = _replica_router.checkout()
+        if conn is not None:
+            return conn
+    
+    try:
+        return _pool.get()
+    except Exception as e:
+        logger.error(f"无法获取数据库连接: {e}")
+        raise
+
+def _release_connection(conn):
+    """
+    将连接归还连接池
+    
+    Args:
+        conn: 数据库连接对象
+    """
+    try:
+        conn.close()
+    except Exception as close_error:
+        logger.warning(f"关闭数据库连接失败: {close_error}")
+
 @contextmanager
-def get_connection(auto_commit=False):
+def get_connection(auto_commit=False, readonly=False):
     """
     从连接池获取数据库连接的上下文管理器
     
+    在启用了请求级工作单元的请求中，同一请求内的所有调用共享一个连接，
+    事务由请求结束时统一提交或回滚（见 init_app）。
+    只读操作在配置了读副本时走副本；同一请求中一旦用过主库连接，后续的只读操作也走主库，
+    保证能读到本请求刚写入的数据。
+    
     Args:
         auto_commit: 是否自动提交事务
+        readonly: 是否为只读操作
         
     Yields:
         connection: 数据库连接对象
@@ -84,45 +499,43 @@ def get_connection(auto_commit=False):
     Raises:
         Exception: 无法获取数据库连接时抛出异常
     """
-    if not _initialized:
-        init_pool()
-    
-    conn = None
-    retries = 0
-    
-    while retries < MAX_RETRIES:
+    if not auto_commit and _in_request_scope():
+        conn = _get_request_connection(readonly)
         try:
-            conn = _pool.get_connection()
-            break
-        except Exception as e:
-            retries += 1
-            if retries >= MAX_RETRIES:
-                logger.error(f"无法获取数据库连接，已重试 {retries} 次: {e}")
-                raise Exception(f"无法获取数据库连接: {e}")
-            
-            logger.warning(f"获取数据库连接失败，准备重试（{retries}/{MAX_RETRIES}）: {e}")
-            time.sleep(RETRY_DELAY)
+            yield conn
+        except Exception:
+            # 请求内任意一步失败，整个工作单元在请求结束时回滚
+            g.db_rollback_only = True
+            raise
+        return
+    
+    conn = _checkout_connection(readonly)
     
     try:
-        conn.autocommit = auto_commit
+        if auto_commit:
+            conn.autocommit = True
+            _record_round_trips(1)
         yield conn
     except Exception as e:
         if not auto_commit and conn:
             try:
                 conn.rollback()
+                _record_round_trips(1)
                 logger.info("数据库事务已回滚")
             except Exception as rollback_error:
                 logger.error(f"数据库事务回滚失败: {rollback_error}")
         raise
     finally:
-        if conn:
+        if auto_commit:
             try:
-                conn.close()
-            except Exception as close_error:
-                logger.warning(f"关闭数据库连接失败: {close_error}")
+                conn.autocommit = False
+            except Exception as reset_error:
+                logger.warning(f"恢复连接事务模式失败: {reset_error}")
+        _release_connection(conn)
 
 @contextmanager
-def get_cursor(cursor_type=None, auto_commit=False, named_tuple=False, dictionary=True, buffered=True):
+def get_cursor(cursor_type=None, auto_commit=False, named_tuple=False, dictionary=True, buffered=True, commit=False,
+               name=None, readonly=False):
     """
     从连接池获取数据库游标的上下文管理器
     
@@ -132,11 +545,14 @@ def get_cursor(cursor_type=None, auto_commit=False, named_tuple=False, dictionar
         named_tuple: 是否返回命名元组结果
         dictionary: 是否返回字典结果
         buffered: 是否使用缓冲游标
+        commit: 代码块正常结束后是否提交事务（写操作使用）
+        name: 查询名称，用于按查询统计执行时间（如 get_appeal_records_by_id_card）
+        readonly: 是否为只读查询（可路由到读副本）
         
     Yields:
         cursor: 数据库游标对象
     """
-    with get_connection(auto_commit) as conn:
+    with get_connection(auto_commit, readonly=readonly) as conn:
         cursor = None
         try:
             cursor_params = {
@@ -149,7 +565,10 @@ def get_cursor(cursor_type=None, auto_commit=False, named_tuple=False, dictionar
                 cursor_params["cursor_class"] = cursor_type
             
             cursor = conn.cursor(**cursor_params)
-            yield cursor
+            yield TrackedCursor(cursor, name)
+            
+            if commit and not auto_commit:
+                commit_connection(conn)
         finally:
             if cursor:
                 try:
@@ -157,19 +576,145 @@ def get_cursor(cursor_type=None, auto_commit=False, named_tuple=False, dictionar
                 except Exception as e:
                     logger.warning(f"关闭数据库游标失败: {e}")
 
+@contextmanager
+def transaction(name=None, dictionary=True, buffered=True, separate=False):
+    """
+    立即提交的事务块：代码块正常结束后马上提交，异常时回滚并重新抛出异常
+    
+    用于分批写入等需要部分成功的场景。在请求级工作单元中使用请求共享的主库连接，
+    提交时会连同本请求此前未提交的写操作一起提交；回滚不会把整个请求标记为失败。
+    separate 为True时即使在请求中也从连接池另取一个主库连接，只提交代码块中的写操作，
+    本请求未提交的写操作不受影响（请求结束时仍可能回滚）。
+    
+    Args:
+        name: 查询名称，用于按查询统计执行时间
+        dictionary: 是否返回字典结果
+        buffered: 是否使用缓冲游标
+        separate: 是否使用单独的连接
+        
+    Yields:
+        cursor: 数据库游标对象
+    """
+    scoped = _in_request_scope() and not separate
+    conn = _get_request_connection() if scoped else _checkout_connection()
+    cursor = None
+    
+    try:
+        cursor = conn.cursor(dictionary=dictionary, buffered=buffered)
+        yield TrackedCursor(cursor, name)
+        
+        conn.commit()
+        _record_round_trips(1)
+        if scoped:
+            g.db_stats['commits'] += 1
+            # 本请求此前未提交的写操作已一并提交
+            _run_after_commit(g.pop('db_after_commit', []))
+    except Exception:
+        try:
+            conn.rollback()
+            _record_round_trips(1)
+        except Exception as rollback_error:
+            logger.error(f"数据库事务回滚失败: {rollback_error}")
+        raise
+    finally:
+        if scoped:
+            g.db_dirty = False
+        if cursor:
+            try:
+                cursor.close()
+            except Exception as e:
+                logger.warning(f"关闭数据库游标失败: {e}")
+        if not scoped:
+            _release_connection(conn)
+
+@contextmanager
+def stream_cursor(name=None, readonly=True):
+    """
+    流式读取大量数据的游标（不缓冲结果，逐批从服务端读取）
+    
+    使用单独取出的连接而不是请求共享的连接：流式响应在请求处理函数返回后才开始生成，
+    此时请求的工作单元已经结束。结果没有读完就退出时（如客户端断开）连接中还有未读数据，
+    直接断开该连接而不是归还连接池。
+    
+    Args:
+        name: 查询名称，用于按查询统计执行时间
+        readonly: 是否为只读查询（可路由到读副本）
+        
+    Yields:
+        cursor: 不缓冲的字典游标
+    """
+    conn = _checkout_connection(readonly)
+    cursor = None
+    finished = False
+    
+    try:
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        yield TrackedCursor(cursor, name)
+        finished = True
+    finally:
+        if finished:
+            try:
+                cursor.close()
+            except Exception as e:
+                logger.warning(f"关闭流式游标失败: {e}")
+                finished = False
+        
+        if finished:
+            _release_connection(conn)
+        else:
+            try:
+                conn.invalidate()
+            except Exception as e:
+                logger.warning(f"断开流式查询连接失败: {e}")
+
+def warm_up_pool(count=None):
+    """
+    预先建立连接池中的连接（gunicorn worker启动后调用）
+    
+    Args:
+        count: 预建连接数，默认使用配置中的 warm_size
+        
+    Returns:
+        int: 实际建立的连接数
+    """
+    opened = get_pool().warm_up(count)
+    if count is None:
+        opened += _replica_router.warm_up()
+    logger.info(f"进程 {os.getpid()} 已预建 {opened} 个数据库连接")
+    return opened
+
+def _discard_inherited_pool():
+    """
+    丢弃从父进程继承来的连接池，但不关闭其中的连接
+
+    这些socket与父进程共享，在子进程中发送COM_QUIT会把父进程的连接一起断开
+    """
+    global _pool, _replica_router, _initialized, _pool_pid
+    
+    logger.info(f"进程 {os.getpid()} 丢弃从父进程 {_pool_pid} 继承的数据库连接池")
+    _pool = None
+    _replica_router = None
+    _initialized = False
+    _pool_pid = None
+
 def close_pool():
     """
     关闭数据库连接池
     """
-    global _pool, _initialized
+    global _pool, _replica_router, _initialized, _pool_pid
     
     with _pool_lock:
         if _initialized and _pool:
+            if _pool_pid == os.getpid():
+                _pool.close()
+                _replica_router.close()
+                logger.info("数据库连接池已关闭")
             _pool = None
+            _replica_router = None
             _initialized = False
-            logger.info("数据库连接池已关闭")
+            _pool_pid = None
 
-def execute_query(query, params=None, dictionary=True, fetch_one=False):
+def execute_query(query, params=None, dictionary=True, fetch_one=False, name=None, readonly=True):
     """
     执行查询SQL并返回结果
     
@@ -178,11 +723,13 @@ def execute_query(query, params=None, dictionary=True, fetch_one=False):
         params: 查询参数
         dictionary: 是否返回字典结果
         fetch_one: 是否只返回第一条结果
+        name: 查询名称（用于运行指标）
+        readonly: 是否可以路由到读副本
         
     Returns:
         list/dict: 查询结果
     """
-    with get_cursor(dictionary=dictionary) as cursor:
+    with get_cursor(dictionary=dictionary, name=name, readonly=readonly) as cursor:
         cursor.execute(query, params or ())
         
         if fetch_one:
@@ -190,13 +737,14 @@ def execute_query(query, params=None, dictionary=True, fetch_one=False):
         else:
             return cursor.fetchall()
 
-def execute_update(query, params=None):
+def execute_update(query, params=None, name=None):
     """
     执行更新SQL并返回影响行数
     
     Args:
         query: SQL更新语句
         params: 更新参数
+        name: 查询名称（用于运行指标）
         
     Returns:
         int: 影响行数
@@ -204,12 +752,9 @@ def execute_update(query, params=None):
     Raises:
         Exception: 执行失败时抛出异常
     """
-    with get_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(query, params or ())
-            affected_rows = cursor.rowcount
-            conn.commit()
-            return affected_rows
+    with get_cursor(dictionary=False, commit=True, name=name) as cursor:
+        cursor.execute(query, params or ())
+        return cursor.rowcount
 
 def execute_transaction(queries):
     """
@@ -224,18 +769,14 @@ def execute_transaction(queries):
     Raises:
         Exception: 执行失败时抛出异常
     """
-    with get_connection() as conn:
-        try:
-            with conn.cursor() as cursor:
-                for query, params in queries:
-                    cursor.execute(query, params or ())
-            
-            conn.commit()
-            return True
-        except Exception as e:
-            conn.rollback()
-            logger.error(f"事务执行失败: {e}")
-            raise
+    try:
+        with get_cursor(dictionary=False, commit=True, name='execute_transaction') as cursor:
+            for query, params in queries:
+                cursor.execute(query, params or ())
+        return True
+    except Exception as e:
+        logger.error(f"事务执行失败: {e}")
+        raise
 
 def ping_db():
     """
@@ -245,9 +786,195 @@ def ping_db():
         bool: 连接是否正常
     """
     try:
-        with get_cursor() as cursor:
+        with get_cursor(name='ping_db') as cursor:
             cursor.execute("SELECT 1")
             return cursor.fetchone() is not None
     except Exception as e:
         logger.error(f"数据库连接测试失败: {e}")
-        return False 
\ No newline at end of file
+        return False
+
+def commit_connection(conn):
+    """
+    提交事务；在请求级工作单元中只做标记，由请求结束时统一提交
+    
+    Args:
+        conn: 数据库连接对象
+    """
+    if _in_request_scope() and g.get('db_connection') is conn:
+        g.db_dirty = True
+        return
+    
+    conn.commit()
+    _record_round_trips(1)
+
+def after_commit(callback):
+    """
+    注册在写操作提交后执行的回调（用于缓存失效等），回调异常只记录日志
+    
+    在请求级工作单元中且有尚未提交的写操作时，回调在请求结束统一提交成功后执行，回滚时丢弃；
+    否则写操作已经提交（请求外的写操作、transaction() 事务块），回调立即执行。
+    
+    Args:
+        callback: 无参数的函数
+    """
+    if _in_request_scope() and g.get('db_dirty'):
+        g.setdefault('db_after_commit', []).append(callback)
+        return
+    _run_after_commit([callback])
+
+def _run_after_commit(callbacks):
+    """依次执行提交后的回调"""
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"执行事务提交后的回调失败: {e}")
+
+def _in_request_scope():
+    """当前是否处于启用了工作单元的请求中"""
+    return has_request_context() and g.get('db_scope', False)
+
+def _get_request_connection(readonly=False):
+    """
+    获取当前请求共享的数据库连接，首次使用时才从连接池取出
+    
+    只读操作在本请求还没有用过主库连接时使用单独的副本连接（读写分离），
+    一旦用过主库连接，后续所有操作都走主库（读己之写）。
+    
+    Args:
+        readonly: 是否为只读操作
+        
+    Returns:
+        connection: 数据库连接对象
+    """
+    conn = g.get('db_connection')
+    if conn is not None:
+        return conn
+    
+    get_pool()
+    if readonly:
+        conn = g.get('db_read_connection')
+        if conn is None:
+            conn = _replica_router.checkout()
+            if conn is not None:
+                g.db_read_connection = conn
+        if conn is not None:
+            return conn
+    
+    conn = _checkout_connection()
+    g.db_connection = conn
+    return conn
+
+def _record_queries(count):
+    """累加当前请求执行的SQL语句数"""
+    if has_request_context() and 'db_stats' in g:
+        g.db_stats['queries'] += count
+
+def _record_round_trips(count):
+    """累加当前请求与数据库之间的往返次数"""
+    if has_request_context() and 'db_stats' in g:
+        g.db_stats['round_trips'] += count
+
+def get_request_stats():
+    """
+    获取当前请求的数据库访问统计
+    
+    Returns:
+        dict: 包含connections、queries、round_trips、commits的统计字典，请求外返回None
+    """
+    if has_request_context() and 'db_stats' in g:
+        stats = dict(g.db_stats)
+        stats['connections'] = sum(
+            1 for key in ('db_connection', 'db_read_connection') if g.get(key) is not None
+        )
+        return stats
+    return None
+
+def _finish_request_connection(commit):
+    """
+    结束当前请求的工作单元：提交或回滚事务，并将连接归还连接池；提交成功后执行 after_commit 注册的回调
+    
+    Args:
+        commit: 是否提交事务
+        
+    Raises:
+        Exception: 提交失败时抛出异常（连接仍会被归还）
+    """
+    read_conn = g.pop('db_read_connection', None)
+    if read_conn is not None:
+        _release_connection(read_conn)
+    
+    callbacks = g.pop('db_after_commit', [])
+    conn = g.pop('db_connection', None)
+    if conn is None:
+        return
+    
+    committed = False
+    try:
+        if commit and g.get('db_dirty') and not g.get('db_rollback_only'):
+            conn.commit()
+            g.db_stats['round_trips'] += 1
+            g.db_stats['commits'] += 1
+            committed = True
+        elif g.get('db_dirty') or g.get('db_rollback_only'):
+            conn.rollback()
+            g.db_stats['round_trips'] += 1
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception as rollback_error:
+            logger.error(f"数据库事务回滚失败: {rollback_error}")
+        raise
+    finally:
+        g.db_dirty = False
+        _release_connection(conn)
+    
+    if committed:
+        _run_after_commit(callbacks)
+
+def init_app(app):
+    """
+    为Flask应用注册请求级数据库工作单元
+    
+    每个请求最多占用一个连接，在第一次访问数据库时才从连接池取出；
+    响应生成后统一提交一次事务，异常时回滚，最后归还连接。
+    本次请求的SQL次数和往返次数通过 X-DB-Queries / X-DB-Round-Trips 响应头返回。
+    
+    Args:
+        app: Flask应用实例
+    """
+    @app.before_request
+    def open_db_scope():
+        g.db_scope = True
+        g.db_dirty = False
+        g.db_rollback_only = False
+        g.db_stats = {'queries': 0, 'round_trips': 0, 'commits': 0}
+    
+    @app.after_request
+    def commit_db_scope(response):
+        if 'db_stats' not in g:
+            return response
+        
+        try:
+            _finish_request_connection(commit=response.status_code < 400)
+        except Exception as e:
+            logger.error(f"请求事务提交失败: {e}")
+            response = jsonify({
+                "success": 0,
+                "message": "数据保存失败，请稍后重试",
+                "data": {}
+            })
+            response.status_code = 500
+        
+        response.headers['X-DB-Queries'] = str(g.db_stats['queries'])
+        response.headers['X-DB-Round-Trips'] = str(g.db_stats['round_trips'])
+        return response
+    
+    @app.teardown_request
+    def close_db_scope(exc):
+        # 正常请求在after_request中已经提交，这里只处理异常中断的请求
+        try:
+            _finish_request_connection(commit=False)
+        except Exception as e:
+            logger.error(f"请求结束时释放数据库连接失败: {e}")
+        g.db_scope = False
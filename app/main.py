@@ -17,6 +17,7 @@ from app.routes import (
     user_blueprint
 )
 from app.utils.cors_handler import register_cors_handler
+from app import db_pool
 
 def create_app():
     """
@@ -31,12 +32,15 @@ def create_app():
     # 启用强化版跨域支持
     CORS(app, 
          resources={r"/*": {"origins": "*", "supports_credentials": True}},
-         allow_headers=["Content-Type", "Authorization", "token", "Access-Control-Allow-Credentials"],
-         expose_headers=["Content-Length", "X-Total-Count"],
+         allow_headers=["Content-Type", "Authorization", "token", "Access-Control-Allow-Credentials", "Idempotency-Key"],
+         expose_headers=["Content-Length", "X-Total-Count", "X-DB-Queries", "X-DB-Round-Trips", "Idempotent-Replayed"],
          max_age=86400)
     
     # 注册通用跨域处理
     register_cors_handler(app)
+    
+    # 注册请求级数据库工作单元（每个请求共享一个连接和一次提交）
+    db_pool.init_app(app)
 
     # 注册蓝图
     app.register_blueprint(identity_blueprint)
@@ -118,21 +122,15 @@ def create_app():
         """将根路径访问重定向到API文档"""
         return redirect('/api/docs')
     
-    # 创建数据表和测试数据
-    @app.before_first_request
-    def initialize_database():
-        """初始化数据库表和测试数据"""
-        try:
-            from app.models import database
-            database.create_tables_if_not_exist()
-            database.insert_test_data()
-        except Exception as e:
-            app.logger.error(f"数据库初始化失败: {e}")
-    
+    # 数据表和测试数据的初始化不在这里进行：gunicorn部署时由 gunicorn.conf.py 在主进程执行一次，
+    # 直接运行时由 run_app 在启动前执行
     return app
 
 def run_app():
     """运行Flask应用"""
+    from app.models import database
+    database.init_database()
+    
     app = create_app()
     host = API_CONFIG['server_host']
     port = API_CONFIG['server_port']
@@ -1,59 +1,245 @@
 """
 数据库连接和操作模块
+
+所有查询都通过 app.db_pool 中的连接池执行，不再为每次调用单独建立连接
 """
-import mysql.connector
+import datetime
 import json
 import logging
-from app.config import DB_CONFIG
+import re
+from mysql.connector import errorcode, errors
+from app.config import (
+    ARCHIVE_CONFIG, IDEMPOTENCY_CONFIG, PAGINATION_CONFIG, REDIS_CACHE_CONFIG, SHARED_CACHE_CONFIG,
+    USER_CACHE_CONFIG
+)
+from app.db_pool import after_commit, get_cursor, stream_cursor, transaction
+from app.utils.bloom import RefreshingBloomFilter
+from app.utils.cache import TTLCache, MISSING
+from app.utils.pagination import next_cursor
+from app.utils.redis_cache import RedisCache
+from app.utils.shared_cache import SharedCache
 
 # 配置日志记录
 logging.basicConfig(level=logging.INFO, 
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def get_connection():
+# 受理单计数缓存，避免每次翻页都执行一次 COUNT(*)
+_count_cache = TTLCache(
+    maxsize=PAGINATION_CONFIG['count_cache_size'],
+    ttl=PAGINATION_CONFIG['count_cache_ttl'],
+    name='appeal_count'
+)
+
+# 用户查询缓存（身份证号 -> 用户信息），更新用户验证结果时按用户ID失效
+_user_cache = TTLCache(
+    maxsize=USER_CACHE_CONFIG['max_size'],
+    ttl=USER_CACHE_CONFIG['ttl'],
+    name='user'
+)
+
+# 用户缓存的失效次数，查询前后不一致说明查询期间有写入，结果可能已过期，不写入缓存
+_user_cache_generation = 0
+
+# 查询后确认不存在的身份证号，短时间内重复查询直接返回不存在
+_missing_user_cache = TTLCache(
+    maxsize=USER_CACHE_CONFIG['max_size'],
+    ttl=USER_CACHE_CONFIG['negative_ttl'],
+    name='user_negative'
+)
+
+def _load_user_id_cards():
     """
-    创建数据库连接
+    流式读取 users 表的全部身份证号，用于构建布隆过滤器（读主库，避免副本延迟漏掉新用户）
     
     Returns:
-        connection: MySQL数据库连接对象
+        tuple: (用户总数, 身份证号迭代器, 读取前的最大用户ID)
     """
-    try:
-        logger.info(f"尝试连接数据库: {DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}")
-        connection = mysql.connector.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            port=DB_CONFIG['port'],
+    with get_cursor(name='count_users') as cursor:
+        cursor.execute("SELECT COUNT(*) AS total, COALESCE(MAX(id), 0) AS max_id FROM users")
+        row = cursor.fetchone()
+        total, max_id = row['total'], row['max_id']
+    
+    def iterate():
+        with stream_cursor(name='scan_user_id_cards', readonly=False) as cursor:
+            cursor.execute("SELECT id_card_number FROM users")
+            while True:
+                rows = cursor.fetchmany(5000)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row['id_card_number']
+    
+    return total, iterate(), max_id
+
+# 增量同步时重新读取水位之前的用户ID数：自增ID较小的事务可能晚于ID较大的事务提交
+USER_SYNC_OVERLAP = 100
+
+def _load_new_user_id_cards(last_id):
+    """
+    读取 last_id 之后新增的用户身份证号，用于增量更新布隆过滤器（读主库）
+    
+    包括其他worker、其他服务器和外部系统新增的用户，这些身份证号同时从不存在的身份证号缓存中移除
+    
+    Args:
+        last_id: 上次读取到的最大用户ID
+    
+    Returns:
+        tuple: (读取到的最大用户ID, 身份证号列表)
+    """
+    with get_cursor(name='load_new_user_id_cards') as cursor:
+        cursor.execute(
+            "SELECT id, id_card_number FROM users WHERE id > %s ORDER BY id",
+            (max((last_id or 0) - USER_SYNC_OVERLAP, 0),)
         )
-        logger.info("数据库连接成功")
-        return connection
-    except Exception as e:
-        error_msg = f"数据库连接错误: {str(e)}"
-        logger.error(error_msg)
-        print(error_msg)
-        raise
+        rows = cursor.fetchall()
+    
+    id_card_numbers = [row['id_card_number'] for row in rows]
+    # 其他进程新增的用户也从本进程不存在的身份证号缓存中移除
+    for id_card_number in id_card_numbers:
+        _missing_user_cache.delete(id_card_number)
+    return max([last_id or 0] + [row['id'] for row in rows]), id_card_numbers
 
-def get_dict_cursor(connection):
+# 已知身份证号的布隆过滤器，判断一定不存在的身份证号不查询数据库
+_id_card_filter = RefreshingBloomFilter(
+    'user_id_card',
+    _load_user_id_cards,
+    error_rate=USER_CACHE_CONFIG['bloom_error_rate'],
+    rebuild_interval=USER_CACHE_CONFIG['bloom_rebuild_interval'],
+    delta_loader=_load_new_user_id_cards,
+    sync_interval=USER_CACHE_CONFIG['bloom_sync_interval']
+)
+
+# 受理单写入提交后调用的函数，参数为 (身份证号集合, 案件编号集合)，用于缓存失效
+_appeal_change_listeners = []
+
+def add_appeal_change_listener(listener):
     """
-    获取返回字典结果的游标
+    注册受理单变更的监听函数，新增、更新办理状态、归档受理单的写操作提交后调用；
+    配置了Redis缓存时，其他进程（包括其他节点）的变更也会通知，
+    可能漏掉了失效消息时两个参数都为None，表示所有受理单都可能已变更
     
     Args:
-        connection: 数据库连接
-        
+        listener: 接收 (身份证号集合, 案件编号集合) 的函数
+    """
+    _appeal_change_listeners.append(listener)
+
+def _notify_appeal_change(id_card_numbers, case_numbers):
+    """
+    在当前写操作提交后通知受理单变更的监听函数
+    
+    Args:
+        id_card_numbers: 涉及的身份证号
+        case_numbers: 涉及的案件编号
+    """
+    id_card_numbers = {value for value in id_card_numbers if value}
+    case_numbers = {value for value in case_numbers if value}
+    
+    def notify():
+        _invalidate_appeal_cache(id_card_numbers, case_numbers)
+        for listener in _appeal_change_listeners:
+            listener(id_card_numbers, case_numbers)
+    
+    after_commit(notify)
+
+def _apply_remote_invalidation(keys):
+    """
+    收到其他进程的缓存失效消息（共享缓存中的条目已由缓存对象删除）：
+    清空本进程的计数缓存，并通知受理单变更的监听函数
+    
+    Args:
+        keys: 失效的缓存键，None表示可能漏掉了失效消息
+    """
+    _count_cache.clear()
+    if keys is None:
+        id_card_numbers = case_numbers = None
+    else:
+        id_card_numbers = {key.split(':', 1)[1] for key in keys if key.startswith('summary:')}
+        case_numbers = {key.split(':', 1)[1] for key in keys if key.startswith('case:')}
+    for listener in _appeal_change_listeners:
+        listener(id_card_numbers, case_numbers)
+
+def _create_appeal_cache():
+    """
+    创建受理单缓存：本机所有worker共享的SQLite缓存；配置了 REDIS_CACHE_URL 时在其上增加
+    多节点共用的Redis缓存，并通过发布订阅把失效消息广播到所有节点
+    """
+    cache = SharedCache(
+        SHARED_CACHE_CONFIG['path'],
+        max_entries=SHARED_CACHE_CONFIG['max_entries'],
+        ttl=SHARED_CACHE_CONFIG['ttl'],
+        name='shared'
+    )
+    if not REDIS_CACHE_CONFIG['url']:
+        return cache
+    return RedisCache(
+        cache,
+        REDIS_CACHE_CONFIG['url'],
+        channel=REDIS_CACHE_CONFIG['channel'],
+        key_prefix=REDIS_CACHE_CONFIG['key_prefix'],
+        ttl=SHARED_CACHE_CONFIG['ttl'],
+        socket_timeout=REDIS_CACHE_CONFIG['socket_timeout'],
+        retry_interval=REDIS_CACHE_CONFIG['retry_interval'],
+        on_invalidate=_apply_remote_invalidation,
+        name='redis'
+    )
+
+# 受理单缓存：受理单摘要（summary:身份证号）和按案件编号查询的完整受理单（case:案件编号）
+_appeal_cache = _create_appeal_cache()
+
+def _invalidate_appeal_cache(id_card_numbers, case_numbers):
+    """受理单变更提交后使缓存中对应的摘要和受理单失效（对本机所有worker生效，配置了Redis缓存时对所有节点生效）"""
+    if SHARED_CACHE_CONFIG['enabled']:
+        _appeal_cache.delete(
+            [f"summary:{value}" for value in id_card_numbers] + [f"case:{value}" for value in case_numbers]
+        )
+
+def start_cache_subscriber():
+    """启动本进程订阅Redis缓存失效消息的后台线程（gunicorn worker启动时调用，未配置Redis缓存时不做任何事）"""
+    if SHARED_CACHE_CONFIG['enabled'] and isinstance(_appeal_cache, RedisCache):
+        _appeal_cache.start()
+
+def _select_columns(columns):
+    """
+    生成SELECT字段列表
+    
+    Args:
+        columns: 字段名列表（须已按允许的字段验证），None表示全部字段
+    
     Returns:
-        cursor: 返回字典结果的游标
+        str: 逗号分隔的字段列表
     """
-    return connection.cursor(dictionary=True)
+    if not columns:
+        return '*'
+    return ', '.join(columns)
+
+def _next_month(day):
+    """返回下个月的第一天"""
+    return (day.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+def _partition_definition(month):
+    """
+    生成一个月份分区的定义
+    
+    分区 pYYYYMM 保存创建时间早于下个月1日的记录（最早的分区同时保存更早的记录）
+    
+    Args:
+        month: 该月份中的任意一天
+    
+    Returns:
+        str: 分区定义
+    """
+    return (
+        f"PARTITION p{month.strftime('%Y%m')} "
+        f"VALUES LESS THAN (TO_DAYS('{_next_month(month).isoformat()}'))"
+    )
 
 def create_tables_if_not_exist():
     """
     如果数据表不存在，则创建必要的表结构
     """
-    connection = get_connection()
     try:
-        with get_dict_cursor(connection) as cursor:
+        with get_cursor(commit=True, name='create_tables_if_not_exist') as cursor:
             # 创建用户表
             cursor.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -82,10 +268,10 @@ def create_tables_if_not_exist():
             ) COMMENT='身份验证日志表';
             """)
             
-            # 创建历史受理单记录表
-            cursor.execute("""
+            # 创建历史受理单记录表（按创建时间月份分区，先建当月分区，之后的分区由 ensure_appeal_partitions 添加）
+            cursor.execute(f"""
             CREATE TABLE IF NOT EXISTS appeal_records (
-                id INT AUTO_INCREMENT PRIMARY KEY,
+                id INT AUTO_INCREMENT,
                 case_number VARCHAR(50) NOT NULL COMMENT '受理编号',
                 person_name VARCHAR(50) NOT NULL COMMENT '姓名',
                 contact_info VARCHAR(20) DEFAULT NULL COMMENT '联系方式',
@@ -100,32 +286,114 @@ def create_tables_if_not_exist():
                 handling_department VARCHAR(50) DEFAULT NULL COMMENT '处理部门',
                 handling_status VARCHAR(20) DEFAULT NULL COMMENT '处理状态',
                 expected_completion VARCHAR(50) DEFAULT NULL COMMENT '预计完成时间',
-                create_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+                create_time DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+                qr_code VARCHAR(255) DEFAULT NULL COMMENT '二维码URL或数据',
+                markdown_doc TEXT COMMENT 'Markdown格式文档',
+                PRIMARY KEY (id, create_time),
+                INDEX idx_appeal_case_number (case_number),
+                INDEX idx_appeal_create_time (create_time, id),
+                INDEX idx_appeal_id_card_time (id_card_number, create_time, id),
+                INDEX idx_appeal_contact_time (contact_info, create_time, id),
+                INDEX idx_appeal_person_name_time (person_name, create_time, id),
+                INDEX idx_appeal_id_card_summary (id_card_number, handling_status, handling_department, create_time)
+            ) COMMENT='历史受理单记录表'
+            PARTITION BY RANGE (TO_DAYS(create_time)) (
+                {_partition_definition(datetime.date.today())},
+                PARTITION pmax VALUES LESS THAN MAXVALUE
+            );
+            """)
+            
+            # 创建案件编号登记表（分区表的唯一索引必须包含分区字段，案件编号的全局唯一由该表保证）
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS appeal_case_numbers (
+                case_number VARCHAR(50) NOT NULL PRIMARY KEY COMMENT '受理编号',
+                create_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '登记时间'
+            ) COMMENT='受理单案件编号登记表';
+            """)
+            
+            # 创建受理单全文检索表（分区表不支持FULLTEXT索引，检索字段单独保存，随受理单写入和归档维护）
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS appeal_search_texts (
+                id INT NOT NULL PRIMARY KEY COMMENT '受理单ID',
+                create_time DATETIME NOT NULL COMMENT '受理单创建时间',
+                incident_description TEXT COMMENT '事件描述',
+                incident_location VARCHAR(255) DEFAULT NULL COMMENT '事件地点',
+                address VARCHAR(255) DEFAULT NULL COMMENT '地址',
+                INDEX idx_search_create_time (create_time),
+                FULLTEXT INDEX ft_appeal_search (incident_description, incident_location, address) WITH PARSER ngram
+            ) COMMENT='受理单全文检索表';
+            """)
+            
+            # 创建受理单归档表（已结案且超过保留期的受理单，字段顺序与 appeal_records 相同）
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS appeal_records_archive (
+                id INT NOT NULL PRIMARY KEY,
+                case_number VARCHAR(50) NOT NULL COMMENT '受理编号',
+                person_name VARCHAR(50) NOT NULL COMMENT '姓名',
+                contact_info VARCHAR(20) DEFAULT NULL COMMENT '联系方式',
+                gender VARCHAR(10) DEFAULT NULL COMMENT '性别',
+                id_card_number VARCHAR(20) DEFAULT NULL COMMENT '身份证号',
+                address VARCHAR(255) DEFAULT NULL COMMENT '地址',
+                incident_time VARCHAR(50) DEFAULT NULL COMMENT '事件时间',
+                incident_location VARCHAR(255) DEFAULT NULL COMMENT '事件地点',
+                incident_description TEXT COMMENT '事件描述',
+                people_involved VARCHAR(10) DEFAULT NULL COMMENT '涉及人数',
+                submitted_materials TEXT COMMENT '提交材料',
+                handling_department VARCHAR(50) DEFAULT NULL COMMENT '处理部门',
+                handling_status VARCHAR(20) DEFAULT NULL COMMENT '处理状态',
+                expected_completion VARCHAR(50) DEFAULT NULL COMMENT '预计完成时间',
+                create_time DATETIME NOT NULL COMMENT '创建时间',
                 qr_code VARCHAR(255) DEFAULT NULL COMMENT '二维码URL或数据',
-                markdown_doc TEXT COMMENT 'Markdown格式文档'
-            ) COMMENT='历史受理单记录表';
+                markdown_doc TEXT COMMENT 'Markdown格式文档',
+                UNIQUE KEY uk_archive_case_number (case_number),
+                INDEX idx_archive_create_time (create_time, id),
+                INDEX idx_archive_id_card_time (id_card_number, create_time, id),
+                INDEX idx_archive_contact_time (contact_info, create_time, id),
+                INDEX idx_archive_person_name_time (person_name, create_time, id)
+            ) COMMENT='历史受理单归档表';
+            """)
+            
+            # 创建受理单摘要表（按身份证号汇总，随受理单写入增量维护）
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS appeal_summaries (
+                id_card_number VARCHAR(20) NOT NULL PRIMARY KEY COMMENT '身份证号',
+                person_name VARCHAR(50) DEFAULT NULL COMMENT '最新一条受理单的姓名',
+                appeal_count INT NOT NULL DEFAULT 0 COMMENT '受理单数量',
+                latest_time DATETIME DEFAULT NULL COMMENT '最新受理时间',
+                status_stats JSON NOT NULL COMMENT '办理状态 -> 数量',
+                department_stats JSON NOT NULL COMMENT '办理部门 -> 数量',
+                update_time DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+            ) COMMENT='受理单摘要表';
+            """)
+            
+            # 创建幂等键表（保存带 Idempotency-Key 的写请求的响应，重试时直接返回）
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                idempotency_key VARCHAR(128) NOT NULL PRIMARY KEY COMMENT '幂等键',
+                request_hash CHAR(64) NOT NULL COMMENT '请求方法、路径和请求体的SHA-256',
+                status_code INT NOT NULL COMMENT '响应状态码',
+                response_body MEDIUMTEXT NOT NULL COMMENT '响应内容',
+                create_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+                INDEX idx_idempotency_create_time (create_time)
+            ) COMMENT='写请求幂等键表';
             """)
             
-        connection.commit()
-        print("数据表创建成功")
+        logger.info("数据表创建成功")
     except Exception as e:
-        print(f"创建数据表失败: {e}")
+        logger.error(f"创建数据表失败: {e}")
         raise
-    finally:
-        connection.close()
 
 def insert_test_data():
     """
     插入测试数据
     """
-    connection = get_connection()
     try:
-        with get_dict_cursor(connection) as cursor:
+        with get_cursor(commit=True, name='insert_test_data') as cursor:
             # 检查是否已存在测试数据
             cursor.execute("SELECT COUNT(*) as count FROM users")
             result = cursor.fetchone()
             if result['count'] > 0:
-                print("数据库已有数据，跳过测试数据插入")
+                logger.info("数据库已有数据，跳过测试数据插入")
                 return
             
             # 插入测试数据
@@ -161,37 +429,135 @@ def insert_test_data():
              handling_status, expected_completion, create_time, qr_code, markdown_doc)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """
+            _register_case_numbers(cursor, [row[0] for row in appeal_test_data])
             cursor.executemany(appeal_query, appeal_test_data)
+            _index_appeal_texts(cursor, [row[0] for row in appeal_test_data])
+            _refresh_appeal_summaries(cursor, sorted({row[4] for row in appeal_test_data}))
             
-        connection.commit()
-        print(f"已插入{len(test_data)}条测试用户数据和测试受理单记录")
+        _users_added([row[2] for row in test_data])
+        logger.info(f"已插入{len(test_data)}条测试用户数据和测试受理单记录")
     except Exception as e:
-        print(f"插入测试数据失败: {e}")
+        logger.error(f"插入测试数据失败: {e}")
         raise
-    finally:
-        connection.close()
+
+def init_database():
+    """
+    初始化数据库表和测试数据
+    
+    每次部署只需执行一次（gunicorn主进程启动时或直接运行应用时），失败只记录日志不阻止启动
+    
+    Returns:
+        bool: 初始化是否成功
+    """
+    try:
+        create_tables_if_not_exist()
+        ensure_appeal_partitions(ARCHIVE_CONFIG['partition_months_ahead'])
+        insert_test_data()
+        purge_idempotency_keys()
+        return True
+    except Exception as e:
+        logger.error(f"数据库初始化失败: {e}")
+        return False
 
 def get_user_by_id_card(id_card_number):
     """
     根据身份证号查询用户信息
     
+    查询到的用户在进程内缓存 USER_CACHE_TTL 秒，更新验证结果时失效；布隆过滤器判断一定不存在、
+    或 USER_CACHE_NEGATIVE_TTL 秒内查询过确认不存在的身份证号直接返回None，不查询数据库
+    
     Args:
         id_card_number: 身份证号
         
     Returns:
         dict: 用户信息字典
     """
-    connection = get_connection()
+    if USER_CACHE_CONFIG['enabled']:
+        user = _user_cache.get(id_card_number)
+        if user is not MISSING:
+            return dict(user)
+    if _known_missing_user(id_card_number):
+        return None
+    
+    generation = _user_cache_generation
     try:
-        with get_dict_cursor(connection) as cursor:
-            query = "SELECT * FROM users WHERE id_card_number = %s LIMIT 1"
+        with get_cursor(name='get_user_by_id_card', readonly=True) as cursor:
+            query = "SELECT * FROM users WHERE id_card_number = %s ORDER BY id LIMIT 1"
             cursor.execute(query, (id_card_number,))
-            return cursor.fetchone()
+            user = cursor.fetchone()
     except Exception as e:
-        print(f"查询用户失败: {e}")
+        logger.error(f"查询用户失败: {e}")
         return None
-    finally:
-        connection.close()
+    
+    if user is None:
+        _remember_missing_user(id_card_number)
+    elif USER_CACHE_CONFIG['enabled'] and generation == _user_cache_generation:
+        _user_cache.set(id_card_number, dict(user))
+    return user
+
+def _known_missing_user(id_card_number):
+    """
+    不查询数据库判断身份证号是否一定不存在：布隆过滤器判断不存在，或最近查询过确认不存在
+    
+    Args:
+        id_card_number: 身份证号
+        
+    Returns:
+        bool: 是否一定不存在
+    """
+    if USER_CACHE_CONFIG['bloom_enabled'] and not _id_card_filter.might_contain(id_card_number):
+        return True
+    return (
+        USER_CACHE_CONFIG['enabled']
+        and USER_CACHE_CONFIG['negative_ttl'] > 0
+        and _missing_user_cache.get(id_card_number) is not MISSING
+    )
+
+def _remember_missing_user(id_card_number):
+    """
+    记录查询后确认不存在的身份证号；布隆过滤器判断可能存在时计为一次误判
+    
+    Args:
+        id_card_number: 身份证号
+    """
+    # 过滤器尚未构建完成或增量同步滞后时没有参与判断，不计为误判
+    if USER_CACHE_CONFIG['bloom_enabled'] and _id_card_filter.ready:
+        _id_card_filter.record_false_positive()
+    if USER_CACHE_CONFIG['enabled'] and USER_CACHE_CONFIG['negative_ttl'] > 0:
+        _missing_user_cache.set(id_card_number, True)
+
+def _users_added(id_card_numbers):
+    """
+    新增用户提交后调用：加入布隆过滤器，并从不存在的身份证号缓存中移除
+    
+    Args:
+        id_card_numbers: 新增用户的身份证号列表
+    """
+    for id_card_number in id_card_numbers:
+        _id_card_filter.add(id_card_number)
+        _missing_user_cache.delete(id_card_number)
+
+def start_user_filter():
+    """
+    启动已知身份证号布隆过滤器的后台构建（gunicorn worker启动时调用；未调用时在首次查询用户时启动）
+    """
+    if USER_CACHE_CONFIG['bloom_enabled']:
+        _id_card_filter.start()
+
+def _invalidate_cached_users(user_ids):
+    """
+    使指定用户的缓存失效，通过 after_commit 在用户数据的写操作提交后调用
+    （请求中的写操作在请求结束时才提交，提前失效会让并发查询把提交前的数据重新写入缓存）
+    
+    缓存按身份证号索引，写操作只知道用户ID，因此遍历缓存条目查找（缓存容量有限，写操作是批量的）
+    
+    Args:
+        user_ids: 用户ID集合
+    """
+    global _user_cache_generation
+    _user_cache_generation += 1
+    if user_ids:
+        _user_cache.delete_where(lambda user: user['id'] in user_ids)
 
 def update_verification_result(user_id, verified, result):
     """
@@ -202,21 +568,18 @@ def update_verification_result(user_id, verified, result):
         verified: 是否验证通过
         result: 验证结果内容
     """
-    connection = get_connection()
     try:
-        with get_dict_cursor(connection) as cursor:
+        with get_cursor(commit=True, name='update_verification_result') as cursor:
             query = """
             UPDATE users SET verified = %s, verification_result = %s 
             WHERE id = %s
             """
             cursor.execute(query, (verified, result, user_id))
-        connection.commit()
+        after_commit(lambda: _invalidate_cached_users({user_id}))
         return True
     except Exception as e:
-        print(f"更新验证结果失败: {e}")
+        logger.error(f"更新验证结果失败: {e}")
         return False
-    finally:
-        connection.close()
 
 def log_verification(user_id, request_data, response_data, status):
     """
@@ -228,9 +591,8 @@ def log_verification(user_id, request_data, response_data, status):
         response_data: 响应数据
         status: 验证状态
     """
-    connection = get_connection()
     try:
-        with get_dict_cursor(connection) as cursor:
+        with get_cursor(commit=True, name='log_verification') as cursor:
             query = """
             INSERT INTO verification_logs (user_id, request_data, response_data, status)
             VALUES (%s, %s, %s, %s)
@@ -241,13 +603,112 @@ def log_verification(user_id, request_data, response_data, status):
                 json.dumps(response_data, ensure_ascii=False),
                 status
             ))
-        connection.commit()
         return True
     except Exception as e:
-        print(f"记录验证日志失败: {e}")
+        logger.error(f"记录验证日志失败: {e}")
+        return False
+
+def get_users_by_id_cards(id_card_numbers):
+    """
+    根据多个身份证号一次查询用户信息
+    
+    Args:
+        id_card_numbers: 身份证号列表
+        
+    Returns:
+        dict: 身份证号 -> 用户信息字典（同一身份证号有多条时取id最小的一条），查询失败时返回None
+    """
+    if not id_card_numbers:
+        return {}
+    
+    users = {}
+    missing = []
+    for id_card_number in id_card_numbers:
+        user = _user_cache.get(id_card_number) if USER_CACHE_CONFIG['enabled'] else MISSING
+        if user is not MISSING:
+            users[id_card_number] = dict(user)
+        elif not _known_missing_user(id_card_number):
+            missing.append(id_card_number)
+    if not missing:
+        return users
+    
+    generation = _user_cache_generation
+    try:
+        with get_cursor(name='get_users_by_id_cards', readonly=True) as cursor:
+            query = f"""
+            SELECT * FROM users
+            WHERE id_card_number IN ({', '.join(['%s'] * len(missing))})
+            ORDER BY id
+            """
+            cursor.execute(query, missing)
+            fetched = {}
+            for user in cursor.fetchall():
+                fetched.setdefault(user['id_card_number'], user)
+    except Exception as e:
+        logger.error(f"批量查询用户失败: {e}")
+        return None
+    
+    for id_card_number in missing:
+        if id_card_number not in fetched:
+            _remember_missing_user(id_card_number)
+    if USER_CACHE_CONFIG['enabled'] and generation == _user_cache_generation:
+        for id_card_number, user in fetched.items():
+            _user_cache.set(id_card_number, dict(user))
+    users.update(fetched)
+    return users
+
+def record_verifications(verifications):
+    """
+    批量写入验证结果：一条多行UPDATE更新用户验证状态，一条多行INSERT写入验证日志
+    
+    Args:
+        verifications: [(用户ID, 请求数据, 响应数据, 验证状态)] 列表
+        
+    Returns:
+        bool: 是否写入成功
+    """
+    if not verifications:
+        return True
+    
+    try:
+        with get_cursor(commit=True, name='record_verifications') as cursor:
+            # 同一用户出现多次时以最后一次的结果为准
+            results = {}
+            for user_id, _, response_data, _ in verifications:
+                results[user_id] = json.dumps(response_data, ensure_ascii=False)
+            
+            params = []
+            for user_id, result in results.items():
+                params.extend([user_id, result])
+            params.extend(results)
+            
+            query = f"""
+            UPDATE users
+            SET verified = TRUE,
+                verification_result = CASE id {' '.join(['WHEN %s THEN %s'] * len(results))} END
+            WHERE id IN ({', '.join(['%s'] * len(results))})
+            """
+            cursor.execute(query, params)
+            
+            query = """
+            INSERT INTO verification_logs (user_id, request_data, response_data, status)
+            VALUES (%s, %s, %s, %s)
+            """
+            cursor.executemany(query, [
+                (
+                    user_id,
+                    json.dumps(request_data, ensure_ascii=False),
+                    json.dumps(response_data, ensure_ascii=False),
+                    status
+                )
+                for user_id, request_data, response_data, status in verifications
+            ])
+        user_ids = set(results)
+        after_commit(lambda: _invalidate_cached_users(user_ids))
+        return True
+    except Exception as e:
+        logger.error(f"批量记录验证结果失败: {e}")
         return False
-    finally:
-        connection.close()
 
 def get_all_users(limit=100):
     """
@@ -259,19 +720,149 @@ def get_all_users(limit=100):
     Returns:
         list: 用户信息列表
     """
-    connection = get_connection()
     try:
-        with get_dict_cursor(connection) as cursor:
-            query = f"SELECT * FROM users LIMIT {limit}"
-            cursor.execute(query)
+        with get_cursor(name='get_all_users', readonly=True) as cursor:
+            query = "SELECT * FROM users LIMIT %s"
+            cursor.execute(query, (limit,))
             return cursor.fetchall()
     except Exception as e:
-        print(f"获取所有用户失败: {e}")
+        logger.error(f"获取所有用户失败: {e}")
         return []
-    finally:
-        connection.close()
 
-def get_appeal_records_by_id_card(id_card_number, limit=20, offset=0):
+def _fetch_appeal_page(cursor, where_clause, params, limit, offset=0, after=None, with_total=False, columns=None,
+                      include_archive=False):
+    """
+    按 create_time DESC, id DESC 读取一页受理单记录
+    
+    传入 after 时从该位置之后读取（keyset分页，可直接利用 (…, create_time, id) 复合索引定位），
+    否则按 OFFSET 跳过；多取一条用于判断是否还有下一页。
+    包含归档记录时两个表各自按索引取前 offset+limit+1 条，再合并排序取出本页
+    
+    Args:
+        cursor: 数据库游标
+        where_clause: 过滤条件（不含WHERE关键字），无过滤时为None
+        params: 过滤条件的参数
+        limit: 每页数量
+        offset: 跳过记录数（传入after时忽略）
+        after: 上一页最后一条记录的 (create_time, id)
+        with_total: 是否在同一条语句中用 COUNT(*) OVER() 返回过滤后的总数（不能与after同时使用）
+        columns: 返回的字段，None表示全部字段；游标需要的 id 和 create_time 总会返回
+        include_archive: 是否同时查询归档表（不能与with_total同时使用）
+    
+    Returns:
+        tuple: (记录列表, 下一页游标, 总数)，未统计或本页为空无法得到总数时总数为None
+    """
+    conditions = [where_clause] if where_clause else []
+    params = list(params)
+    
+    if after:
+        create_time, record_id = after[:2]
+        conditions.append("(create_time < %s OR (create_time = %s AND id < %s))")
+        params.extend([create_time, create_time, record_id])
+        offset = 0
+    
+    if columns:
+        columns = list(columns) + [column for column in ('id', 'create_time') if column not in columns]
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    order = " ORDER BY create_time DESC, id DESC"
+    
+    if include_archive:
+        branch = f"SELECT {_select_columns(columns)} FROM {{table}}{where}{order} LIMIT %s"
+        query = (
+            f"SELECT * FROM (({branch.format(table='appeal_records')}) UNION ALL "
+            f"({branch.format(table='appeal_records_archive')})) AS merged{order} LIMIT %s OFFSET %s"
+        )
+        params = params + [offset + limit + 1] + params + [offset + limit + 1, limit + 1, offset]
+    else:
+        query = f"SELECT {_select_columns(columns)}"
+        if with_total:
+            query += ", COUNT(*) OVER() AS total_count"
+        query += f" FROM appeal_records{where}{order} LIMIT %s OFFSET %s"
+        params.extend([limit + 1, offset])
+    
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    
+    total = None
+    if with_total:
+        for row in rows:
+            total = row.pop('total_count')
+        if not rows and offset == 0:
+            total = 0
+    
+    records, cursor_token = next_cursor(rows, limit)
+    return records, cursor_token, total
+
+def _count_appeal_records(cursor, where_clause, params, include_archive=False):
+    """
+    统计受理单数量，结果在进程内缓存 PAGINATION_CONFIG['count_cache_ttl'] 秒
+    
+    Args:
+        cursor: 数据库游标
+        where_clause: 过滤条件（不含WHERE关键字），无过滤时为None
+        params: 过滤条件的参数
+        include_archive: 是否同时统计归档表
+    
+    Returns:
+        int: 记录数
+    """
+    key = (where_clause, tuple(params), include_archive)
+    total = _count_cache.get(key)
+    if total is not MISSING:
+        return total
+    
+    where = " WHERE " + where_clause if where_clause else ""
+    if include_archive:
+        query = (
+            f"SELECT (SELECT COUNT(*) FROM appeal_records{where}) + "
+            f"(SELECT COUNT(*) FROM appeal_records_archive{where}) as total"
+        )
+        params = list(params) * 2
+    else:
+        query = f"SELECT COUNT(*) as total FROM appeal_records{where}"
+    cursor.execute(query, params)
+    total = int(cursor.fetchone()['total'])
+    
+    _count_cache.set(key, total)
+    return total
+
+def _query_appeal_page(name, where_clause, params, limit, offset, after, include_total, columns=None,
+                       include_archive=False):
+    """
+    查询一页受理单记录及（可选的）总数
+    
+    - 不需要总数时只执行一条分页查询
+    - 有过滤条件的OFFSET分页用 COUNT(*) OVER() 在同一条语句中得到总数
+    - 全表总数、游标分页和包含归档记录时的总数使用短时间缓存的 COUNT(*)
+    
+    Args:
+        name: 查询名称（用于运行指标）
+        where_clause: 过滤条件（不含WHERE关键字），无过滤时为None
+        params: 过滤条件的参数
+        limit: 每页数量
+        offset: 跳过记录数
+        after: 游标分页位置
+        include_total: 是否返回总数
+        columns: 返回的字段，None表示全部字段
+        include_archive: 是否同时查询归档表
+    
+    Returns:
+        tuple: (总记录数或None, 记录列表, 下一页游标)
+    """
+    with get_cursor(name=name, readonly=True) as cursor:
+        use_window = bool(include_total and where_clause and not after and not include_archive)
+        records, cursor_token, total = _fetch_appeal_page(
+            cursor, where_clause, params, limit, offset, after, with_total=use_window, columns=columns,
+            include_archive=include_archive
+        )
+        
+        if include_total and total is None:
+            total = _count_appeal_records(cursor, where_clause, params, include_archive)
+        
+        return total, records, cursor_token
+
+def get_appeal_records_by_id_card(id_card_number, limit=20, offset=0, after=None, include_total=True, columns=None,
+                                  include_archive=False):
     """
     根据身份证号查询受理单记录
     
@@ -279,62 +870,81 @@ def get_appeal_records_by_id_card(id_card_number, limit=20, offset=0):
         id_card_number: 身份证号
         limit: 最大返回数量
         offset: 跳过记录数
+        after: 游标分页位置，上一页最后一条记录的 (create_time, id)
+        include_total: 是否统计总记录数
+        columns: 返回的字段，None表示全部字段
+        include_archive: 是否同时查询归档表
     
     Returns:
-        tuple: (总记录数, 记录列表)
+        tuple: (总记录数, 记录列表, 下一页游标)，不统计总数时总记录数为None
     """
-    connection = get_connection()
     try:
-        with get_dict_cursor(connection) as cursor:
-            # 查询总记录数
-            count_query = "SELECT COUNT(*) as total FROM appeal_records WHERE id_card_number = %s"
-            cursor.execute(count_query, (id_card_number,))
-            total = cursor.fetchone()['total']
-            
-            # 如果没有记录，直接返回
-            if total == 0:
-                return 0, []
-            
-            # 查询数据
-            query = """
-            SELECT * FROM appeal_records 
-            WHERE id_card_number = %s
-            ORDER BY create_time DESC
-            LIMIT %s OFFSET %s
-            """
-            cursor.execute(query, (id_card_number, limit, offset))
-            records = cursor.fetchall()
-            
-            return total, records
+        return _query_appeal_page(
+            'get_appeal_records_by_id_card', "id_card_number = %s", (id_card_number,),
+            limit, offset, after, include_total, columns, include_archive
+        )
     except Exception as e:
-        print(f"查询受理单记录失败: {e}")
-        return 0, []
-    finally:
-        connection.close()
+        logger.error(f"查询受理单记录失败: {e}")
+        return (0 if include_total else None), [], None
 
-def get_appeal_record_by_case_number(case_number):
+def get_appeal_record_by_case_number(case_number, columns=None, include_archive=False):
     """
     根据案件编号查询受理单记录
     
     Args:
         case_number: 案件编号
+        columns: 返回的字段，None表示全部字段
+        include_archive: 受理单表中没有时是否再查询归档表
     
     Returns:
         dict: 受理单记录
     """
-    connection = get_connection()
+    # 受理单表中的记录整条缓存在受理单缓存中，按需要的字段返回；归档的受理单不缓存。
+    # 写入缓存的结果读主库：失效之后延迟的副本仍可能返回旧记录，读副本会把旧记录重新放回缓存
+    cache_key = f"case:{case_number}"
+    cached = SHARED_CACHE_CONFIG['enabled']
+    if cached:
+        record = _appeal_cache.get(cache_key)
+        if record is not MISSING:
+            return _project_record(record, columns)
+    
+    token = _appeal_cache.begin(cache_key) if cached else None
     try:
-        with get_dict_cursor(connection) as cursor:
-            query = "SELECT * FROM appeal_records WHERE case_number = %s LIMIT 1"
+        with get_cursor(name='get_appeal_record_by_case_number', readonly=not cached) as cursor:
+            query = f"""
+            SELECT {_select_columns(None if cached else columns)} FROM appeal_records WHERE case_number = %s LIMIT 1
+            """
             cursor.execute(query, (case_number,))
-            return cursor.fetchone()
+            record = cursor.fetchone()
+            if record is not None and cached:
+                _appeal_cache.set(cache_key, record, token)
+                record = _project_record(record, columns)
+            if record is None and include_archive:
+                query = f"SELECT {_select_columns(columns)} FROM appeal_records_archive WHERE case_number = %s"
+                cursor.execute(query, (case_number,))
+                record = cursor.fetchone()
+            return record
     except Exception as e:
-        print(f"查询受理单记录失败: {e}")
+        logger.error(f"查询受理单记录失败: {e}")
         return None
-    finally:
-        connection.close()
 
-def get_appeal_records_by_contact_info(contact_info, limit=20, offset=0):
+def _project_record(record, columns):
+    """
+    从完整的受理单记录中取出需要的字段
+    
+    Args:
+        record: 完整的受理单记录
+        columns: 需要的字段，None表示全部字段
+    
+    Returns:
+        dict: 只包含需要字段的记录
+    """
+    if not columns:
+        return dict(record)
+    return {column: record[column] for column in columns}
+
+def get_appeal_records_by_contact_info(contact_info, limit=20, offset=0, after=None, include_total=True, columns=None,
+                                       include_archive=False):
     """
     根据联系方式查询受理单记录
     
@@ -342,102 +952,360 @@ def get_appeal_records_by_contact_info(contact_info, limit=20, offset=0):
         contact_info: 联系方式
         limit: 最大返回数量
         offset: 跳过记录数
+        after: 游标分页位置，上一页最后一条记录的 (create_time, id)
+        include_total: 是否统计总记录数
+        columns: 返回的字段，None表示全部字段
+        include_archive: 是否同时查询归档表
     
     Returns:
-        tuple: (总记录数, 记录列表)
+        tuple: (总记录数, 记录列表, 下一页游标)，不统计总数时总记录数为None
     """
-    connection = get_connection()
     try:
-        with get_dict_cursor(connection) as cursor:
-            # 查询总记录数
-            count_query = "SELECT COUNT(*) as total FROM appeal_records WHERE contact_info = %s"
-            cursor.execute(count_query, (contact_info,))
-            total = cursor.fetchone()['total']
-            
-            # 如果没有记录，直接返回
-            if total == 0:
-                return 0, []
-            
-            # 查询数据
-            query = """
-            SELECT * FROM appeal_records 
-            WHERE contact_info = %s
-            ORDER BY create_time DESC
-            LIMIT %s OFFSET %s
-            """
-            cursor.execute(query, (contact_info, limit, offset))
-            records = cursor.fetchall()
-            
-            return total, records
+        return _query_appeal_page(
+            'get_appeal_records_by_contact_info', "contact_info = %s", (contact_info,),
+            limit, offset, after, include_total, columns, include_archive
+        )
     except Exception as e:
-        print(f"查询受理单记录失败: {e}")
-        return 0, []
-    finally:
-        connection.close()
+        logger.error(f"查询受理单记录失败: {e}")
+        return (0 if include_total else None), [], None
 
-def get_all_appeal_records(limit=100, offset=0):
+def get_all_appeal_records(limit=100, offset=0, after=None, include_total=True, columns=None):
     """
     获取所有受理单记录
     
     Args:
         limit: 最大返回数量
         offset: 跳过记录数
+        after: 游标分页位置，上一页最后一条记录的 (create_time, id)
+        include_total: 是否统计总记录数（使用短时间缓存的精确值）
+        columns: 返回的字段，None表示全部字段
     
     Returns:
-        tuple: (总记录数, 记录列表)
+        tuple: (总记录数, 记录列表, 下一页游标)，不统计总数时总记录数为None
     """
-    connection = get_connection()
     try:
-        with get_dict_cursor(connection) as cursor:
-            # 查询总记录数
-            count_query = "SELECT COUNT(*) as total FROM appeal_records"
-            cursor.execute(count_query)
-            total = cursor.fetchone()['total']
-            
-            # 如果没有记录，直接返回
-            if total == 0:
-                return 0, []
-            
-            # 查询数据
-            query = """
-            SELECT * FROM appeal_records 
-            ORDER BY create_time DESC
-            LIMIT %s OFFSET %s
-            """
-            cursor.execute(query, (limit, offset))
-            records = cursor.fetchall()
-            
-            return total, records
+        return _query_appeal_page(
+            'get_all_appeal_records', None, (), limit, offset, after, include_total, columns
+        )
     except Exception as e:
-        print(f"查询所有受理单记录失败: {e}")
-        return 0, []
-    finally:
-        connection.close()
+        logger.error(f"查询所有受理单记录失败: {e}")
+        return (0 if include_total else None), [], None
 
-def add_appeal_record(data):
+# 多字段搜索的匹配方式：(匹配字段, 匹配等级, 条件)，等级越小越靠前；每个条件都能使用以该字段开头的索引
+_SEARCH_MATCHES = (
+    ('id_card_number', 0, "id_card_number = %s"),
+    ('contact_info', 0, "contact_info = %s"),
+    ('case_number', 0, "case_number = %s"),
+    ('person_name', 0, "person_name = %s"),
+    ('case_number', 1, "case_number LIKE %s AND case_number <> %s"),
+    ('person_name', 1, "person_name LIKE %s AND person_name <> %s")
+)
+
+# 前缀匹配要求的最短查询值长度，避免单个字匹配大量姓名
+_SEARCH_PREFIX_MIN_LENGTH = 2
+
+def _count_search_matches(cursor, deduped, params, value, include_archive):
     """
-    添加受理单记录
+    统计 search_appeal_records_by_value 去重后的匹配数，结果在进程内缓存 PAGINATION_CONFIG['count_cache_ttl'] 秒
     
     Args:
-        data: 受理单数据
+        cursor: 数据库游标
+        deduped: 带 match_order 的去重子查询
+        params: 子查询的参数
+        value: 查询值（缓存键）
+        include_archive: 是否包含归档表（缓存键）
     
     Returns:
-        tuple: (成功标志, 消息)
+        int: 匹配的记录数
     """
-    connection = get_connection()
-    try:
-        with get_dict_cursor(connection) as cursor:
-            # 检查案件编号是否已存在
-            check_query = "SELECT COUNT(*) as count FROM appeal_records WHERE case_number = %s"
-            cursor.execute(check_query, (data.get('case_number'),))
-            if cursor.fetchone()['count'] > 0:
-                return False, f"案件编号 {data.get('case_number')} 已存在"
-            
-            # 准备字段和值
-            fields = []
-            values = []
-            placeholders = []
-            
+    key = ('search_appeal_records_by_value', value, include_archive)
+    total = _count_cache.get(key)
+    if total is not MISSING:
+        return total
+    
+    cursor.execute(f"SELECT COUNT(*) AS total FROM ({deduped}) AS deduped WHERE match_order = 1", params)
+    total = int(cursor.fetchone()['total'])
+    
+    _count_cache.set(key, total)
+    return total
+
+def search_appeal_records_by_value(value, limit=20, offset=0, after=None, include_total=True, columns=None,
+                                   include_archive=False):
+    """
+    在身份证号、联系方式、案件编号、姓名中搜索受理单（一条 UNION ALL 查询）
+    
+    精确匹配排在前面，其次是案件编号和姓名的前缀匹配；同一匹配等级内按 create_time DESC, id DESC 排序。
+    每条记录的 matched_field 为匹配到的字段，同一记录匹配多个条件时取等级最高的一个。
+    统计总数时在同一条语句中用 COUNT(*) OVER() 得到；不统计时每个分支按索引只取需要的前 offset+limit+1 条，
+    游标翻页时跳过已经读完的匹配等级。
+    
+    Args:
+        value: 查询值
+        limit: 最大返回数量
+        offset: 跳过记录数
+        after: 游标分页位置，上一页最后一条记录的 (create_time, id, match_rank)
+        include_total: 是否统计总记录数
+        columns: 返回的字段，None表示全部字段
+        include_archive: 是否同时查询归档表
+    
+    Returns:
+        tuple: (总记录数, 记录列表, 下一页游标)，不统计总数时总记录数为None
+    """
+    try:
+        if columns:
+            columns = list(columns) + [column for column in ('id', 'create_time') if column not in columns]
+        select_list = _select_columns(columns)
+        tables = ['appeal_records', 'appeal_records_archive'] if include_archive else ['appeal_records']
+        prefix = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        
+        after_rank = None
+        if after:
+            offset = 0
+            after_rank = after[2] if len(after) > 2 else 0
+        # 统计总数时所有分支都要完整读取，游标条件放在外层；否则放在各分支中，并限制每个分支的行数
+        limit_branches = not include_total
+        
+        branches = []
+        params = []
+        for table in tables:
+            for field, rank, condition in _SEARCH_MATCHES:
+                if rank > 0 and len(value) < _SEARCH_PREFIX_MIN_LENGTH:
+                    continue
+                if limit_branches and after_rank is not None and rank < after_rank:
+                    continue
+                
+                branch = f"SELECT {select_list}, '{field}' AS matched_field, {rank} AS match_rank FROM {table} WHERE {condition}"
+                params.extend([value] if rank == 0 else [prefix, value])
+                if limit_branches:
+                    if after_rank is not None and rank == after_rank:
+                        branch += " AND (create_time < %s OR (create_time = %s AND id < %s))"
+                        params.extend([after[0], after[0], after[1]])
+                    branch += " ORDER BY create_time DESC, id DESC LIMIT %s"
+                    params.append(offset + limit + 1)
+                branches.append(f"({branch})")
+        
+        if not branches:
+            return (0 if include_total else None), [], None
+        
+        deduped = f"""
+        SELECT merged.*, ROW_NUMBER() OVER (PARTITION BY id ORDER BY match_rank) AS match_order
+        FROM ({' UNION ALL '.join(branches)}) AS merged
+        """
+        branch_params = list(params)
+        if include_total:
+            query = f"""
+            SELECT * FROM (
+                SELECT deduped.*, COUNT(*) OVER() AS total_count FROM ({deduped}) AS deduped
+                WHERE match_order = 1
+            ) AS ranked
+            """
+            if after_rank is not None:
+                query += """
+                WHERE match_rank > %s
+                   OR (match_rank = %s AND (create_time < %s OR (create_time = %s AND id < %s)))
+                """
+                params.extend([after_rank, after_rank, after[0], after[0], after[1]])
+        else:
+            query = f"SELECT * FROM ({deduped}) AS ranked WHERE match_order = 1"
+        query += " ORDER BY match_rank, create_time DESC, id DESC LIMIT %s OFFSET %s"
+        params.extend([limit + 1, offset])
+        
+        with get_cursor(name='search_appeal_records_by_value', readonly=True) as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            
+            total = None
+            for row in rows:
+                row.pop('match_order')
+                if include_total:
+                    total = row.pop('total_count')
+            if include_total and not rows:
+                # 本页为空时窗口函数没有返回总数（翻过了最后一页），单独统计去重后的匹配数
+                total = 0 if offset == 0 and not after else _count_search_matches(
+                    cursor, deduped, branch_params, value, include_archive
+                )
+        
+        records, cursor_token = next_cursor(rows, limit)
+        for record in records:
+            record.pop('match_rank')
+        return total, records, cursor_token
+    except Exception as e:
+        logger.error(f"搜索受理单记录失败: {e}")
+        return (0 if include_total else None), [], None
+
+def fulltext_search_appeal_records(keywords, mode='natural', status=None, department=None, start_date=None,
+                                   end_date=None, limit=20, offset=0, include_total=True, columns=None):
+    """
+    按事件描述、事件地点、地址全文检索受理单（ngram分词的FULLTEXT索引）
+    
+    在全文检索表中匹配后按 (id, create_time) 主键关联受理单表，按相关度从高到低排序，
+    相关度相同时按创建时间倒序；总数在同一条语句中用 COUNT(*) OVER() 得到。
+    
+    Args:
+        keywords: 检索词（至少2个字符）
+        mode: natural 按相关度匹配任意分词；phrase 只匹配包含完整检索词的记录
+        status: 处理状态
+        department: 处理部门
+        start_date: 起始日期（包含），格式 YYYY-MM-DD
+        end_date: 结束日期（包含），格式 YYYY-MM-DD
+        limit: 最大返回数量
+        offset: 跳过记录数
+        include_total: 是否统计总记录数
+        columns: 返回的字段，None表示全部字段
+    
+    Returns:
+        tuple: (总记录数, 记录列表)，不统计总数时总记录数为None
+    """
+    try:
+        if mode == 'phrase':
+            match = "MATCH(t.incident_description, t.incident_location, t.address) AGAINST (%s IN BOOLEAN MODE)"
+            match_value = '"' + keywords.replace('"', ' ') + '"'
+        else:
+            match = "MATCH(t.incident_description, t.incident_location, t.address) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+            match_value = keywords
+        
+        conditions = [match]
+        params = [match_value, match_value]
+        if start_date:
+            conditions.append("t.create_time >= %s")
+            params.append(start_date)
+        if end_date:
+            conditions.append("t.create_time < DATE_ADD(%s, INTERVAL 1 DAY)")
+            params.append(end_date)
+        if status:
+            conditions.append("r.handling_status = %s")
+            params.append(status)
+        if department:
+            conditions.append("r.handling_department = %s")
+            params.append(department)
+        
+        select_list = ', '.join(f"r.{column}" for column in columns) if columns else 'r.*'
+        query = f"SELECT {select_list}, {match} AS relevance"
+        if include_total:
+            query += ", COUNT(*) OVER() AS total_count"
+        query += f"""
+        FROM appeal_search_texts t
+        JOIN appeal_records r ON r.id = t.id AND r.create_time = t.create_time
+        WHERE {' AND '.join(conditions)}
+        ORDER BY relevance DESC, t.create_time DESC, t.id DESC
+        LIMIT %s OFFSET %s
+        """
+        params.extend([limit, offset])
+        
+        with get_cursor(name='fulltext_search_appeal_records', readonly=True) as cursor:
+            cursor.execute(query, params)
+            records = cursor.fetchall()
+        
+        total = None
+        for record in records:
+            record['relevance'] = round(float(record['relevance']), 4)
+            if include_total:
+                total = record.pop('total_count')
+        if include_total and not records and offset == 0:
+            total = 0
+        
+        return total, records
+    except Exception as e:
+        logger.error(f"全文检索受理单记录失败: {e}")
+        return (0 if include_total else None), []
+
+def stream_appeal_records(start_date=None, end_date=None, status=None, department=None,
+                          columns=None, chunk_size=500):
+    """
+    按创建时间顺序流式读取受理单记录（用于导出）
+    
+    使用不缓冲的服务端游标逐批读取，内存占用只与 chunk_size 有关，与导出的总行数无关。
+    生成器没有读完就被关闭时（如客户端断开），连接会被断开而不是归还连接池。
+    
+    Args:
+        start_date: 起始日期（包含），格式 YYYY-MM-DD
+        end_date: 结束日期（包含），格式 YYYY-MM-DD
+        status: 处理状态
+        department: 处理部门
+        columns: 返回的字段，None表示全部字段
+        chunk_size: 每批读取的记录数
+    
+    Yields:
+        list: 一批记录
+    """
+    conditions = []
+    params = []
+    if start_date:
+        conditions.append("create_time >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("create_time < DATE_ADD(%s, INTERVAL 1 DAY)")
+        params.append(end_date)
+    if status:
+        conditions.append("handling_status = %s")
+        params.append(status)
+    if department:
+        conditions.append("handling_department = %s")
+        params.append(department)
+    
+    query = f"SELECT {_select_columns(columns)} FROM appeal_records"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY create_time, id"
+    
+    with stream_cursor(name='stream_appeal_records') as cursor:
+        cursor.execute(query, tuple(params))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+def estimate_appeal_record_count():
+    """
+    根据表统计信息估算受理单总数（不扫描表，可能与实际值有偏差）
+    
+    Returns:
+        int: 估算的记录数，失败时返回None
+    """
+    try:
+        total = _count_cache.get('estimate')
+        if total is not MISSING:
+            return total
+        
+        with get_cursor(name='estimate_appeal_record_count', readonly=True) as cursor:
+            query = """
+            SELECT TABLE_ROWS as total FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'appeal_records'
+            """
+            cursor.execute(query)
+            row = cursor.fetchone()
+            total = int(row['total'] or 0) if row else 0
+        
+        _count_cache.set('estimate', total)
+        return total
+    except Exception as e:
+        logger.error(f"估算受理单总数失败: {e}")
+        return None
+
+def _is_duplicate_key(error):
+    """是否为唯一索引冲突错误"""
+    return isinstance(error, errors.IntegrityError) and error.errno == errorcode.ER_DUP_ENTRY
+
+def add_appeal_record(data):
+    """
+    添加受理单记录
+    
+    案件编号由登记表的主键保证不重复，直接登记并根据唯一索引冲突判断是否已存在，不再预先查询
+    
+    Args:
+        data: 受理单数据
+    
+    Returns:
+        tuple: (成功标志, 消息)
+    """
+    try:
+        with get_cursor(commit=True, name='add_appeal_record') as cursor:
+            # 准备字段和值
+            fields = []
+            values = []
+            placeholders = []
+            
             for key, value in data.items():
                 fields.append(key)
                 values.append(value)
@@ -449,78 +1317,847 @@ def add_appeal_record(data):
             VALUES ({', '.join(placeholders)})
             """
             
-            # 执行插入
+            # 执行插入（冲突只回滚这一条语句，事务中的其他写操作不受影响），并在同一事务中更新摘要
+            try:
+                _register_case_numbers(cursor, [data.get('case_number')])
+            except errors.IntegrityError as e:
+                if _is_duplicate_key(e):
+                    return False, f"案件编号 {data.get('case_number')} 已存在"
+                raise
             cursor.execute(query, values)
-            
-        connection.commit()
+            _increment_appeal_summary(cursor, data)
+            _index_appeal_texts(cursor, [data.get('case_number')])
+        
+        # 新增记录后计数缓存失效
+        _count_cache.clear()
+        _notify_appeal_change([data.get('id_card_number')], [data.get('case_number')])
         return True, "受理单记录添加成功"
     except Exception as e:
-        print(f"添加受理单记录失败: {e}")
+        logger.error(f"添加受理单记录失败: {e}")
         return False, f"添加受理单记录失败: {e}"
-    finally:
-        connection.close()
 
-def get_appeal_summary_by_id_card(id_card_number):
+def _register_case_numbers(cursor, case_numbers):
     """
-    获取用户的受理单摘要信息
+    登记案件编号，须在插入受理单之前调用（调用方负责事务）
+    
+    appeal_records 按月分区后唯一索引必须包含 create_time，案件编号的全局唯一改由登记表的主键保证；
+    归档后编号仍保留在登记表中，归档的案件编号也不能重复使用
     
     Args:
-        id_card_number: 身份证号
+        cursor: 数据库游标
+        case_numbers: 案件编号列表
+    
+    Raises:
+        errors.IntegrityError: 案件编号已存在
+    """
+    cursor.executemany(
+        "INSERT INTO appeal_case_numbers (case_number) VALUES (%s)",
+        [(case_number,) for case_number in case_numbers]
+    )
+
+def _index_appeal_texts(cursor, case_numbers):
+    """
+    将新插入的受理单的检索字段写入全文检索表，须在插入受理单之后调用（调用方负责事务）
+    
+    Args:
+        cursor: 数据库游标
+        case_numbers: 案件编号列表
+    """
+    if not case_numbers:
+        return
+    
+    cursor.execute(f"""
+    INSERT INTO appeal_search_texts (id, create_time, incident_description, incident_location, address)
+    SELECT id, create_time, incident_description, incident_location, address
+    FROM appeal_records
+    WHERE case_number IN ({', '.join(['%s'] * len(case_numbers))})
+    """, case_numbers)
+
+def _insert_appeal_rows(cursor, records):
+    """
+    批量插入受理单记录，字段相同的记录合并为一次 executemany（驱动会改写为一条多行INSERT）
+    
+    Args:
+        cursor: 数据库游标
+        records: 已验证过字段名的受理单数据列表
+    """
+    groups = {}
+    for record in records:
+        groups.setdefault(tuple(record), []).append(tuple(record.values()))
+    
+    for fields, rows in groups.items():
+        query = f"""
+        INSERT INTO appeal_records ({', '.join(fields)})
+        VALUES ({', '.join(['%s'] * len(fields))})
+        """
+        cursor.executemany(query, rows)
+
+def _insert_appeal_chunk(chunk, seen):
+    """
+    在一个事务中写入一批受理单记录
+    
+    整批失败时逐条重试，以便给出每条记录各自的结果
+    
+    Args:
+        chunk: [(序号, 受理单数据)] 列表
+        seen: 本次批量请求中已写入的案件编号集合（写入成功后更新）
     
     Returns:
-        dict: 摘要信息
+        list: [(序号, 成功标志, 消息)]
     """
-    connection = get_connection()
     try:
-        with get_dict_cursor(connection) as cursor:
-            # 查询用户名
-            query = "SELECT person_name FROM appeal_records WHERE id_card_number = %s LIMIT 1"
-            cursor.execute(query, (id_card_number,))
-            person_record = cursor.fetchone()
+        with transaction(name='add_appeal_records_batch') as cursor:
+            # 先锁定摘要行，之后的读取才能看到并发事务已提交的受理单
+            id_card_numbers = sorted({record['id_card_number'] for _, record in chunk})
+            _lock_appeal_summaries(cursor, id_card_numbers)
             
-            if not person_record:
-                return None
+            case_numbers = [record['case_number'] for _, record in chunk]
+            cursor.execute(
+                f"SELECT case_number FROM appeal_case_numbers WHERE case_number IN ({', '.join(['%s'] * len(case_numbers))})",
+                case_numbers
+            )
+            existing = {row['case_number'] for row in cursor.fetchall()}
             
-            person_name = person_record['person_name']
+            results = []
+            pending = []
+            chunk_seen = set()
+            for index, record in chunk:
+                case_number = record['case_number']
+                if case_number in existing or case_number in seen or case_number in chunk_seen:
+                    results.append((index, False, f"案件编号 {case_number} 已存在"))
+                    continue
+                chunk_seen.add(case_number)
+                pending.append((index, record))
             
-            # 查询受理单数量
-            count_query = "SELECT COUNT(*) as total FROM appeal_records WHERE id_card_number = %s"
-            cursor.execute(count_query, (id_card_number,))
-            appeal_count = cursor.fetchone()['total']
+            if pending:
+                _register_case_numbers(cursor, [record['case_number'] for _, record in pending])
+                _insert_appeal_rows(cursor, [record for _, record in pending])
+                _index_appeal_texts(cursor, [record['case_number'] for _, record in pending])
+            # 锁定时插入的占位行都要重新计算（包括所有记录都被拒绝的身份证号）
+            _refresh_appeal_summaries(cursor, id_card_numbers)
+        
+        seen.update(chunk_seen)
+        results.extend((index, True, "受理单记录添加成功") for index, _ in pending)
+        _notify_appeal_change(
+            [record['id_card_number'] for _, record in pending],
+            [record['case_number'] for _, record in pending]
+        )
+        return results
+    except Exception as e:
+        if len(chunk) == 1:
+            index, record = chunk[0]
+            if _is_duplicate_key(e):
+                # 与并发写入的请求冲突
+                return [(index, False, f"案件编号 {record['case_number']} 已存在")]
+            logger.error(f"添加受理单记录失败: {e}")
+            return [(index, False, f"添加受理单记录失败: {e}")]
+        
+        logger.warning(f"批量写入 {len(chunk)} 条受理单失败，改为逐条写入: {e}")
+        results = []
+        for item in chunk:
+            results.extend(_insert_appeal_chunk([item], seen))
+        return results
+
+def add_appeal_records_batch(records, chunk_size=500):
+    """
+    批量添加受理单记录
+    
+    每 chunk_size 条一个事务：一次IN查询检查案件编号是否已存在，executemany写入，
+    再更新涉及身份证号的摘要；某一批失败不影响其他批次
+    
+    Args:
+        records: [(序号, 受理单数据)] 列表，字段须已通过验证
+        chunk_size: 每个事务写入的记录数
+    
+    Returns:
+        list: 按序号排列的 [(序号, 成功标志, 消息)]
+    """
+    results = []
+    seen = set()
+    
+    for start in range(0, len(records), chunk_size):
+        results.extend(_insert_appeal_chunk(records[start:start + chunk_size], seen))
+    
+    if seen:
+        _count_cache.clear()
+    
+    return sorted(results, key=lambda item: item[0])
+
+def get_idempotent_response(idempotency_key):
+    """
+    查询幂等键保存的响应（只返回未过期的记录，查询主库以读到刚提交的响应）
+    
+    Args:
+        idempotency_key: 幂等键
+    
+    Returns:
+        dict: 包含 request_hash、status_code、response_body 的记录，不存在时返回None
+    """
+    with get_cursor(name='get_idempotent_response') as cursor:
+        query = """
+        SELECT request_hash, status_code, response_body FROM idempotency_keys
+        WHERE idempotency_key = %s AND create_time > NOW() - INTERVAL %s SECOND
+        """
+        cursor.execute(query, (idempotency_key, IDEMPOTENCY_CONFIG['ttl']))
+        return cursor.fetchone()
+
+def save_idempotent_response(idempotency_key, request_hash, status_code, response_body, separate=False):
+    """
+    保存幂等键对应的响应；在请求中调用时与本次请求的写操作在同一事务中提交
+    
+    幂等键已存在且未过期时保留原记录（并发的相同请求以先提交的为准），已过期时覆盖
+    
+    Args:
+        idempotency_key: 幂等键
+        request_hash: 请求内容摘要
+        status_code: 响应状态码
+        response_body: 响应内容
+        separate: 使用单独的连接立即提交（本次请求的事务会回滚时使用，如4xx响应）
+    """
+    if separate:
+        context = transaction(name='save_idempotent_response', separate=True)
+    else:
+        context = get_cursor(commit=True, name='save_idempotent_response')
+    with context as cursor:
+        # MySQL按书写顺序执行赋值，create_time 必须最后更新
+        query = """
+        INSERT INTO idempotency_keys (idempotency_key, request_hash, status_code, response_body)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            request_hash = IF(create_time <= NOW() - INTERVAL %s SECOND, VALUES(request_hash), request_hash),
+            status_code = IF(create_time <= NOW() - INTERVAL %s SECOND, VALUES(status_code), status_code),
+            response_body = IF(create_time <= NOW() - INTERVAL %s SECOND, VALUES(response_body), response_body),
+            create_time = IF(create_time <= NOW() - INTERVAL %s SECOND, NOW(), create_time)
+        """
+        ttl = IDEMPOTENCY_CONFIG['ttl']
+        cursor.execute(query, (idempotency_key, request_hash, status_code, response_body, ttl, ttl, ttl, ttl))
+
+def purge_idempotency_keys():
+    """
+    删除已过期的幂等键
+    
+    Returns:
+        int: 删除的记录数
+    """
+    try:
+        with get_cursor(commit=True, name='purge_idempotency_keys') as cursor:
+            cursor.execute(
+                "DELETE FROM idempotency_keys WHERE create_time <= NOW() - INTERVAL %s SECOND",
+                (IDEMPOTENCY_CONFIG['ttl'],)
+            )
+            return cursor.rowcount
+    except Exception as e:
+        logger.error(f"清理过期幂等键失败: {e}")
+        return 0
+
+def _summary_key(value):
+    """摘要统计中使用的状态/部门名称，空值记为 未知"""
+    return value or '未知'
+
+def _summary_path(key):
+    """生成JSON对象中指定键的路径（键名加双引号，兼容中文和特殊字符）"""
+    return '$.' + json.dumps(key, ensure_ascii=False)
+
+def _load_json(value):
+    """解析JSON列的值（驱动可能返回str或bytes）"""
+    if value is None:
+        return {}
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode('utf-8')
+    return json.loads(value) if isinstance(value, str) else value
+
+def _increment_appeal_summary(cursor, record):
+    """
+    新增一条受理单后更新摘要表（调用方负责事务，须在插入受理单之后调用）
+    
+    只对已有的摘要行累加；摘要表中还没有该身份证号时（新的身份证号，或上线后尚未重建）按受理单记录
+    （含刚插入的这一条）重新计算，否则只计入这一条会让摘要查询不再回退为聚合查询，少算已有的受理单。
+    摘要行由 _lock_appeal_summaries 先插入占位行再锁定，不对不存在的键加间隙锁。
+    创建时间取刚插入的记录（LAST_INSERT_ID），数据库默认值生成的时间也能准确反映
+    
+    Args:
+        cursor: 数据库游标
+        record: 受理单数据
+    """
+    id_card_number = record.get('id_card_number')
+    if not id_card_number:
+        return
+    
+    _lock_appeal_summaries(cursor, [id_card_number])
+    cursor.execute(
+        "SELECT appeal_count FROM appeal_summaries WHERE id_card_number = %s FOR UPDATE", (id_card_number,)
+    )
+    row = cursor.fetchone()
+    if row is None or not row['appeal_count']:
+        # 刚插入的占位行
+        _refresh_appeal_summaries(cursor, [id_card_number])
+        return
+    
+    cursor.execute("SELECT create_time FROM appeal_records WHERE id = LAST_INSERT_ID()")
+    row = cursor.fetchone()
+    create_time = row['create_time'] if row else None
+    
+    status_path = _summary_path(_summary_key(record.get('handling_status')))
+    department_path = _summary_path(_summary_key(record.get('handling_department')))
+    
+    # MySQL按书写顺序执行赋值，person_name 必须在 latest_time 之前比较
+    query = """
+    UPDATE appeal_summaries SET
+        person_name = IF(latest_time IS NULL OR %s >= latest_time, %s, person_name),
+        latest_time = GREATEST(COALESCE(latest_time, %s), %s),
+        appeal_count = appeal_count + 1,
+        status_stats = JSON_SET(status_stats, %s, COALESCE(JSON_EXTRACT(status_stats, %s), 0) + 1),
+        department_stats = JSON_SET(department_stats, %s, COALESCE(JSON_EXTRACT(department_stats, %s), 0) + 1)
+    WHERE id_card_number = %s
+    """
+    cursor.execute(query, (
+        create_time, record.get('person_name'), create_time, create_time,
+        status_path, status_path, department_path, department_path,
+        id_card_number
+    ))
+
+def _fold_summary_groups(groups):
+    """
+    合并按 (办理状态, 办理部门) 分组的统计结果
+    
+    Args:
+        groups: 包含 handling_status, handling_department, count, latest_time 的分组行
+    
+    Returns:
+        tuple: (受理单数量, 最新受理时间, 状态统计, 部门统计)
+    """
+    appeal_count = 0
+    latest_time = None
+    status_stats = {}
+    department_stats = {}
+    
+    for row in groups:
+        appeal_count += row['count']
+        if latest_time is None or (row['latest_time'] and row['latest_time'] > latest_time):
+            latest_time = row['latest_time']
+        
+        status = _summary_key(row['handling_status'])
+        status_stats[status] = status_stats.get(status, 0) + row['count']
+        
+        department = _summary_key(row['handling_department'])
+        department_stats[department] = department_stats.get(department, 0) + row['count']
+    
+    return appeal_count, latest_time, status_stats, department_stats
+
+def _lock_appeal_summaries(cursor, id_card_numbers):
+    """
+    锁定指定身份证号的摘要行，须在本事务的第一次普通读取之前调用
+    
+    摘要表中还没有的身份证号先插入统计为0的占位行：INSERT ... ON DUPLICATE KEY UPDATE 对已有的行加记录锁，
+    新插入的行也只锁定该行。对不存在的键 SELECT ... FOR UPDATE 会锁定间隙，两个事务为同一间隙中的
+    不同新身份证号插入摘要时互相等待对方的间隙锁而死锁。调用方须在同一事务中对这些身份证号调用
+    _refresh_appeal_summaries，重新计算占位行（没有受理单的占位行会被删除）
+    
+    Args:
+        cursor: 数据库游标
+        id_card_numbers: 身份证号列表
+    """
+    if not id_card_numbers:
+        return
+    
+    # 按固定顺序加锁，多个身份证号的事务之间不会交叉等待
+    cursor.executemany("""
+    INSERT INTO appeal_summaries (id_card_number, appeal_count, status_stats, department_stats)
+    VALUES (%s, 0, '{}', '{}')
+    ON DUPLICATE KEY UPDATE id_card_number = id_card_number
+    """, [(id_card_number,) for id_card_number in sorted(set(id_card_numbers))])
+
+def _summary_source(placeholders):
+    """
+    生成摘要统计的受理单来源子查询：未归档和已归档的受理单（归档不改变摘要）
+    
+    Args:
+        placeholders: 身份证号的占位符列表（如 "%s, %s"），参数需要传入两遍
+    
+    Returns:
+        str: 可用于 FROM 的子查询
+    """
+    return f"""(
+        SELECT id, id_card_number, person_name, handling_status, handling_department, create_time
+        FROM appeal_records WHERE id_card_number IN ({placeholders})
+        UNION ALL
+        SELECT id, id_card_number, person_name, handling_status, handling_department, create_time
+        FROM appeal_records_archive WHERE id_card_number IN ({placeholders})
+    )"""
+
+def _refresh_appeal_summaries(cursor, id_card_numbers):
+    """
+    根据受理单记录（含已归档的受理单）重新计算指定身份证号的摘要（调用方负责事务）
+    
+    先锁定这些身份证号的摘要行（不存在时插入占位行），并发新增受理单的事务会在摘要更新处等待，
+    之后的统计读取能看到所有已提交的记录，不会遗漏或重复计算
+    
+    Args:
+        cursor: 数据库游标
+        id_card_numbers: 身份证号列表
+    
+    Returns:
+        int: 写入的摘要数量
+    """
+    if not id_card_numbers:
+        return 0
+    
+    source = _summary_source(', '.join(['%s'] * len(id_card_numbers)))
+    _lock_appeal_summaries(cursor, id_card_numbers)
+    
+    cursor.execute(f"""
+    SELECT id_card_number, handling_status, handling_department,
+           COUNT(*) AS count, MAX(create_time) AS latest_time
+    FROM {source} records
+    GROUP BY id_card_number, handling_status, handling_department
+    """, id_card_numbers * 2)
+    groups_by_id = {}
+    for row in cursor.fetchall():
+        groups_by_id.setdefault(row['id_card_number'], []).append(row)
+    
+    cursor.execute(f"""
+    SELECT id_card_number, person_name FROM (
+        SELECT id_card_number, person_name,
+               ROW_NUMBER() OVER (PARTITION BY id_card_number ORDER BY create_time DESC, id DESC) AS rn
+        FROM {source} records
+    ) latest
+    WHERE rn = 1
+    """, id_card_numbers * 2)
+    names = {row['id_card_number']: row['person_name'] for row in cursor.fetchall()}
+    
+    rows = []
+    for id_card_number, groups in groups_by_id.items():
+        appeal_count, latest_time, status_stats, department_stats = _fold_summary_groups(groups)
+        rows.append((
+            id_card_number, names.get(id_card_number), appeal_count, latest_time,
+            json.dumps(status_stats, ensure_ascii=False), json.dumps(department_stats, ensure_ascii=False)
+        ))
+    
+    if rows:
+        cursor.executemany("""
+        INSERT INTO appeal_summaries
+            (id_card_number, person_name, appeal_count, latest_time, status_stats, department_stats)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            person_name = VALUES(person_name),
+            appeal_count = VALUES(appeal_count),
+            latest_time = VALUES(latest_time),
+            status_stats = VALUES(status_stats),
+            department_stats = VALUES(department_stats)
+        """, rows)
+    
+    # 已没有受理单的身份证号删除摘要
+    stale = [id_card_number for id_card_number in id_card_numbers if id_card_number not in groups_by_id]
+    if stale:
+        cursor.execute(
+            f"DELETE FROM appeal_summaries WHERE id_card_number IN ({', '.join(['%s'] * len(stale))})",
+            stale
+        )
+    
+    return len(rows)
+
+def _list_month_partitions(cursor):
+    """
+    列出 appeal_records 的月份分区
+    
+    Args:
+        cursor: 数据库游标
+    
+    Returns:
+        list: 按时间排序的 [(分区名, 月份第一天)]，表未分区时返回None
+    """
+    cursor.execute("""
+    SELECT PARTITION_NAME AS name FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'appeal_records'
+    ORDER BY PARTITION_ORDINAL_POSITION
+    """)
+    names = [row['name'] for row in cursor.fetchall()]
+    if not names or names[0] is None:
+        return None
+    
+    partitions = []
+    for name in names:
+        match = re.match(r'^p(\d{4})(\d{2})$', name)
+        if match:
+            partitions.append((name, datetime.date(int(match.group(1)), int(match.group(2)), 1)))
+    return partitions
+
+def ensure_appeal_partitions(months_ahead=3):
+    """
+    提前创建 appeal_records 未来的月份分区（可重复执行，定期执行或服务启动时执行）
+    
+    新分区从 pmax 中拆分出来；pmax 正常情况下没有数据，拆分不需要复制记录。
+    维护漏执行时，超出最后一个月份分区的记录写入 pmax，不会因为没有分区而写入失败，
+    之后拆分时这些记录被复制到对应的月份分区。表中没有 pmax 分区时（如手工建表）先补上。
+    
+    Args:
+        months_ahead: 当前月份之后需要存在的分区数
+    
+    Returns:
+        int: 新建的分区数
+    """
+    try:
+        with get_cursor(name='ensure_appeal_partitions') as cursor:
+            partitions = _list_month_partitions(cursor)
+            if partitions is None:
+                logger.warning("appeal_records 未分区，请先执行 sql/migrations/005_appeal_records_partitioning.sql")
+                return 0
             
-            # 查询最新受理单时间
-            latest_query = "SELECT create_time FROM appeal_records WHERE id_card_number = %s ORDER BY create_time DESC LIMIT 1"
-            cursor.execute(latest_query, (id_card_number,))
-            latest_appeal = cursor.fetchone()['create_time'].strftime('%Y-%m-%d %H:%M:%S')
+            cursor.execute("""
+            SELECT COUNT(*) AS found FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'appeal_records' AND PARTITION_NAME = 'pmax'
+            """)
+            if not cursor.fetchone()['found']:
+                logger.warning("appeal_records 没有 pmax 分区，新增 pmax 兜底分区")
+                cursor.execute("ALTER TABLE appeal_records ADD PARTITION (PARTITION pmax VALUES LESS THAN MAXVALUE)")
+            else:
+                cursor.execute("SELECT 1 AS found FROM appeal_records PARTITION (pmax) LIMIT 1")
+                if cursor.fetchone():
+                    logger.warning("pmax 分区中已有记录（分区维护未按时执行），拆分新分区时将复制这些记录")
             
-            # 查询处理状态统计
-            status_query = """
-            SELECT handling_status, COUNT(*) as count 
-            FROM appeal_records 
-            WHERE id_card_number = %s 
-            GROUP BY handling_status
-            """
-            cursor.execute(status_query, (id_card_number,))
-            status_stats = {row['handling_status']: row['count'] for row in cursor.fetchall()}
-            
-            # 查询部门列表
-            dept_query = """
-            SELECT DISTINCT handling_department 
-            FROM appeal_records 
-            WHERE id_card_number = %s
-            """
-            cursor.execute(dept_query, (id_card_number,))
-            departments = [row['handling_department'] for row in cursor.fetchall()]
-            
-            return {
-                'person_name': person_name,
-                'appeal_count': appeal_count,
-                'latest_appeal': latest_appeal,
-                'handling_status_stats': status_stats,
-                'departments': departments
-            }
+            target = datetime.date.today().replace(day=1)
+            for _ in range(months_ahead):
+                target = _next_month(target)
+            
+            month = _next_month(partitions[-1][1]) if partitions else datetime.date.today().replace(day=1)
+            definitions = []
+            while month <= target:
+                definitions.append(_partition_definition(month))
+                month = _next_month(month)
+            if not definitions:
+                return 0
+            
+            # DDL会隐式提交，不放在事务中
+            cursor.execute(f"""
+            ALTER TABLE appeal_records REORGANIZE PARTITION pmax INTO (
+                {', '.join(definitions)},
+                PARTITION pmax VALUES LESS THAN MAXVALUE
+            )
+            """)
+        
+        logger.info(f"已为 appeal_records 新建 {len(definitions)} 个月份分区")
+        return len(definitions)
     except Exception as e:
-        print(f"获取受理单摘要失败: {e}")
-        return None
-    finally:
-        connection.close() 
\ No newline at end of file
+        logger.error(f"创建受理单分区失败: {e}")
+        return 0
+
+def archive_appeal_records(retention_days=730, statuses=('已结案',), batch_size=500):
+    """
+    将创建超过 retention_days 天且办理状态为 statuses 之一的受理单分批移入归档表
+    
+    每批一个事务：锁定一批记录，复制到归档表后删除。摘要同时统计已归档的受理单，归档不改变摘要。
+    条件中的 create_time 使查询只扫描过期的分区。
+    全部归档后，整个分区都早于保留期且已经没有记录的月份分区会被删除。
+    
+    Args:
+        retention_days: 保留天数
+        statuses: 可以归档的办理状态
+        batch_size: 每个事务归档的记录数
+    
+    Returns:
+        int: 归档的记录数
+    """
+    if not statuses:
+        return 0
+    
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=retention_days)
+    status_placeholders = ', '.join(['%s'] * len(statuses))
+    total = 0
+    
+    while True:
+        with transaction(name='archive_appeal_records') as cursor:
+            cursor.execute(f"""
+            SELECT id, case_number, id_card_number FROM appeal_records
+            WHERE create_time < %s AND handling_status IN ({status_placeholders})
+            ORDER BY create_time, id
+            LIMIT %s
+            FOR UPDATE
+            """, [cutoff, *statuses, batch_size])
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            
+            id_placeholders = ', '.join(['%s'] * len(rows))
+            ids = [row['id'] for row in rows]
+            cursor.execute(f"""
+            INSERT INTO appeal_records_archive
+            SELECT * FROM appeal_records WHERE create_time < %s AND id IN ({id_placeholders})
+            """, [cutoff, *ids])
+            cursor.execute(
+                f"DELETE FROM appeal_records WHERE create_time < %s AND id IN ({id_placeholders})",
+                [cutoff, *ids]
+            )
+            cursor.execute(f"DELETE FROM appeal_search_texts WHERE id IN ({id_placeholders})", ids)
+        
+        _notify_appeal_change([row['id_card_number'] for row in rows], [row['case_number'] for row in rows])
+        total += len(rows)
+        logger.info(f"受理单归档进度: {total} 条")
+    
+    if total:
+        _count_cache.clear()
+    _drop_empty_appeal_partitions(cutoff.date())
+    
+    logger.info(f"受理单归档完成，共 {total} 条")
+    return total
+
+# 删除分区前等待表锁的最长时间（秒），超时后放弃本次删除
+PARTITION_LOCK_WAIT_TIMEOUT = 30
+
+def _drop_empty_appeal_partitions(cutoff):
+    """
+    删除整个月份都早于 cutoff 且已经没有记录的分区；删除后该时间段再写入的记录落在后一个分区中
+    
+    检查分区为空和删除分区在 LOCK TABLES ... WRITE 期间完成：并发写入的旧日期记录
+    （如导入历史受理单）要么在加锁之前提交，分区不为空而保留；要么等到删除之后写入后一个分区，
+    不会随分区一起被删除
+    
+    Args:
+        cutoff: 保留期起始日期
+    
+    Returns:
+        int: 删除的分区数
+    """
+    try:
+        with get_cursor(name='drop_empty_appeal_partitions') as cursor:
+            partitions = _list_month_partitions(cursor) or []
+            candidates = []
+            # 至少保留一个月份分区
+            for name, month in partitions[:-1]:
+                if _next_month(month) > cutoff:
+                    break
+                candidates.append(name)
+            if not candidates:
+                return 0
+            
+            cursor.execute(f"SET SESSION lock_wait_timeout = {PARTITION_LOCK_WAIT_TIMEOUT}")
+            cursor.execute("LOCK TABLES appeal_records WRITE")
+            try:
+                dropped = []
+                for name in candidates:
+                    cursor.execute(f"SELECT 1 AS found FROM appeal_records PARTITION ({name}) LIMIT 1")
+                    if not cursor.fetchone():
+                        dropped.append(name)
+                
+                if dropped:
+                    cursor.execute(f"ALTER TABLE appeal_records DROP PARTITION {', '.join(dropped)}")
+                    logger.info(f"已删除没有记录的受理单分区: {', '.join(dropped)}")
+            finally:
+                cursor.execute("UNLOCK TABLES")
+                cursor.execute("SET SESSION lock_wait_timeout = DEFAULT")
+            return len(dropped)
+    except Exception as e:
+        logger.error(f"删除受理单分区失败: {e}")
+        return 0
+
+def refresh_imported_appeals(id_card_numbers, case_numbers):
+    """
+    绕过 add_appeal_records_batch 直接写入受理单表的导入（如 LOAD DATA）提交后调用：
+    在一个事务中重新计算这些身份证号的摘要，然后使计数缓存、共享缓存和Redis中对应的摘要和受理单失效
+    （配置了Redis时同时通知其他节点）
+    
+    Args:
+        id_card_numbers: 导入的受理单涉及的身份证号
+        case_numbers: 导入的案件编号
+    
+    Returns:
+        int: 写入的摘要数量
+    """
+    total = 0
+    id_card_numbers = sorted({value for value in id_card_numbers if value})
+    if id_card_numbers:
+        with get_cursor(commit=True, name='refresh_imported_appeals') as cursor:
+            total = _refresh_appeal_summaries(cursor, id_card_numbers)
+    
+    _count_cache.clear()
+    _notify_appeal_change(id_card_numbers, case_numbers)
+    return total
+
+def rebuild_appeal_summaries(chunk_size=500):
+    """
+    按受理单记录分批重建摘要表（上线摘要表或数据不一致时执行）
+    
+    按身份证号顺序每次处理 chunk_size 个（未归档和已归档的受理单中出现的身份证号），
+    每批一个事务，可在服务运行时执行：身份证号在自动提交的连接上列出，重建事务中第一条语句就是
+    锁定摘要行，统计读取的快照建立在加锁之后，不会漏掉列出之后并发提交的受理单
+    
+    Args:
+        chunk_size: 每批处理的身份证号数量
+    
+    Returns:
+        int: 重建的摘要数量
+    """
+    total = 0
+    last_id_card_number = ''
+    
+    while True:
+        # 列出身份证号的查询不能放在重建事务中：它是事务的第一次普通读取，会在锁定摘要行之前建立快照，
+        # 之后的统计看不到这期间提交的受理单，覆盖掉这些受理单已累加的摘要
+        with get_cursor(auto_commit=True, name='rebuild_appeal_summaries') as cursor:
+            cursor.execute("""
+            SELECT id_card_number FROM (
+                SELECT DISTINCT id_card_number FROM appeal_records WHERE id_card_number > %s
+                UNION
+                SELECT DISTINCT id_card_number FROM appeal_records_archive WHERE id_card_number > %s
+            ) id_cards
+            ORDER BY id_card_number
+            LIMIT %s
+            """, (last_id_card_number, last_id_card_number, chunk_size))
+            id_card_numbers = [row['id_card_number'] for row in cursor.fetchall()]
+        if not id_card_numbers:
+            break
+        
+        with get_cursor(commit=True, name='rebuild_appeal_summaries') as cursor:
+            total += _refresh_appeal_summaries(cursor, id_card_numbers)
+        
+        last_id_card_number = id_card_numbers[-1]
+        logger.info(f"受理单摘要重建进度: {total} 个身份证号，最后处理 {last_id_card_number}")
+    
+    # 清理已不存在受理单的摘要
+    with get_cursor(commit=True, name='rebuild_appeal_summaries') as cursor:
+        cursor.execute("""
+        DELETE s FROM appeal_summaries s
+        WHERE NOT EXISTS (SELECT 1 FROM appeal_records r WHERE r.id_card_number = s.id_card_number)
+          AND NOT EXISTS (SELECT 1 FROM appeal_records_archive a WHERE a.id_card_number = s.id_card_number)
+        """)
+    
+    logger.info(f"受理单摘要重建完成，共 {total} 个身份证号")
+    return total
+
+def update_appeal_status(case_number, handling_status):
+    """
+    更新受理单的办理状态，并在同一事务中调整摘要表的状态统计
+    
+    Args:
+        case_number: 案件编号
+        handling_status: 新的办理状态
+    
+    Returns:
+        tuple: (成功标志, 消息)
+    """
+    try:
+        with get_cursor(commit=True, name='update_appeal_status') as cursor:
+            cursor.execute(
+                "SELECT id, id_card_number, handling_status FROM appeal_records WHERE case_number = %s FOR UPDATE",
+                (case_number,)
+            )
+            record = cursor.fetchone()
+            if not record:
+                return False, f"未找到案件编号为 {case_number} 的受理单记录"
+            
+            if record['handling_status'] == handling_status:
+                return True, "办理状态未变化"
+            
+            cursor.execute(
+                "UPDATE appeal_records SET handling_status = %s WHERE id = %s",
+                (handling_status, record['id'])
+            )
+            
+            if record['id_card_number']:
+                cursor.execute(
+                    "SELECT status_stats FROM appeal_summaries WHERE id_card_number = %s FOR UPDATE",
+                    (record['id_card_number'],)
+                )
+                summary = cursor.fetchone()
+                # 没有摘要的身份证号（尚未重建）不处理，重建时会按最新状态统计
+                if summary:
+                    status_stats = _load_json(summary['status_stats'])
+                    old_status = _summary_key(record['handling_status'])
+                    new_status = _summary_key(handling_status)
+                    
+                    status_stats[old_status] = status_stats.get(old_status, 0) - 1
+                    if status_stats[old_status] <= 0:
+                        del status_stats[old_status]
+                    status_stats[new_status] = status_stats.get(new_status, 0) + 1
+                    
+                    cursor.execute(
+                        "UPDATE appeal_summaries SET status_stats = %s WHERE id_card_number = %s",
+                        (json.dumps(status_stats, ensure_ascii=False), record['id_card_number'])
+                    )
+        
+        _notify_appeal_change([record['id_card_number']], [case_number])
+        return True, "办理状态更新成功"
+    except Exception as e:
+        logger.error(f"更新办理状态失败: {e}")
+        return False, f"更新办理状态失败: {e}"
+
+def get_appeal_summary_by_id_card(id_card_number):
+    """
+    获取用户的受理单摘要信息
+    
+    先查受理单缓存；未命中时优先按主键读取摘要表，摘要表中没有该身份证号时（如尚未重建）
+    回退为一条聚合查询，受理单表的分组统计只需扫描 idx_appeal_id_card_summary 覆盖索引，
+    归档表按 idx_archive_id_card_time 查找（摘要包含已归档的受理单）
+    
+    Args:
+        id_card_number: 身份证号
+    
+    Returns:
+        dict: 摘要信息，没有记录或查询失败时返回None
+    """
+    cache_key = f"summary:{id_card_number}"
+    if SHARED_CACHE_CONFIG['enabled']:
+        summary = _appeal_cache.get(cache_key)
+        if summary is not MISSING:
+            return summary
+        token = _appeal_cache.begin(cache_key)
+    
+    # 写入缓存的结果读主库，避免延迟的副本把失效前的摘要重新放回缓存
+    summary = _query_appeal_summary(id_card_number, readonly=not SHARED_CACHE_CONFIG['enabled'])
+    if summary is not None and SHARED_CACHE_CONFIG['enabled']:
+        _appeal_cache.set(cache_key, summary, token)
+    return summary
+
+def _query_appeal_summary(id_card_number, readonly=True):
+    """
+    从数据库查询受理单摘要（不经过受理单缓存）
+    
+    Args:
+        id_card_number: 身份证号
+        readonly: 是否可以读副本
+    
+    Returns:
+        dict: 摘要信息，没有记录或查询失败时返回None
+    """
+    try:
+        with get_cursor(name='get_appeal_summary_by_id_card', readonly=readonly) as cursor:
+            cursor.execute("SELECT * FROM appeal_summaries WHERE id_card_number = %s", (id_card_number,))
+            summary = cursor.fetchone()
+            
+            if summary:
+                person_name = summary['person_name']
+                appeal_count = summary['appeal_count']
+                latest_time = summary['latest_time']
+                status_stats = _load_json(summary['status_stats'])
+                department_stats = _load_json(summary['department_stats'])
+            else:
+                source = _summary_source('%s')
+                query = f"""
+                SELECT handling_status, handling_department,
+                       COUNT(*) AS count, MAX(create_time) AS latest_time,
+                       (SELECT person_name FROM {source} named
+                        ORDER BY create_time DESC, id DESC LIMIT 1) AS person_name
+                FROM {source} records
+                GROUP BY handling_status, handling_department
+                """
+                cursor.execute(query, (id_card_number,) * 4)
+                groups = cursor.fetchall()
+                
+                if not groups:
+                    return None
+                
+                person_name = groups[0]['person_name']
+                appeal_count, latest_time, status_stats, department_stats = _fold_summary_groups(groups)
+        
+        if not appeal_count:
+            return None
+        
+        return {
+            'person_name': person_name,
+            'appeal_count': appeal_count,
+            'latest_appeal': latest_time.strftime('%Y-%m-%d %H:%M:%S') if latest_time else None,
+            'handling_status_stats': status_stats,
+            'departments': list(department_stats)
+        }
+    except Exception as e:
+        logger.error(f"获取受理单摘要失败: {e}")
+        return None 
\ No newline at end of file
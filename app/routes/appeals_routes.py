@@ -1,10 +1,23 @@
 """
 受理单相关路由
 """
-from flask import request, jsonify
+import datetime
+from flask import Response, request, jsonify
 from app.routes import appeals_blueprint
 from app.services import appeal_record_service
 from app.utils.auth import require_token
+from app.utils.idempotency import idempotent
+from app.utils.pagination import decode_cursor
+from app.validators import APPEAL_FIELDS, APPEAL_LIST_COLUMNS, validate_date
+
+# 导出格式对应的响应类型
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+# 全文检索词的最小长度，与MySQL ngram分词的 ngram_token_size（默认2）一致，更短的词无法命中索引
+FULLTEXT_MIN_LENGTH = 2
 
 @appeals_blueprint.route('/summary', methods=['GET'])
 @require_token
@@ -51,10 +64,13 @@ def get_appeal_summary():
 
 @appeals_blueprint.route('', methods=['POST'])
 @require_token
+@idempotent
 def add_appeal_record():
     """
     添加受理单记录API端点
     
+    可选请求头 Idempotency-Key：重试时携带相同的值，直接返回首次请求的响应（响应头 Idempotent-Replayed: true）
+    
     请求体示例:
     {
         "case_number": "MTDJ-20250517-112318-123456",
@@ -100,6 +116,202 @@ def add_appeal_record():
     result = appeal_record_service.add_appeal_record(data)
     return jsonify(result)
 
+@appeals_blueprint.route('/batch', methods=['POST'])
+@require_token
+@idempotent
+def add_appeal_records_batch():
+    """
+    批量添加受理单记录API端点
+    
+    每条记录的字段与单条添加接口相同，单次最多 BATCH_MAX_RECORDS 条；
+    按 BATCH_CHUNK_SIZE 条一个事务写入，部分记录失败不影响其他记录。
+    支持 Idempotency-Key 请求头，用法与单条添加接口相同
+    
+    请求体示例:
+    {
+        "records": [
+            {
+                "case_number": "MTDJ-20250517-112318-123456",
+                "person_name": "张三",
+                "id_card_number": "330102199001011234",
+                ...
+            },
+            // 更多记录...
+        ]
+    }
+    
+    响应示例:
+    {
+        "success": 0,
+        "message": "批量添加完成，成功 1 条，失败 1 条",
+        "data": {
+            "total": 2,
+            "succeeded": 1,
+            "failed": 1,
+            "results": [
+                {"index": 0, "case_number": "MTDJ-20250517-112318-123456", "success": 1, "message": "受理单记录添加成功"},
+                {"index": 1, "case_number": "MTDJ-20250516-112318-288808", "success": 0, "message": "案件编号 MTDJ-20250516-112318-288808 已存在"}
+            ]
+        }
+    }
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('records'), list) or not data['records']:
+        return jsonify({
+            "success": 0,
+            "message": "请求体为空或格式错误，应为 {\"records\": [...]}",
+            "data": {}
+        }), 400
+    
+    result = appeal_record_service.add_appeal_records_batch(data['records'])
+    if not result['data']:
+        return jsonify(result), 400
+    return jsonify(result)
+
+@appeals_blueprint.route('/export', methods=['GET'])
+@require_token
+def export_appeals():
+    """
+    流式导出受理单记录API端点
+    
+    按创建时间顺序边查询边输出，不会把全部记录读入内存；单个导出按 EXPORT_MAX_ROWS_PER_SECOND 限速。
+    
+    查询参数:
+    - format: 导出格式，ndjson（默认，每行一个JSON对象）/csv（可选）
+    - start_date: 起始日期（包含），格式 YYYY-MM-DD（可选）
+    - end_date: 结束日期（包含），格式 YYYY-MM-DD（可选）
+    - status: 处理状态（可选）
+    - department: 处理部门（可选）
+    - fields: 导出的字段（可选），默认 all 导出全部字段；list 只导出列表展示用的字段；
+      也可以用逗号分隔指定字段，如 case_number,person_name,handling_status
+    
+    响应示例(ndjson):
+    {"id": 1, "case_number": "MTDJ-20250516-112318-288808", "person_name": "陈忠", ...}
+    {"id": 2, "case_number": "MTDJ-20250517-112318-123456", "person_name": "张三", ...}
+    
+    响应示例(失败):
+    {
+        "success": 0,
+        "message": "参数格式错误: start_date",
+        "data": {}
+    }
+    """
+    export_format = request.args.get('format', 'ndjson').strip().lower()
+    if export_format not in EXPORT_MIMETYPES:
+        return jsonify({
+            "success": 0,
+            "message": "参数格式错误: format（支持 ndjson/csv）",
+            "data": {}
+        }), 400
+    
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    for name, value in (('start_date', start_date), ('end_date', end_date)):
+        if value and not validate_date(value, ['%Y-%m-%d']):
+            return jsonify({
+                "success": 0,
+                "message": f"参数格式错误: {name}",
+                "data": {}
+            }), 400
+    
+    columns, error_response = _parse_fields(default='all')
+    if error_response:
+        return error_response
+    
+    chunks, error = appeal_record_service.export_appeal_records(
+        export_format,
+        start_date=start_date,
+        end_date=end_date,
+        status=request.args.get('status'),
+        department=request.args.get('department'),
+        columns=columns
+    )
+    if error:
+        return jsonify(error), 500
+    
+    filename = f"appeals_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.{export_format}"
+    response = Response(chunks, mimetype=EXPORT_MIMETYPES[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # 关闭反向代理的响应缓冲，数据按批次到达客户端
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@appeals_blueprint.route('/<case_number>/status', methods=['PUT'])
+@require_token
+def update_appeal_status(case_number):
+    """
+    更新受理单办理状态API端点
+    
+    请求体示例:
+    {
+        "handling_status": "已结案"
+    }
+    
+    响应示例(成功):
+    {
+        "success": 1,
+        "message": "办理状态更新成功",
+        "data": {
+            "case_number": "MTDJ-20250517-112318-123456",
+            "handling_status": "已结案"
+        }
+    }
+    
+    响应示例(失败):
+    {
+        "success": 0,
+        "message": "未找到案件编号为 xxx 的受理单记录",
+        "data": {}
+    }
+    """
+    data = request.get_json(silent=True)
+    if not data or not data.get('handling_status'):
+        return jsonify({
+            "success": 0,
+            "message": "缺少必要参数: handling_status",
+            "data": {}
+        }), 400
+    
+    result = appeal_record_service.update_appeal_status(case_number, data['handling_status'])
+    return jsonify(result)
+
+@appeals_blueprint.route('/<case_number>', methods=['GET'])
+@require_token
+def get_appeal_record(case_number):
+    """
+    按案件编号获取完整受理单记录API端点（列表接口默认不返回的大文本字段在这里获取）
+    
+    查询参数:
+    - include_archive: 是否同时查询已归档的受理单，true/false（默认）（可选）
+    
+    响应示例(成功):
+    {
+        "success": 1,
+        "message": "查询成功",
+        "data": {
+            "id": 1,
+            "case_number": "MTDJ-20250516-112318-288808",
+            "person_name": "陈忠",
+            "incident_description": "...",
+            "markdown_doc": "# 受理单详情...",
+            ...
+        }
+    }
+    
+    响应示例(失败):
+    {
+        "success": 0,
+        "message": "未找到案件编号为 xxx 的受理单记录",
+        "data": {}
+    }
+    """
+    include_archive, error_response = _parse_include_archive()
+    if error_response:
+        return error_response
+    
+    result = appeal_record_service.get_appeal_record_by_case_number(case_number, include_archive=include_archive)
+    return jsonify(result)
+
 @appeals_blueprint.route('/search', methods=['GET'])
 @require_token
 def search_appeals():
@@ -108,9 +320,16 @@ def search_appeals():
     
     查询参数:
     - value: 查询值（必填）
-    - type: 查询类型(id_card_number/case_number/contact_info)，可选
+    - type: 查询类型(id_card_number/case_number/contact_info)，可选；不传且无法从查询值判断类型时，
+      在身份证号、联系方式、案件编号、姓名中一次查询，精确匹配排在前面，其次是案件编号和姓名的前缀匹配，
+      每条记录的 matched_field 为匹配到的字段
     - limit: 返回记录数量限制，默认20条（可选）
     - offset: 起始偏移量，默认0（可选）
+    - cursor: 游标，取上一页响应中的 next_cursor（可选，传入时忽略offset）
+    - include_total: 是否统计总记录数，true（默认）/false，为false时total为null（可选）
+    - fields: 返回的字段（可选），默认 list 只返回列表展示用的字段；all 返回全部字段；
+      也可以用逗号分隔指定字段，如 case_number,person_name,handling_status
+    - include_archive: 是否同时查询已归档的受理单，true/false（默认）（可选）
     
     响应示例(成功):
     {
@@ -118,6 +337,8 @@ def search_appeals():
         "message": "查询成功，共找到 5 条记录，返回 5 条",
         "data": {
             "total": 5,
+            "total_estimated": false,
+            "next_cursor": null,
             "records": [
                 {
                     "id": 1,
@@ -164,12 +385,153 @@ def search_appeals():
     except:
         offset = 0
     
+    after, error_response = _parse_cursor()
+    if error_response:
+        return error_response
+    
+    include_total, error_response = _parse_include_total()
+    if error_response:
+        return error_response
+    
+    columns, error_response = _parse_fields()
+    if error_response:
+        return error_response
+    
+    include_archive, error_response = _parse_include_archive()
+    if error_response:
+        return error_response
+    
     # 调用服务
     result = appeal_record_service.search_appeal_records(
         search_value, 
         search_type, 
         limit, 
-        offset
+        offset,
+        after,
+        include_total=include_total,
+        columns=columns,
+        include_archive=include_archive
+    )
+    
+    return jsonify(result)
+
+@appeals_blueprint.route('/fulltext', methods=['GET'])
+@require_token
+def fulltext_search_appeals():
+    """
+    全文检索受理单API端点
+    
+    在事件描述、事件地点、地址中检索，结果按相关度从高到低排序，每条记录的 relevance 为相关度。
+    只检索未归档的受理单。
+    
+    查询参数:
+    - q: 检索词，至少2个字符（必填）
+    - mode: 检索模式，natural（默认，按相关度匹配检索词中的任意片段）/phrase（只返回包含完整检索词的记录）（可选）
+    - status: 处理状态（可选）
+    - department: 处理部门（可选）
+    - start_date: 起始日期（包含），格式 YYYY-MM-DD（可选）
+    - end_date: 结束日期（包含），格式 YYYY-MM-DD（可选）
+    - limit: 返回记录数量限制，默认20条（可选）
+    - offset: 起始偏移量，默认0（可选）
+    - include_total: 是否统计总记录数，true（默认）/false，为false时total为null（可选）
+    - fields: 返回的字段（可选），默认 list 只返回列表展示用的字段；all 返回全部字段；
+      也可以用逗号分隔指定字段，如 case_number,person_name,handling_status
+    
+    响应示例(成功):
+    {
+        "success": 1,
+        "message": "查询成功，共找到 12 条记录，返回 12 条",
+        "data": {
+            "total": 12,
+            "total_estimated": false,
+            "next_cursor": null,
+            "records": [
+                {
+                    "id": 1,
+                    "case_number": "MTDJ-20250516-112318-288808",
+                    "person_name": "陈忠",
+                    "relevance": 3.2451,
+                    ...
+                },
+                // 更多记录...
+            ]
+        }
+    }
+    
+    响应示例(失败):
+    {
+        "success": 0,
+        "message": "参数格式错误: q（至少2个字符）",
+        "data": {
+            "total": 0,
+            "records": []
+        }
+    }
+    """
+    keywords = (request.args.get('q') or '').strip()
+    if len(keywords) < FULLTEXT_MIN_LENGTH:
+        return jsonify({
+            "success": 0,
+            "message": f"参数格式错误: q（至少{FULLTEXT_MIN_LENGTH}个字符）",
+            "data": {
+                "total": 0,
+                "records": []
+            }
+        }), 400
+    
+    mode = request.args.get('mode', 'natural').strip().lower()
+    if mode not in ('natural', 'phrase'):
+        return jsonify({
+            "success": 0,
+            "message": "参数格式错误: mode（支持 natural/phrase）",
+            "data": {
+                "total": 0,
+                "records": []
+            }
+        }), 400
+    
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    for name, value in (('start_date', start_date), ('end_date', end_date)):
+        if value and not validate_date(value, ['%Y-%m-%d']):
+            return jsonify({
+                "success": 0,
+                "message": f"参数格式错误: {name}",
+                "data": {
+                    "total": 0,
+                    "records": []
+                }
+            }), 400
+    
+    try:
+        limit = int(request.args.get('limit', 20))
+    except:
+        limit = 20
+        
+    try:
+        offset = int(request.args.get('offset', 0))
+    except:
+        offset = 0
+    
+    include_total, error_response = _parse_include_total()
+    if error_response:
+        return error_response
+    
+    columns, error_response = _parse_fields()
+    if error_response:
+        return error_response
+    
+    result = appeal_record_service.fulltext_search_appeal_records(
+        keywords,
+        mode=mode,
+        status=request.args.get('status'),
+        department=request.args.get('department'),
+        start_date=start_date,
+        end_date=end_date,
+        limit=limit,
+        offset=offset,
+        include_total=include_total,
+        columns=columns
     )
     
     return jsonify(result)
@@ -183,6 +545,14 @@ def get_all_appeals():
     查询参数:
     - limit: 返回记录数量限制，默认100条（可选）
     - offset: 起始偏移量，默认0（可选）
+    - cursor: 游标，取上一页响应中的 next_cursor（可选，传入时忽略offset）；
+      深翻页时应使用游标而不是offset
+    - include_total: 是否统计总记录数（可选）
+      - true（默认）: 精确总数，短时间内缓存
+      - estimate: 根据表统计信息估算的总数，total_estimated为true
+      - false: 不统计，total为null
+    - fields: 返回的字段（可选），默认 list 只返回列表展示用的字段；all 返回全部字段；
+      也可以用逗号分隔指定字段，如 case_number,person_name,handling_status
     
     响应示例(成功):
     {
@@ -190,6 +560,8 @@ def get_all_appeals():
         "message": "查询成功，共找到 150 条记录，返回 100 条",
         "data": {
             "total": 150,
+            "total_estimated": false,
+            "next_cursor": "WyIyMDI0LTAyLTEyIDEyOjMyOjIzIiwxXQ",
             "records": [
                 {
                     "id": 1,
@@ -223,11 +595,127 @@ def get_all_appeals():
     except:
         offset = 0
     
+    after, error_response = _parse_cursor()
+    if error_response:
+        return error_response
+    
+    include_total, error_response = _parse_include_total(allow_estimate=True)
+    if error_response:
+        return error_response
+    
+    columns, error_response = _parse_fields()
+    if error_response:
+        return error_response
+    
     # 调用服务
-    result = appeal_record_service.get_all_appeals(limit, offset)
+    result = appeal_record_service.get_all_appeals(limit, offset, after, include_total=include_total, columns=columns)
     
     return jsonify(result)
 
+def _parse_cursor():
+    """
+    解析查询参数中的分页游标
+    
+    Returns:
+        tuple: (游标位置或None, 参数错误时的响应或None)
+    """
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return None, None
+    
+    try:
+        return decode_cursor(cursor), None
+    except ValueError:
+        return None, (jsonify({
+            "success": 0,
+            "message": "参数格式错误: cursor",
+            "data": {
+                "total": 0,
+                "records": []
+            }
+        }), 400)
+
+def _parse_include_total(allow_estimate=False):
+    """
+    解析查询参数中的 include_total
+    
+    Args:
+        allow_estimate: 是否允许取值 estimate
+    
+    Returns:
+        tuple: (True/False/'estimate', 参数错误时的响应或None)
+    """
+    value = request.args.get('include_total', 'true').strip().lower()
+    if value in ('true', '1', 'yes'):
+        return True, None
+    if value in ('false', '0', 'no'):
+        return False, None
+    if value == 'estimate' and allow_estimate:
+        return 'estimate', None
+    
+    return None, (jsonify({
+        "success": 0,
+        "message": "参数格式错误: include_total",
+        "data": {
+            "total": 0,
+            "records": []
+        }
+    }), 400)
+
+def _parse_include_archive():
+    """
+    解析查询参数中的 include_archive
+    
+    Returns:
+        tuple: (是否查询归档表, 参数错误时的响应或None)
+    """
+    value = request.args.get('include_archive', 'false').strip().lower()
+    if value in ('true', '1', 'yes'):
+        return True, None
+    if value in ('false', '0', 'no'):
+        return False, None
+    
+    return None, (jsonify({
+        "success": 0,
+        "message": "参数格式错误: include_archive",
+        "data": {
+            "total": 0,
+            "records": []
+        }
+    }), 400)
+
+def _parse_fields(default='list'):
+    """
+    解析查询参数中的 fields
+    
+    Args:
+        default: 未传入 fields 时使用的值
+    
+    Returns:
+        tuple: (字段列表或None（全部字段）, 参数错误时的响应或None)
+    """
+    value = request.args.get('fields', default).strip()
+    if value == 'list':
+        return list(APPEAL_LIST_COLUMNS), None
+    if value == 'all':
+        return None, None
+    
+    columns = []
+    for column in value.split(','):
+        column = column.strip()
+        if column != 'id' and column not in APPEAL_FIELDS:
+            return None, (jsonify({
+                "success": 0,
+                "message": f"参数格式错误: fields（不支持的字段 {column}）",
+                "data": {
+                    "total": 0,
+                    "records": []
+                }
+            }), 400)
+        if column not in columns:
+            columns.append(column)
+    return columns, None
+
 # 支持OPTIONS请求的路由
 @appeals_blueprint.route('/summary', methods=['OPTIONS'])
 def options_appeal_summary():
@@ -243,7 +731,7 @@ def options_appeals():
     """处理受理单API的OPTIONS请求"""
     response = jsonify({})
     response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,token')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,token,Idempotency-Key')
     response.headers.add('Access-Control-Allow-Methods', 'POST,OPTIONS')
     return response
 
@@ -263,4 +751,49 @@ def options_appeals_search():
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,token')
     response.headers.add('Access-Control-Allow-Methods', 'GET,OPTIONS')
-    return response 
\ No newline at end of file
+    return response 
+
+@appeals_blueprint.route('/fulltext', methods=['OPTIONS'])
+def options_appeals_fulltext():
+    """处理全文检索受理单API的OPTIONS请求"""
+    response = jsonify({})
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,token')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,OPTIONS')
+    return response
+
+@appeals_blueprint.route('/export', methods=['OPTIONS'])
+def options_appeals_export():
+    """处理导出受理单API的OPTIONS请求"""
+    response = jsonify({})
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,token')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,OPTIONS')
+    return response
+
+@appeals_blueprint.route('/<case_number>/status', methods=['OPTIONS'])
+def options_appeal_status(case_number):
+    """处理更新办理状态API的OPTIONS请求"""
+    response = jsonify({})
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,token')
+    response.headers.add('Access-Control-Allow-Methods', 'PUT,OPTIONS')
+    return response
+
+@appeals_blueprint.route('/batch', methods=['OPTIONS'])
+def options_appeals_batch():
+    """处理批量添加受理单API的OPTIONS请求"""
+    response = jsonify({})
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,token,Idempotency-Key')
+    response.headers.add('Access-Control-Allow-Methods', 'POST,OPTIONS')
+    return response
+
+@appeals_blueprint.route('/<case_number>', methods=['OPTIONS'])
+def options_appeal_record(case_number):
+    """处理获取单个受理单API的OPTIONS请求"""
+    response = jsonify({})
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,token')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,OPTIONS')
+    return response
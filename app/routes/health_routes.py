@@ -1,9 +1,11 @@
 """
 健康检查路由
 """
-from flask import jsonify
+from flask import jsonify, Response
 from app.routes import health_blueprint
+from app.utils.auth import require_token
 from app.utils.cors_handler import cors_preflight
+from app.utils import metrics
 
 @health_blueprint.route('/health', methods=['GET'])
 @cors_preflight(['GET', 'OPTIONS'])
@@ -12,4 +14,16 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "version": "1.0.0"
-    }) 
\ No newline at end of file
+    })
+
+@health_blueprint.route('/metrics', methods=['GET'])
+@require_token
+def metrics_endpoint():
+    """
+    运行指标API端点 - 以Prometheus文本格式返回连接池和SQL执行指标
+    
+    gunicorn多worker部署时返回所有worker汇总后的指标；
+    默认在 TOKEN_CONFIG['exclude_paths'] 中，抓取时无需令牌
+    """
+    body, content_type = metrics.render_metrics()
+    return Response(body, content_type=content_type)
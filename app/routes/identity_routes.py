@@ -56,6 +56,63 @@ def verify_identity():
     return jsonify(result), status_code
 
 
+@identity_blueprint.route('/verify/batch', methods=['POST'])
+@require_token
+def verify_identities():
+    """
+    批量身份验证API端点 - 一次验证多个身份证号（如同一户家庭成员）
+    
+    请求体示例:
+    {
+        "id_card_numbers": ["330102199001011234", "330102199009099999"]
+    }
+    
+    响应示例:
+    {
+        "success": 0,
+        "message": "批量验证完成，通过 1 个，未通过 1 个",
+        "data": {
+            "total": 2,
+            "verified": 1,
+            "failed": 1,
+            "results": [
+                {
+                    "success": 1,
+                    "message": "身份证号验证通过",
+                    "data": {
+                        "id_card_number": "330102199001011234",
+                        "name": "张三",
+                        "contact_info": "13800138001",
+                        "address": "浙江省杭州市西湖区文三路123号"
+                    }
+                },
+                {
+                    "success": 0,
+                    "message": "身份证号 330102199009099999 在系统中不存在",
+                    "data": {}
+                }
+            ]
+        }
+    }
+    """
+    data = request.get_json(silent=True)
+    
+    # 检查必要字段
+    if not isinstance(data, dict) or not isinstance(data.get('id_card_numbers'), list) or not data['id_card_numbers']:
+        return jsonify({
+            "success": 0,
+            "message": "缺少必要字段: id_card_numbers",
+            "data": {}
+        }), 400
+    
+    # 调用验证服务
+    result = verification_service.verify_identities(data['id_card_numbers'])
+    if not result['data']:
+        return jsonify(result), 400
+    
+    return jsonify(result)
+
+
 @identity_blueprint.route('/status', methods=['GET'])
 @require_token
 def verification_status():
@@ -108,6 +165,17 @@ def options_identity_verify():
     return response
 
 
+@identity_blueprint.route('/verify/batch', methods=['OPTIONS'])
+def options_identity_verify_batch():
+    """处理批量身份验证API的OPTIONS请求"""
+    response = jsonify({})
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers',
+                         'Content-Type,Authorization,token')
+    response.headers.add('Access-Control-Allow-Methods', 'POST,OPTIONS')
+    return response
+
+
 @identity_blueprint.route('/status', methods=['OPTIONS'])
 def options_identity_status():
     """处理身份验证状态API的OPTIONS请求"""
@@ -1,11 +1,80 @@
 """
 受理单记录服务 - 处理历史受理单记录的相关功能
 """
+import csv
+import io
+import json
+import logging
 import time
 import datetime
+from app.config import BATCH_CONFIG, EXPORT_CONFIG, SINGLEFLIGHT_CONFIG
 from app.models import database
+from app.utils.singleflight import SingleFlight
+from app.validators import validate_appeal_record
 
-def get_appeal_records_by_id_card(id_card_number, limit=20, offset=0):
+logger = logging.getLogger(__name__)
+
+# 同一worker内相同的并发查询只执行一次；受理单变更提交后，新到达的查询不再共享变更前开始的查询
+_flights = SingleFlight('appeals', timeout=SINGLEFLIGHT_CONFIG['timeout'])
+database.add_appeal_change_listener(lambda id_card_numbers, case_numbers: _flights.forget_all())
+
+def _coalesce(key, func):
+    """
+    合并同一个键上的并发查询
+    
+    Args:
+        key: 查询的键
+        func: 执行查询的无参数函数
+        
+    Returns:
+        func 的返回值
+    """
+    if not SINGLEFLIGHT_CONFIG['enabled']:
+        return func()
+    return _flights.do(key, func)
+
+def _page_response(total, records, next_cursor, not_found_message, estimated=False):
+    """
+    构建分页查询的响应
+    
+    Args:
+        total: 总记录数，未统计时为None
+        records: 本页记录
+        next_cursor: 下一页游标
+        not_found_message: 没有记录时的提示信息
+        estimated: 总数是否为根据表统计信息得到的估算值
+        
+    Returns:
+        dict: 查询结果
+    """
+    if records or total:
+        if total is None:
+            message = f"查询成功，返回 {len(records)} 条"
+        elif estimated:
+            message = f"查询成功，约 {total} 条记录，返回 {len(records)} 条"
+        else:
+            message = f"查询成功，共找到 {total} 条记录，返回 {len(records)} 条"
+        return {
+            "success": 1,
+            "message": message,
+            "data": {
+                "total": total,
+                "total_estimated": estimated,
+                "records": records,
+                "next_cursor": next_cursor
+            }
+        }
+    else:
+        return {
+            "success": 0,
+            "message": not_found_message,
+            "data": {
+                "total": 0 if total is not None else None,
+                "records": []
+            }
+        }
+
+def get_appeal_records_by_id_card(id_card_number, limit=20, offset=0, after=None, include_total=True, columns=None):
     """
     根据身份证号获取受理单记录
     
@@ -13,6 +82,9 @@ def get_appeal_records_by_id_card(id_card_number, limit=20, offset=0):
         id_card_number: 身份证号
         limit: 最大返回数量
         offset: 跳过记录数
+        after: 游标分页位置（传入时忽略offset）
+        include_total: 是否统计总记录数（False时total为null，只执行一条分页查询）
+        columns: 返回的字段，None表示全部字段
         
     Returns:
         dict: 查询结果
@@ -29,38 +101,28 @@ def get_appeal_records_by_id_card(id_card_number, limit=20, offset=0):
         }
     
     # 查询记录
-    total, records = database.get_appeal_records_by_id_card(
+    total, records, next_cursor = database.get_appeal_records_by_id_card(
         id_card_number, 
         limit=limit, 
-        offset=offset
+        offset=offset,
+        after=after,
+        include_total=bool(include_total),
+        columns=columns
     )
     
     # 构建响应
-    if total > 0:
-        return {
-            "success": 1,
-            "message": f"查询成功，共找到 {total} 条记录，返回 {len(records)} 条",
-            "data": {
-                "total": total,
-                "records": records
-            }
-        }
-    else:
-        return {
-            "success": 0,
-            "message": f"未找到身份证号为 {id_card_number} 的受理单记录",
-            "data": {
-                "total": 0,
-                "records": []
-            }
-        }
+    return _page_response(
+        total, records, next_cursor,
+        f"未找到身份证号为 {id_card_number} 的受理单记录"
+    )
 
-def get_appeal_record_by_case_number(case_number):
+def get_appeal_record_by_case_number(case_number, include_archive=False):
     """
     根据案件编号获取受理单记录
     
     Args:
         case_number: 案件编号
+        include_archive: 是否同时查询归档的受理单
         
     Returns:
         dict: 查询结果
@@ -74,7 +136,7 @@ def get_appeal_record_by_case_number(case_number):
         }
     
     # 查询记录
-    record = database.get_appeal_record_by_case_number(case_number)
+    record = database.get_appeal_record_by_case_number(case_number, include_archive=include_archive)
     
     # 构建响应
     if record:
@@ -90,15 +152,48 @@ def get_appeal_record_by_case_number(case_number):
             "data": {}
         }
 
-def search_appeal_records(search_value, search_type=None, limit=20, offset=0):
+def search_appeal_records(search_value, search_type=None, limit=20, offset=0, after=None, include_total=True,
+                          columns=None, include_archive=False):
     """
     通用查询受理单记录
     
+    同一worker内参数完全相同的并发查询只执行一次，共享查询结果
+    
+    Args:
+        search_value: 查询值
+        search_type: 查询类型(id_card_number/case_number/contact_info)
+        limit: 最大返回数量
+        offset: 跳过记录数
+        after: 游标分页位置（传入时忽略offset）
+        include_total: 是否统计总记录数（False时total为null，只执行一条分页查询）
+        columns: 返回的字段，None表示全部字段
+        include_archive: 是否同时查询归档的受理单
+        
+    Returns:
+        dict: 查询结果
+    """
+    key = (
+        'search', search_value, search_type, limit, offset, tuple(after) if after else None,
+        bool(include_total), tuple(columns) if columns else None, include_archive
+    )
+    return _coalesce(key, lambda: _search_appeal_records(
+        search_value, search_type, limit, offset, after, include_total, columns, include_archive
+    ))
+
+def _search_appeal_records(search_value, search_type, limit, offset, after, include_total, columns,
+                           include_archive):
+    """
+    通用查询受理单记录（不合并并发查询）
+    
     Args:
         search_value: 查询值
         search_type: 查询类型(id_card_number/case_number/contact_info)
         limit: 最大返回数量
         offset: 跳过记录数
+        after: 游标分页位置（传入时忽略offset）
+        include_total: 是否统计总记录数（False时total为null，只执行一条分页查询）
+        columns: 返回的字段，None表示全部字段
+        include_archive: 是否同时查询归档的受理单
         
     Returns:
         dict: 查询结果
@@ -114,128 +209,220 @@ def search_appeal_records(search_value, search_type=None, limit=20, offset=0):
             }
         }
     
+    not_found_message = f"未找到匹配 {search_value} 的受理单记录"
+    include_total = bool(include_total)
+    
     # 根据搜索类型选择查询方法
     if search_type == "case_number" or (not search_type and len(search_value) > 15 and search_value.startswith("MTDJ-")):
         # 按案件编号查询
-        record = database.get_appeal_record_by_case_number(search_value)
+        record = database.get_appeal_record_by_case_number(
+            search_value, columns=columns, include_archive=include_archive
+        )
         
         if record:
-            return {
-                "success": 1,
-                "message": "查询成功，共找到 1 条记录",
-                "data": {
-                    "total": 1,
-                    "records": [record]
-                }
-            }
-        else:
-            return {
-                "success": 0,
-                "message": f"未找到匹配 {search_value} 的受理单记录",
-                "data": {
-                    "total": 0,
-                    "records": []
-                }
-            }
+            return _page_response(1, [record], None, not_found_message)
+        return _page_response(0, [], None, not_found_message)
             
     elif search_type == "id_card_number" or (not search_type and len(search_value) >= 15 and search_value.isdigit()):
         # 按身份证号查询
-        total, records = database.get_appeal_records_by_id_card(
+        total, records, next_cursor = database.get_appeal_records_by_id_card(
             search_value, 
             limit=limit, 
-            offset=offset
+            offset=offset,
+            after=after,
+            include_total=include_total,
+            columns=columns,
+            include_archive=include_archive
         )
         
     elif search_type == "contact_info" or (not search_type and len(search_value) == 11 and search_value.isdigit()):
         # 按联系方式查询
-        total, records = database.get_appeal_records_by_contact_info(
+        total, records, next_cursor = database.get_appeal_records_by_contact_info(
             search_value, 
             limit=limit, 
-            offset=offset
+            offset=offset,
+            after=after,
+            include_total=include_total,
+            columns=columns,
+            include_archive=include_archive
         )
         
     else:
-        # 尝试按多个字段查询（这里可以实现更复杂的逻辑）
-        # 这里简单示例，先按身份证号查
-        total_id, records_id = database.get_appeal_records_by_id_card(
-            search_value, 
-            limit=limit, 
-            offset=offset
-        )
-        
-        if total_id > 0:
-            return {
-                "success": 1,
-                "message": f"查询成功，共找到 {total_id} 条记录，返回 {len(records_id)} 条",
-                "data": {
-                    "total": total_id,
-                    "records": records_id
-                }
-            }
-            
-        # 再尝试按联系方式查
-        total, records = database.get_appeal_records_by_contact_info(
+        # 无法判断类型时在身份证号、联系方式、案件编号、姓名中一次查询，精确匹配排在前面
+        total, records, next_cursor = database.search_appeal_records_by_value(
             search_value, 
             limit=limit, 
-            offset=offset
+            offset=offset,
+            after=after,
+            include_total=include_total,
+            columns=columns,
+            include_archive=include_archive
         )
     
     # 构建响应
-    if total > 0:
-        return {
-            "success": 1,
-            "message": f"查询成功，共找到 {total} 条记录，返回 {len(records)} 条",
-            "data": {
-                "total": total,
-                "records": records
-            }
-        }
-    else:
-        return {
-            "success": 0,
-            "message": f"未找到匹配 {search_value} 的受理单记录",
-            "data": {
-                "total": 0,
-                "records": []
-            }
-        }
+    return _page_response(total, records, next_cursor, not_found_message)
 
-def get_all_appeals(limit=100, offset=0):
+def fulltext_search_appeal_records(keywords, mode='natural', status=None, department=None, start_date=None,
+                                   end_date=None, limit=20, offset=0, include_total=True, columns=None):
+    """
+    按事件描述、事件地点、地址全文检索受理单记录，结果按相关度排序
+    
+    Args:
+        keywords: 检索词
+        mode: 检索模式，natural（按相关度匹配）/phrase（完整匹配检索词）
+        status: 处理状态
+        department: 处理部门
+        start_date: 起始日期（包含）
+        end_date: 结束日期（包含）
+        limit: 最大返回数量
+        offset: 跳过记录数
+        include_total: 是否统计总记录数
+        columns: 返回的字段，None表示全部字段
+        
+    Returns:
+        dict: 查询结果
+    """
+    total, records = database.fulltext_search_appeal_records(
+        keywords,
+        mode=mode,
+        status=status,
+        department=department,
+        start_date=start_date,
+        end_date=end_date,
+        limit=limit,
+        offset=offset,
+        include_total=bool(include_total),
+        columns=columns
+    )
+    
+    return _page_response(total, records, None, f"未找到包含 {keywords} 的受理单记录")
+
+def get_all_appeals(limit=100, offset=0, after=None, include_total=True, columns=None):
     """
     获取所有受理单记录
     
     Args:
         limit: 最大返回数量
         offset: 跳过记录数
+        after: 游标分页位置（传入时忽略offset）
+        include_total: 是否统计总记录数，True为短时间缓存的精确值，
+                       'estimate'为表统计信息估算值，False不统计
+        columns: 返回的字段，None表示全部字段
         
     Returns:
         dict: 查询结果
     """
+    estimated = include_total == 'estimate'
+    
     # 查询记录
-    total, records = database.get_all_appeal_records(
+    total, records, next_cursor = database.get_all_appeal_records(
         limit=limit, 
-        offset=offset
+        offset=offset,
+        after=after,
+        include_total=bool(include_total) and not estimated,
+        columns=columns
     )
     
+    if estimated:
+        total = database.estimate_appeal_record_count()
+        estimated = total is not None
+    
     # 构建响应
-    if total > 0:
-        return {
-            "success": 1,
-            "message": f"查询成功，共找到 {total} 条记录，返回 {len(records)} 条",
-            "data": {
-                "total": total,
-                "records": records
-            }
-        }
-    else:
-        return {
+    return _page_response(total, records, next_cursor, "未找到受理单记录", estimated=estimated)
+
+def export_appeal_records(export_format, start_date=None, end_date=None, status=None, department=None,
+                          columns=None):
+    """
+    流式导出受理单记录
+    
+    先读取第一批记录再开始输出，查询本身失败时可以返回错误响应而不是一个空文件；
+    之后每读取 EXPORT_CHUNK_SIZE 条输出一次，并按 EXPORT_MAX_ROWS_PER_SECOND 限速。
+    
+    Args:
+        export_format: 导出格式，ndjson 或 csv
+        start_date: 起始日期（包含）
+        end_date: 结束日期（包含）
+        status: 处理状态
+        department: 处理部门
+        columns: 导出的字段，None表示全部字段
+        
+    Returns:
+        tuple: (输出内容的生成器, 查询失败时的错误结果或None)
+    """
+    batches = database.stream_appeal_records(
+        start_date=start_date,
+        end_date=end_date,
+        status=status,
+        department=department,
+        columns=columns,
+        chunk_size=EXPORT_CONFIG['chunk_size']
+    )
+    
+    try:
+        first_batch = next(batches, [])
+    except Exception as e:
+        logger.error(f"导出受理单记录失败: {e}")
+        return None, {
             "success": 0,
-            "message": "未找到受理单记录",
-            "data": {
-                "total": 0,
-                "records": []
-            }
+            "message": "导出受理单记录失败",
+            "data": {}
         }
+    
+    if export_format == 'csv':
+        return _export_csv(first_batch, batches, columns), None
+    return _export_ndjson(first_batch, batches), None
+
+def _export_batches(first_batch, batches):
+    """
+    依次产出各批记录，按配置的速率上限限速；客户端断开时关闭数据库游标
+    
+    Args:
+        first_batch: 已经读取的第一批记录
+        batches: 其余批次的生成器
+        
+    Yields:
+        list: 一批记录
+    """
+    max_rows_per_second = EXPORT_CONFIG['max_rows_per_second']
+    started = time.monotonic()
+    exported = 0
+    
+    try:
+        batch = first_batch
+        while batch:
+            yield batch
+            
+            exported += len(batch)
+            if max_rows_per_second > 0:
+                delay = exported / max_rows_per_second - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            
+            batch = next(batches, [])
+    except Exception as e:
+        # 响应头已经发出，只能记录日志并中止输出
+        logger.error(f"导出受理单记录中断，已导出 {exported} 条: {e}")
+    finally:
+        batches.close()
+
+def _export_ndjson(first_batch, batches):
+    """按 NDJSON 格式（每行一个JSON对象）输出"""
+    for batch in _export_batches(first_batch, batches):
+        yield ''.join(json.dumps(record, ensure_ascii=False, default=str) + '\n' for record in batch)
+
+def _export_csv(first_batch, batches, columns):
+    """按 CSV 格式输出，带 BOM 以便 Excel 正确识别中文"""
+    header = list(columns) if columns else (list(first_batch[0].keys()) if first_batch else [])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield '\ufeff' + buffer.getvalue()
+    
+    for batch in _export_batches(first_batch, batches):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([record.get(column) for column in header] for record in batch)
+        yield buffer.getvalue()
 
 def add_appeal_record(data):
     """
@@ -257,28 +444,118 @@ def add_appeal_record(data):
                 "data": {}
             }
     
-    # 检查是否已存在相同案件编号
-    existing = database.get_appeal_record_by_case_number(data['case_number'])
-    if existing:
+    # 添加记录（案件编号查重在同一连接内完成）
+    success, message = database.add_appeal_record(data)
+    
+    if success:
+        return {
+            "success": 1,
+            "message": "受理单记录添加成功",
+            "case_number": data['case_number']
+        }
+    else:
         return {
             "success": 0,
-            "message": f"案件编号 {data['case_number']} 已存在",
+            "message": message,
             "data": {}
         }
+
+def add_appeal_records_batch(records):
+    """
+    批量添加受理单记录
     
-    # 添加记录
-    success, message = database.add_appeal_record(data)
+    Args:
+        records: 受理单数据列表
+        
+    Returns:
+        dict: 添加结果，data.results 中按提交顺序给出每条记录的结果
+    """
+    if not isinstance(records, list) or not records:
+        return {
+            "success": 0,
+            "message": "缺少必要参数: records",
+            "data": {}
+        }
+    
+    if len(records) > BATCH_CONFIG['max_records']:
+        return {
+            "success": 0,
+            "message": f"单次最多提交 {BATCH_CONFIG['max_records']} 条记录",
+            "data": {}
+        }
+    
+    # 先验证全部记录，验证失败的不写入数据库
+    results = {}
+    valid_records = []
+    for index, record in enumerate(records):
+        error = validate_appeal_record(record)
+        if error:
+            results[index] = (False, error)
+        else:
+            valid_records.append((index, record))
+    
+    for index, success, message in database.add_appeal_records_batch(
+        valid_records, chunk_size=BATCH_CONFIG['chunk_size']
+    ):
+        results[index] = (success, message)
+    
+    items = []
+    for index, record in enumerate(records):
+        success, message = results[index]
+        items.append({
+            "index": index,
+            "case_number": record.get('case_number') if isinstance(record, dict) else None,
+            "success": 1 if success else 0,
+            "message": message
+        })
+    
+    succeeded = sum(item['success'] for item in items)
+    failed = len(items) - succeeded
+    
+    return {
+        "success": 1 if failed == 0 else 0,
+        "message": f"批量添加完成，成功 {succeeded} 条，失败 {failed} 条",
+        "data": {
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": failed,
+            "results": items
+        }
+    }
+
+def update_appeal_status(case_number, handling_status):
+    """
+    更新受理单的办理状态
+    
+    Args:
+        case_number: 案件编号
+        handling_status: 新的办理状态
+        
+    Returns:
+        dict: 更新结果
+    """
+    if not case_number or not handling_status:
+        return {
+            "success": 0,
+            "message": "缺少必要参数: handling_status",
+            "data": {}
+        }
+    
+    success, message = database.update_appeal_status(case_number, handling_status)
     
     if success:
         return {
             "success": 1,
-            "message": "受理单记录添加成功",
-            "case_number": data['case_number']
+            "message": message,
+            "data": {
+                "case_number": case_number,
+                "handling_status": handling_status
+            }
         }
     else:
         return {
             "success": 0,
-            "message": f"受理单记录添加失败: {message}",
+            "message": message,
             "data": {}
         }
 
@@ -292,46 +569,21 @@ def get_appeal_summary(id_card_number):
     Returns:
         dict: 摘要信息
     """
-    # 查询该身份证号的所有受理单记录
-    total, records = database.get_appeal_records_by_id_card(
-        id_card_number, 
-        limit=100  # 获取足够多的记录以生成摘要
+    # 读取该身份证号的受理单摘要，同一worker内对同一身份证号的并发查询只执行一次
+    summary = _coalesce(
+        ('summary', id_card_number),
+        lambda: database.get_appeal_summary_by_id_card(id_card_number)
     )
     
-    if total == 0:
+    if not summary:
         return {
             "success": 0,
             "message": f"未找到身份证号为 {id_card_number} 的受理单记录",
             "data": {}
         }
     
-    # 提取摘要数据
-    # 1. 用户姓名（取第一条记录的值）
-    person_name = records[0]['person_name']
-    
-    # 2. 总记录数
-    appeal_count = total
-    
-    # 3. 最新的受理单时间（时间最大的一条）
-    latest_appeal = max([record.get('created_at', '1970-01-01 00:00:00') for record in records])
-    
-    # 4. 办理状态统计
-    status_stats = {}
-    for record in records:
-        status = record.get('handling_status', '未知')
-        status_stats[status] = status_stats.get(status, 0) + 1
-    
-    # 5. 涉及的部门列表（去重）
-    departments = list(set([record.get('handling_department', '未知') for record in records]))
-    
     return {
         "success": 1,
         "message": "查询成功",
-        "data": {
-            "person_name": person_name,
-            "appeal_count": appeal_count,
-            "latest_appeal": latest_appeal,
-            "handling_status_stats": status_stats,
-            "departments": departments
-        }
+        "data": summary
     } 
\ No newline at end of file
@@ -1,8 +1,34 @@
 """
 身份验证服务 - 提供身份证号验证功能
 """
-import json
+from app.config import BATCH_CONFIG, WRITE_BEHIND_CONFIG
 from app.models import database
+from app.utils.write_behind import WriteBehindQueue
+
+# 验证结果和验证日志不影响响应内容，交给后台线程批量写入
+_verification_queue = WriteBehindQueue(
+    'verification',
+    database.record_verifications,
+    max_size=WRITE_BEHIND_CONFIG['max_size'],
+    batch_size=WRITE_BEHIND_CONFIG['batch_size'],
+    flush_interval=WRITE_BEHIND_CONFIG['flush_interval'],
+    overflow=WRITE_BEHIND_CONFIG['overflow'],
+    block_timeout=WRITE_BEHIND_CONFIG['block_timeout']
+)
+
+def _record_verifications(verifications):
+    """
+    记录验证结果和验证日志：启用异步写入时放入队列，否则同步写入
+    
+    Args:
+        verifications: [(用户ID, 请求数据, 响应数据, 验证状态)] 列表
+    """
+    if not WRITE_BEHIND_CONFIG['enabled']:
+        database.record_verifications(verifications)
+        return
+    
+    for verification in verifications:
+        _verification_queue.submit(verification)
 
 def verify_identity(id_card_number):
     """
@@ -16,10 +42,30 @@ def verify_identity(id_card_number):
     """
     # 查询用户信息
     user = database.get_user_by_id_card(id_card_number)
+    result = _verification_result(id_card_number, user)
     
-    # 构造响应结果
     if user:
-        result = {
+        # 记录验证结果和验证日志（异步写入，不阻塞响应）
+        _record_verifications([
+            (user['id'], {"id_card_number": id_card_number}, result, "success")
+        ])
+    # 用户不存在时无法记录到用户日志
+    
+    return result
+
+def _verification_result(id_card_number, user):
+    """
+    构造单个身份证号的验证结果
+    
+    Args:
+        id_card_number: 身份证号
+        user: 用户信息，不存在时为None
+        
+    Returns:
+        dict: 验证结果
+    """
+    if user:
+        return {
             "success": 1,
             "message": "身份证号验证通过",
             "data": {
@@ -29,29 +75,78 @@ def verify_identity(id_card_number):
                 "address": user['address']
             }
         }
+    
+    return {
+        "success": 0,
+        "message": f"身份证号 {id_card_number} 在系统中不存在",
+        "data": {}
+    }
+
+def verify_identities(id_card_numbers):
+    """
+    批量验证身份证号
+    
+    一次IN查询取出全部用户，验证状态和验证日志各用一条语句批量写入
+    
+    Args:
+        id_card_numbers: 身份证号列表
         
-        # 记录验证日志
-        database.update_verification_result(
-            user['id'], 
-            True, 
-            json.dumps(result, ensure_ascii=False)
-        )
-        database.log_verification(
-            user['id'],
-            {"id_card_number": id_card_number},
-            result,
-            "success"
-        )
-    else:
-        result = {
+    Returns:
+        dict: 验证结果，data.results 按提交顺序给出与 verify_identity 相同格式的结果
+    """
+    if not isinstance(id_card_numbers, list) or not id_card_numbers:
+        return {
             "success": 0,
-            "message": f"身份证号 {id_card_number} 在系统中不存在",
+            "message": "缺少必要参数: id_card_numbers",
             "data": {}
         }
-        
-        # 无法记录到用户日志，因为用户不存在
     
-    return result
+    if len(id_card_numbers) > BATCH_CONFIG['max_records']:
+        return {
+            "success": 0,
+            "message": f"单次最多验证 {BATCH_CONFIG['max_records']} 个身份证号",
+            "data": {}
+        }
+    
+    if not all(isinstance(value, str) and value for value in id_card_numbers):
+        return {
+            "success": 0,
+            "message": "参数格式错误: id_card_numbers",
+            "data": {}
+        }
+    
+    users = database.get_users_by_id_cards(sorted(set(id_card_numbers)))
+    if users is None:
+        return {
+            "success": 0,
+            "message": "查询用户信息失败，请稍后重试",
+            "data": {}
+        }
+    
+    results = []
+    verifications = []
+    for id_card_number in id_card_numbers:
+        user = users.get(id_card_number)
+        result = _verification_result(id_card_number, user)
+        results.append(result)
+        if user:
+            verifications.append((user['id'], {"id_card_number": id_card_number}, result, "success"))
+    
+    _record_verifications(verifications)
+    
+    verified = len(verifications)
+    failed = len(results) - verified
+    
+    return {
+        "success": 1 if failed == 0 else 0,
+        "message": f"批量验证完成，通过 {verified} 个，未通过 {failed} 个",
+        "data": {
+            "total": len(results),
+            "verified": verified,
+            "failed": failed,
+            "results": results
+        }
+    }
 
 def get_verification_status(id_card_number):
     """
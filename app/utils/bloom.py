@@ -0,0 +1,261 @@
+"""
+布隆过滤器 - 在不访问数据库的情况下判断一个值"一定不存在"
+
+BloomFilter 是固定容量的位数组实现；RefreshingBloomFilter 由后台线程从数据源构建，
+并按固定间隔重建（容量随数据量增长，删除的数据也随重建移出）。构建完成前所有值都视为"可能存在"，
+调用方照常查询数据库。
+
+其他进程或外部系统新增的数据由后台线程每隔 sync_interval 秒增量加入；增量同步失败或滞后时，
+过滤器的"不存在"不再可信，所有值都视为"可能存在"，由调用方查询数据库确认。
+"""
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# 重建时按当前数据量预留的增长空间，保证两次重建之间新增的数据不会让误判率明显升高
+CAPACITY_HEADROOM = 1.25
+
+# 最小容量
+MIN_CAPACITY = 1000
+
+# 构建或增量同步失败后的重试间隔（秒）
+RETRY_INTERVAL = 30
+
+
+class BloomFilter:
+    """
+    布隆过滤器
+
+    按预期元素数 capacity 和目标误判率 error_rate 计算位数组大小和哈希函数个数；
+    不会漏判，元素数超过 capacity 后误判率会升高
+    """
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.num_bits = max(int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / self.capacity * math.log(2))), 1)
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, item):
+        """用一次哈希的两半做双重哈希，得到 num_hashes 个位置"""
+        digest = hashlib.blake2b(str(item).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        """加入一个元素"""
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def expected_error_rate(self):
+        """根据已加入的元素数估算当前误判率"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class RefreshingBloomFilter:
+    """
+    由后台线程构建并定期重建的布隆过滤器
+
+    loader 返回 (元素总数, 元素迭代器, 水位)，总数用于确定容量，迭代器应流式读取，
+    水位（如自增ID的最大值）须在读取元素之前取得。重建期间 add() 的元素同时记录下来，
+    新过滤器构建完成后补入，不会因为重建丢失。
+
+    delta_loader(水位) 返回 (新水位, 水位之后新增的元素)，每隔 sync_interval 秒调用一次；
+    距离上次成功同步超过 2 * sync_interval 秒时过滤器视为已过期，不再判断"不存在"。
+    """
+    def __init__(self, name, loader, error_rate=0.001, rebuild_interval=600, delta_loader=None, sync_interval=2):
+        self.name = name
+        self.loader = loader
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self.delta_loader = delta_loader
+        self.sync_interval = sync_interval
+
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """初始化过滤器和后台线程状态（创建时以及fork后的子进程中调用）"""
+        self._filter = None
+        self._pending = None
+        self._watermark = None
+        self._synced_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = os.getpid()
+
+    def start(self):
+        """启动后台构建线程；fork后的子进程丢弃继承来的过滤器重新构建"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"bloom-filter-{self.name}", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        """停止后台线程（不等待正在进行的构建）"""
+        self._stop.set()
+
+    @property
+    def ready(self):
+        """过滤器是否已构建完成，且增量同步没有滞后（"不存在"的判断可信）"""
+        return self._filter is not None and self._pid == os.getpid() and not self._stale()
+
+    def _stale(self):
+        """增量同步是否滞后（没有配置增量同步时不会滞后）"""
+        return (self.delta_loader is not None
+                and time.monotonic() - self._synced_at > 2 * self.sync_interval)
+
+    def might_contain(self, item):
+        """
+        判断元素是否可能存在
+
+        Returns:
+            bool: False表示一定不存在；过滤器尚未构建完成或增量同步滞后时总是返回True
+        """
+        self.start()
+        bloom = self._filter
+        if bloom is None or self._pid != os.getpid():
+            metrics.record_bloom_check(self.name, 'not_ready')
+            return True
+        if self._stale():
+            metrics.record_bloom_check(self.name, 'stale')
+            return True
+
+        if item in bloom:
+            metrics.record_bloom_check(self.name, 'positive')
+            return True
+        metrics.record_bloom_check(self.name, 'negative')
+        return False
+
+    def record_false_positive(self):
+        """过滤器判断可能存在、查询后确认不存在时调用，用于统计实际误判次数"""
+        metrics.record_bloom_check(self.name, 'false_positive')
+
+    def add(self, item):
+        """加入一个新增的元素（写入数据库并提交之后调用）"""
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            bloom = self._filter
+            if self._pending is not None:
+                self._pending.append(item)
+        if bloom is not None:
+            bloom.add(item)
+            self._report(bloom)
+
+    def rebuild(self):
+        """
+        从数据源重新构建过滤器，完成后替换当前过滤器
+
+        Returns:
+            int: 新过滤器中的元素数
+        """
+        with self._lock:
+            self._pending = []
+        try:
+            total, items, watermark = self.loader()
+            bloom = BloomFilter(max(int(total * CAPACITY_HEADROOM), MIN_CAPACITY), self.error_rate)
+            for item in items:
+                bloom.add(item)
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            for item in self._pending:
+                bloom.add(item)
+            self._pending = None
+            self._filter = bloom
+            self._watermark = watermark
+            self._synced_at = time.monotonic()
+        self._report(bloom)
+        return bloom.count
+
+    def sync(self):
+        """
+        把水位之后新增的元素加入当前过滤器（已判断为可能存在的元素不重复计数）
+
+        Returns:
+            int: 新加入的元素数
+        """
+        bloom = self._filter
+        if bloom is None or self.delta_loader is None:
+            return 0
+
+        watermark, items = self.delta_loader(self._watermark)
+        added = 0
+        for item in items:
+            if item not in bloom:
+                bloom.add(item)
+                added += 1
+        self._watermark = watermark
+        self._synced_at = time.monotonic()
+        if added:
+            self._report(bloom)
+        return added
+
+    def _report(self, bloom):
+        """更新元素数和误判率指标"""
+        metrics.set_bloom_filter_state(self.name, bloom.count, self.error_rate, bloom.expected_error_rate())
+
+    def _run(self):
+        """
+        后台线程：构建过滤器，之后每隔 rebuild_interval 秒重建一次（为0时只构建一次），
+        两次重建之间每隔 sync_interval 秒增量同步；构建失败时30秒后重试
+        """
+        next_rebuild = 0
+        sync_failing = False
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if self._filter is None or (self.rebuild_interval > 0 and now >= next_rebuild):
+                try:
+                    count = self.rebuild()
+                    logger.info(f"布隆过滤器 {self.name} 构建完成，共 {count} 个元素")
+                    next_rebuild = now + self.rebuild_interval
+                except Exception as e:
+                    logger.error(f"布隆过滤器 {self.name} 构建失败: {e}")
+                    self._stop.wait(RETRY_INTERVAL)
+                    continue
+            elif self.delta_loader is not None:
+                try:
+                    self.sync()
+                    if sync_failing:
+                        logger.info(f"布隆过滤器 {self.name} 增量同步已恢复")
+                    sync_failing = False
+                except Exception as e:
+                    # 同步失败期间过滤器视为已过期，调用方查询数据库
+                    if not sync_failing:
+                        logger.warning(f"布隆过滤器 {self.name} 增量同步失败，恢复前不再根据过滤器判断不存在: {e}")
+                    sync_failing = True
+
+            if self.delta_loader is not None:
+                wait = self.sync_interval
+            elif self.rebuild_interval > 0:
+                wait = max(next_rebuild - time.monotonic(), 0)
+            else:
+                return
+            self._stop.wait(wait)
@@ -0,0 +1,175 @@
+"""
+缓存工具 - 进程内的有界 TTL + LRU 缓存，以及跨进程缓存值的JSON序列化
+"""
+import collections
+import datetime
+import json
+import threading
+import time
+
+from app.utils import metrics
+
+# 缓存未命中时返回的哨兵对象（缓存值本身可能为None）
+MISSING = object()
+
+
+def dumps_value(value):
+    """
+    把缓存值序列化为JSON字符串（跨进程和跨节点的缓存不使用pickle，读取缓存不会执行代码）
+
+    datetime 和 date 带类型标记，loads_value() 还原为原来的类型
+
+    Args:
+        value: 由dict、list、字符串、数字、None、datetime、date组成的缓存值
+
+    Returns:
+        str: JSON字符串
+
+    Raises:
+        TypeError: 缓存值包含无法序列化的类型
+    """
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=_encode_special)
+
+
+def loads_value(data):
+    """
+    还原 dumps_value() 序列化的缓存值
+
+    Args:
+        data: JSON字符串或UTF-8编码的字节
+
+    Returns:
+        缓存值
+
+    Raises:
+        ValueError: 数据不是有效的JSON
+    """
+    return json.loads(data, object_hook=_decode_special)
+
+
+def _encode_special(value):
+    if isinstance(value, datetime.datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'__date__': value.isoformat()}
+    raise TypeError(f"缓存值不支持 {type(value).__name__} 类型")
+
+
+def _decode_special(obj):
+    if len(obj) == 1:
+        if '__datetime__' in obj:
+            return datetime.datetime.fromisoformat(obj['__datetime__'])
+        if '__date__' in obj:
+            return datetime.date.fromisoformat(obj['__date__'])
+    return obj
+
+
+class TTLCache:
+    """
+    线程安全的 TTL + LRU 缓存
+
+    - 每个条目在写入 ttl 秒后过期
+    - 条目数超过 maxsize 时淘汰最久未使用的条目
+    - 统计命中、未命中和淘汰次数；指定 name 时同时记录到运行指标
+    """
+    def __init__(self, maxsize=1024, ttl=60, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def _count(self, stat, amount=1):
+        """累加统计（调用方持有锁）"""
+        self._stats[stat] += amount
+        if self.name:
+            if stat in ('hits', 'misses'):
+                metrics.record_cache_lookup(self.name, stat[:-1], amount)
+            else:
+                metrics.record_cache_eviction(self.name, stat[:-1], amount)
+
+    def get(self, key, default=MISSING):
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+            default: 未命中时的返回值
+
+        Returns:
+            缓存值，未命中或已过期时返回default
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._count('misses')
+                return default
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self._count('expirations')
+                self._count('misses')
+                return default
+
+            self._data.move_to_end(key)
+            self._count('hits')
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），默认使用缓存的ttl
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._count('evictions')
+
+    def delete(self, key):
+        """删除一个缓存条目"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        """
+        删除缓存值满足条件的所有条目（遍历全部条目，适合写操作较少、无法由缓存键直接定位的失效）
+
+        Args:
+            predicate: 接收缓存值、返回是否删除的函数
+
+        Returns:
+            int: 删除的条目数
+        """
+        with self._lock:
+            keys = [key for key, (value, _) in self._data.items() if predicate(value)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def stats(self):
+        """
+        返回缓存统计
+
+        Returns:
+            dict: 条目数、容量、命中/未命中次数、LRU淘汰次数和过期次数
+        """
+        with self._lock:
+            return {'size': len(self._data), 'maxsize': self.maxsize, **self._stats}
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
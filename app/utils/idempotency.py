@@ -0,0 +1,90 @@
+"""
+幂等请求处理 - 根据 Idempotency-Key 请求头重放已保存的响应
+
+客户端（或网关）对同一个写请求重试时携带相同的幂等键：
+- 首次请求正常处理，响应与本次请求的写操作在同一事务中保存；
+  4xx响应的请求事务会回滚（本次请求没有写入数据），响应改用单独的连接立即保存
+- 重试时只需一次主键查询即可返回保存的响应，不会重复写入
+- 同一个幂等键用于内容不同的请求时返回422
+"""
+import functools
+import hashlib
+import logging
+from flask import current_app, request, jsonify, Response
+from app.config import IDEMPOTENCY_CONFIG
+from app.models import database
+
+logger = logging.getLogger(__name__)
+
+# 重放的响应带有该响应头
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def _request_hash():
+    """计算请求方法、路径和请求体的SHA-256"""
+    digest = hashlib.sha256()
+    digest.update(request.method.encode('utf-8'))
+    digest.update(request.path.encode('utf-8'))
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def idempotent(func):
+    """
+    幂等请求装饰器，未携带幂等键的请求按原方式处理
+
+    Args:
+        func: 被装饰的视图函数
+
+    Returns:
+        wrapper: 包装后的函数
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        idempotency_key = request.headers.get(IDEMPOTENCY_CONFIG['header'])
+        if not idempotency_key:
+            return func(*args, **kwargs)
+
+        if len(idempotency_key) > IDEMPOTENCY_CONFIG['max_key_length']:
+            return jsonify({
+                "success": 0,
+                "message": f"参数格式错误: {IDEMPOTENCY_CONFIG['header']}",
+                "data": {}
+            }), 400
+
+        request_hash = _request_hash()
+        saved = database.get_idempotent_response(idempotency_key)
+        if saved:
+            if saved['request_hash'] != request_hash:
+                return jsonify({
+                    "success": 0,
+                    "message": f"{IDEMPOTENCY_CONFIG['header']} 已用于内容不同的请求",
+                    "data": {}
+                }), 422
+
+            response = Response(saved['response_body'], status=saved['status_code'],
+                                mimetype='application/json')
+            response.headers[REPLAYED_HEADER] = 'true'
+            return response
+
+        response = current_app.make_response(func(*args, **kwargs))
+
+        # 只保存确定性的结果，服务端错误允许重试
+        if response.status_code < 400:
+            # 与本次请求的写操作在同一事务中提交，保存失败时异常使整个请求回滚
+            database.save_idempotent_response(
+                idempotency_key, request_hash, response.status_code, response.get_data(as_text=True)
+            )
+        elif response.status_code < 500:
+            # 请求事务在请求结束时回滚，响应单独提交；保存失败时重试会重新处理，不影响结果
+            try:
+                database.save_idempotent_response(
+                    idempotency_key, request_hash, response.status_code, response.get_data(as_text=True),
+                    separate=True
+                )
+            except Exception as e:
+                logger.warning(f"保存幂等键 {idempotency_key} 的响应失败: {e}")
+        return response
+
+    return wrapper
+
@@ -0,0 +1,230 @@
+"""
+运行指标模块 - 采集数据库连接池和SQL执行指标，并以Prometheus文本格式导出
+
+gunicorn部署时设置 PROMETHEUS_MULTIPROC_DIR（gunicorn.conf.py 会自动设置），
+各worker把指标写入该目录下的共享文件，/api/metrics 返回所有worker汇总后的结果。
+"""
+import os
+
+# 多进程模式下指标文件目录必须在写入前存在
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# 连接池等待时间分桶（秒）
+WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# SQL执行时间分桶（秒）
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+POOL_CHECKOUT_WAIT = Histogram(
+    'mdtj_db_pool_checkout_wait_seconds',
+    '从连接池取得连接的等待时间（含新建连接）',
+    ['pool'],
+    buckets=WAIT_BUCKETS
+)
+
+POOL_CONNECTIONS = Gauge(
+    'mdtj_db_pool_connections',
+    '连接池中的连接数',
+    ['pool', 'state'],
+    multiprocess_mode='livesum'
+)
+
+POOL_EXHAUSTED = Counter(
+    'mdtj_db_pool_exhausted_total',
+    '连接池耗尽导致取连接失败的次数',
+    ['pool', 'reason']
+)
+
+POOL_RECONNECTS = Counter(
+    'mdtj_db_pool_reconnects_total',
+    '连接池重建连接的次数',
+    ['pool', 'reason']
+)
+
+QUERY_DURATION = Histogram(
+    'mdtj_db_query_duration_seconds',
+    'SQL语句执行时间',
+    ['query'],
+    buckets=QUERY_BUCKETS
+)
+
+WRITE_BEHIND_DEPTH = Gauge(
+    'mdtj_write_behind_queue_depth',
+    '异步写入队列中等待写入的数据条数',
+    ['queue'],
+    multiprocess_mode='livesum'
+)
+
+WRITE_BEHIND_FLUSH = Histogram(
+    'mdtj_write_behind_flush_seconds',
+    '异步写入队列每批写入的耗时',
+    ['queue'],
+    buckets=QUERY_BUCKETS
+)
+
+WRITE_BEHIND_ITEMS = Counter(
+    'mdtj_write_behind_items_total',
+    '异步写入队列处理的数据条数',
+    ['queue', 'result']
+)
+
+CACHE_LOOKUPS = Counter(
+    'mdtj_cache_lookups_total',
+    '缓存的查询次数（cache 标签区分进程内、本机共享和Redis缓存）',
+    ['cache', 'result']
+)
+
+CACHE_EVICTIONS = Counter(
+    'mdtj_cache_evictions_total',
+    '缓存淘汰的条目数（cache 标签区分进程内和本机共享缓存）',
+    ['cache', 'reason']
+)
+
+BLOOM_CHECKS = Counter(
+    'mdtj_bloom_filter_checks_total',
+    '布隆过滤器的判断次数',
+    ['filter', 'result']
+)
+
+BLOOM_ENTRIES = Gauge(
+    'mdtj_bloom_filter_entries',
+    '布隆过滤器中的元素数',
+    ['filter'],
+    multiprocess_mode='max'
+)
+
+BLOOM_ERROR_RATE = Gauge(
+    'mdtj_bloom_filter_false_positive_rate',
+    '布隆过滤器的误判率（target为配置的目标值，expected为按当前元素数估算的值）',
+    ['filter', 'kind'],
+    multiprocess_mode='max'
+)
+
+SINGLEFLIGHT_CALLS = Counter(
+    'mdtj_singleflight_calls_total',
+    '合并到其他并发调用的请求数（collapsed）及等待超时后单独执行的请求数（timeout）',
+    ['group', 'result']
+)
+
+CACHE_BACKEND_ERRORS = Counter(
+    'mdtj_cache_backend_errors_total',
+    '访问远程缓存服务（Redis）失败的次数，失败后暂时只使用本机缓存',
+    ['cache']
+)
+
+CACHE_INVALIDATIONS_RECEIVED = Counter(
+    'mdtj_cache_invalidations_received_total',
+    '收到的其他进程/节点发布的缓存失效消息数',
+    ['cache']
+)
+
+
+def observe_checkout_wait(pool, seconds):
+    """记录一次取连接的等待时间"""
+    POOL_CHECKOUT_WAIT.labels(pool=pool).observe(seconds)
+
+
+def set_pool_connections(pool, in_use, idle):
+    """更新连接池中使用中和空闲的连接数"""
+    POOL_CONNECTIONS.labels(pool=pool, state='in_use').set(in_use)
+    POOL_CONNECTIONS.labels(pool=pool, state='idle').set(idle)
+
+
+def record_pool_exhausted(pool, reason):
+    """记录一次连接池耗尽事件（reason: timeout/queue_full）"""
+    POOL_EXHAUSTED.labels(pool=pool, reason=reason).inc()
+
+
+def record_reconnect(pool, reason):
+    """记录一次连接重建（reason: recycle/ping_failed）"""
+    POOL_RECONNECTS.labels(pool=pool, reason=reason).inc()
+
+
+def observe_query(name, seconds):
+    """记录一条SQL的执行时间，name为稳定的查询名称，如 get_appeal_records_by_id_card"""
+    QUERY_DURATION.labels(query=name or 'unnamed').observe(seconds)
+
+
+def set_write_behind_depth(queue, depth):
+    """更新异步写入队列的当前长度"""
+    WRITE_BEHIND_DEPTH.labels(queue=queue).set(depth)
+
+
+def observe_write_behind_flush(queue, seconds):
+    """记录异步写入队列一批数据的写入耗时"""
+    WRITE_BEHIND_FLUSH.labels(queue=queue).observe(seconds)
+
+
+def record_write_behind_items(queue, result, count):
+    """记录异步写入队列处理的数据条数（result: flushed/failed/dropped）"""
+    WRITE_BEHIND_ITEMS.labels(queue=queue, result=result).inc(count)
+
+
+def record_cache_lookup(cache, result, count=1):
+    """记录缓存的查询次数（cache: 缓存名称，result: hit/miss）"""
+    CACHE_LOOKUPS.labels(cache=cache, result=result).inc(count)
+
+
+def record_cache_eviction(cache, reason, count=1):
+    """记录缓存淘汰的条目数（cache: 缓存名称，reason: eviction 超出容量/expiration 过期）"""
+    CACHE_EVICTIONS.labels(cache=cache, reason=reason).inc(count)
+
+
+def record_bloom_check(bloom_filter, result):
+    """记录一次布隆过滤器判断（result: negative/positive/false_positive/not_ready/stale）"""
+    BLOOM_CHECKS.labels(filter=bloom_filter, result=result).inc()
+
+
+def set_bloom_filter_state(bloom_filter, entries, target_rate, expected_rate):
+    """更新布隆过滤器的元素数和误判率"""
+    BLOOM_ENTRIES.labels(filter=bloom_filter).set(entries)
+    BLOOM_ERROR_RATE.labels(filter=bloom_filter, kind='target').set(target_rate)
+    BLOOM_ERROR_RATE.labels(filter=bloom_filter, kind='expected').set(expected_rate)
+
+
+def record_singleflight_call(group, result):
+    """记录一次被合并或等待超时的调用（result: collapsed/timeout）"""
+    SINGLEFLIGHT_CALLS.labels(group=group, result=result).inc()
+
+
+def record_cache_backend_error(cache):
+    """记录一次远程缓存服务访问失败"""
+    CACHE_BACKEND_ERRORS.labels(cache=cache).inc()
+
+
+def record_cache_invalidation_received(cache):
+    """记录一条收到的缓存失效消息"""
+    CACHE_INVALIDATIONS_RECEIVED.labels(cache=cache).inc()
+
+
+def render_metrics():
+    """
+    生成Prometheus文本格式的指标
+
+    Returns:
+        tuple: (指标文本, Content-Type)
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """清理已退出worker留下的实时指标（gunicorn child_exit 时调用）"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
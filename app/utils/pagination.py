@@ -0,0 +1,78 @@
+"""
+分页工具 - 基于 (create_time, id) 的游标分页（keyset/seek pagination）
+
+游标对客户端是不透明的字符串，内容为上一页最后一条记录的 create_time 和 id，
+下一页从该位置之后继续读取，不需要像 OFFSET 那样扫描并丢弃前面的记录。
+多字段搜索的结果先按匹配等级排序，游标中同时记录最后一条记录的 match_rank。
+"""
+import base64
+import datetime
+import json
+
+CURSOR_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def encode_cursor(record):
+    """
+    根据一条记录生成游标
+
+    Args:
+        record: 包含create_time和id（以及可选的match_rank）的记录字典
+
+    Returns:
+        str: 游标字符串，记录缺少排序字段时返回None
+    """
+    create_time = record.get('create_time')
+    record_id = record.get('id')
+    if create_time is None or record_id is None:
+        return None
+
+    if isinstance(create_time, datetime.datetime):
+        create_time = create_time.strftime(CURSOR_TIME_FORMAT)
+
+    values = [str(create_time), int(record_id)]
+    if record.get('match_rank') is not None:
+        values.append(int(record['match_rank']))
+    payload = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解析游标
+
+    Args:
+        cursor: 游标字符串
+
+    Returns:
+        tuple: (create_time, id)，多字段搜索的游标为 (create_time, id, match_rank)
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if len(values) not in (2, 3):
+            raise ValueError(cursor)
+        create_time = datetime.datetime.strptime(values[0], CURSOR_TIME_FORMAT)
+        return (create_time, int(values[1])) + tuple(int(value) for value in values[2:])
+    except Exception:
+        raise ValueError(f"无效的游标: {cursor}")
+
+
+def next_cursor(records, limit):
+    """
+    生成下一页的游标
+
+    Args:
+        records: 本页记录（查询时多取一条用于判断是否还有下一页）
+        limit: 每页数量
+
+    Returns:
+        tuple: (本页记录, 下一页游标或None)
+    """
+    if len(records) <= limit:
+        return records, None
+    records = records[:limit]
+    return records, encode_cursor(records[-1])
@@ -0,0 +1,263 @@
+"""
+多节点缓存 - Redis协议的缓存服务作为本机共享缓存之上的第二级缓存
+
+多台API服务器共用同一个Redis（或兼容Redis协议的服务），并通过发布订阅频道广播失效消息：
+一个节点上的写操作提交后删除Redis中的条目并发布失效消息，所有节点（每个worker进程各一个订阅线程）
+收到后删除本机缓存中的对应条目，并通知本进程清理其他相关缓存。
+
+每个键有一个版本号（ver:键），失效时递增；写入的值带着查询开始前读到的版本号，读取时版本号不一致
+视为未命中，与写操作并发的查询结果不会覆盖失效。值以JSON保存（不使用pickle），
+能写入Redis的客户端无法借缓存在API节点上执行代码，无法解析的值视为未命中。
+
+Redis不可用时进入本机模式：所有操作只使用本机缓存，retry_interval 秒后再尝试连接；
+订阅断开期间可能漏掉其他节点的失效消息，重新订阅后清空本机缓存。
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+import redis
+
+from app.utils import metrics
+from app.utils.cache import MISSING, dumps_value, loads_value
+
+logger = logging.getLogger(__name__)
+
+# Redis操作失败时捕获的异常
+REDIS_ERRORS = (redis.RedisError, OSError)
+
+
+class RedisCache:
+    """
+    本机缓存 + Redis 的两级缓存，接口与 SharedCache 相同
+
+    on_invalidate(keys) 在收到其他进程的失效消息时调用，keys 为None表示可能漏掉了失效消息，
+    所有数据都应视为已变更
+    """
+    def __init__(self, local, url, channel='mdtj:cache:invalidate', key_prefix='mdtj:', ttl=60,
+                 socket_timeout=0.2, retry_interval=30, on_invalidate=None, name='redis'):
+        self.local = local
+        self.channel = channel
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.on_invalidate = on_invalidate
+        self.name = name
+        self._client = redis.Redis.from_url(
+            url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout
+        )
+        self._down_until = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """初始化订阅线程状态（创建时以及fork后的子进程中调用）"""
+        self._pid = os.getpid()
+        self._node_id = f"{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}"
+        self._subscriber = None
+        self._stop = threading.Event()
+
+    def _data_key(self, key):
+        return f"{self.key_prefix}{key}"
+
+    def _version_key(self, key):
+        return f"{self.key_prefix}ver:{key}"
+
+    @property
+    def available(self):
+        """Redis是否可用（最近一次失败后的 retry_interval 秒内视为不可用）"""
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, error):
+        """记录一次Redis操作失败，进入本机模式"""
+        metrics.record_cache_backend_error(self.name)
+        if self.available:
+            logger.warning(f"缓存服务 {self.name} 不可用，{self.retry_interval} 秒内只使用本机缓存: {error}")
+        self._down_until = time.monotonic() + self.retry_interval
+
+    def begin(self, key):
+        """
+        在查询数据库之前调用，记录键的当前版本
+
+        Returns:
+            tuple: (本机缓存的标记, Redis中的版本号，Redis不可用时为None)
+        """
+        self.start()
+        local_token = self.local.begin(key)
+        if not self.available:
+            return local_token, None
+        try:
+            return local_token, int(self._client.get(self._version_key(key)) or 0)
+        except REDIS_ERRORS as e:
+            self._failed(e)
+            return local_token, None
+
+    def get(self, key, default=MISSING):
+        """
+        读取缓存：先查本机缓存，未命中时查Redis，命中后写入本机缓存
+
+        Args:
+            key: 缓存键（字符串）
+            default: 未命中时的返回值
+
+        Returns:
+            缓存值，未命中时返回default
+        """
+        self.start()
+        value = self.local.get(key)
+        if value is not MISSING or not self.available:
+            return default if value is MISSING else value
+
+        local_token = self.local.begin(key)
+        try:
+            data, version = self._client.mget(self._data_key(key), self._version_key(key))
+        except REDIS_ERRORS as e:
+            self._failed(e)
+            return default
+
+        if data is not None:
+            try:
+                stored_version, value = loads_value(data)
+            except (ValueError, TypeError) as e:
+                logger.warning(f"缓存服务 {self.name} 中的 {key} 无法解析: {e}")
+                stored_version = None
+            if stored_version == int(version or 0):
+                metrics.record_cache_lookup(self.name, 'hit')
+                self.local.set(key, value, local_token)
+                return value
+        metrics.record_cache_lookup(self.name, 'miss')
+        return default
+
+    def set(self, key, value, token=None, ttl=None):
+        """
+        写入本机缓存和Redis
+
+        Args:
+            key: 缓存键（字符串）
+            value: 可由 dumps_value() 序列化的缓存值
+            token: 查询数据库之前 begin() 的返回值，该键在此之后失效过时不写入
+            ttl: 过期时间（秒），默认使用缓存的ttl
+        """
+        local_token, version = token if token is not None else self.begin(key)
+        self.local.set(key, value, local_token, ttl=ttl)
+        if version is None or not self.available:
+            return
+        try:
+            data = dumps_value([version, value])
+        except TypeError as e:
+            logger.warning(f"缓存服务 {self.name} 无法序列化 {key}: {e}")
+            return
+        try:
+            self._client.set(self._data_key(key), data, px=int((self.ttl if ttl is None else ttl) * 1000))
+        except REDIS_ERRORS as e:
+            self._failed(e)
+
+    def delete(self, keys):
+        """
+        使缓存条目在所有节点失效：删除本机缓存和Redis中的条目，递增版本号并发布失效消息
+
+        Args:
+            keys: 缓存键列表
+        """
+        self.start()
+        self.local.delete(keys)
+        if not keys or not self.available:
+            return
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key in keys:
+                pipe.incr(self._version_key(key))
+                # 版本号的有效期长于值的有效期，过期后重新从0开始也不会与旧值的版本号相同
+                pipe.pexpire(self._version_key(key), int(self.ttl * 2000))
+                pipe.delete(self._data_key(key))
+            pipe.publish(self.channel, json.dumps({'origin': self._node_id, 'keys': list(keys)}, ensure_ascii=False))
+            pipe.execute()
+        except REDIS_ERRORS as e:
+            self._failed(e)
+            logger.error(f"缓存服务 {self.name} 不可用，其他节点的缓存最多在 {self.ttl} 秒后过期: {keys}")
+
+    def clear(self):
+        """清空本机缓存（不清空Redis）"""
+        self.local.clear()
+
+    def stats(self):
+        """
+        返回缓存统计
+
+        Returns:
+            dict: 本机缓存的统计，以及Redis是否可用
+        """
+        return {**self.local.stats(), 'remote_available': self.available}
+
+    def start(self):
+        """启动订阅失效消息的后台线程；fork后的子进程重新启动"""
+        if self._subscriber is not None and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            if self._subscriber is None:
+                self._subscriber = threading.Thread(
+                    target=self._listen, name=f"cache-invalidation-{self.name}", daemon=True
+                )
+                self._subscriber.start()
+
+    def stop(self):
+        """停止订阅线程"""
+        self._stop.set()
+
+    def _listen(self):
+        """后台线程：订阅失效频道并处理消息，连接断开时等待 retry_interval 秒后重新订阅"""
+        missed = False
+        while not self._stop.is_set():
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                if missed:
+                    # 断开期间可能漏掉了其他节点的失效消息
+                    logger.info(f"缓存服务 {self.name} 已恢复，清空本机缓存")
+                    self.local.clear()
+                    self._invalidated(None)
+                    missed = False
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message['type'] == 'message':
+                        self._handle(message['data'])
+            except REDIS_ERRORS as e:
+                self._failed(e)
+                missed = True
+            finally:
+                try:
+                    pubsub.close()
+                except REDIS_ERRORS:
+                    pass
+            self._stop.wait(self.retry_interval)
+
+    def _handle(self, data):
+        """处理一条失效消息，忽略本进程自己发布的消息"""
+        try:
+            message = json.loads(data)
+        except ValueError:
+            logger.warning(f"缓存服务 {self.name} 收到无法解析的失效消息: {data!r}")
+            return
+        if message.get('origin') == self._node_id:
+            return
+
+        keys = message.get('keys') or []
+        metrics.record_cache_invalidation_received(self.name)
+        self.local.delete(keys)
+        self._invalidated(keys)
+
+    def _invalidated(self, keys):
+        """调用 on_invalidate 回调，异常只记录日志"""
+        if self.on_invalidate is None:
+            return
+        try:
+            self.on_invalidate(keys)
+        except Exception as e:
+            logger.error(f"处理缓存失效消息失败: {e}")
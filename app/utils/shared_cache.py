@@ -0,0 +1,258 @@
+"""
+跨进程共享缓存 - 同一台服务器上的所有gunicorn worker共用一份缓存
+
+数据保存在本机的SQLite文件中（建议放在 /dev/shm 等内存文件系统），各worker通过文件锁并发读写，
+一个worker删除的条目对所有worker立即失效；条目数超过上限时淘汰最早过期的缓存值。
+条目数由触发器维护在 cache_size 表中，写入时不需要统计整张表。
+
+失效通过写入墓碑实现：delete() 记录失效时间，在失效之前开始的查询结果不会再写入缓存，
+避免与写操作并发的查询把旧数据重新放回缓存。缓存文件不可用时所有操作都视为未命中，不影响查询。
+
+缓存值以JSON保存（不使用pickle）；缓存目录以 0700 权限创建，目录属于其他用户或其他用户可写时
+不使用缓存，避免本机其他用户预先创建目录或改写缓存文件。
+"""
+import logging
+import os
+import sqlite3
+import stat
+import threading
+import time
+
+from app.utils import metrics
+from app.utils.cache import MISSING, dumps_value, loads_value
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    expires_at REAL NOT NULL,
+    invalidated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries (expires_at);
+-- 条目数（包括墓碑），由触发器维护
+CREATE TABLE IF NOT EXISTS cache_size (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_size SELECT 0, COUNT(*) FROM cache_entries;
+CREATE TRIGGER IF NOT EXISTS cache_entries_inserted AFTER INSERT ON cache_entries
+BEGIN
+    UPDATE cache_size SET entries = entries + 1 WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_deleted AFTER DELETE ON cache_entries
+BEGIN
+    UPDATE cache_size SET entries = entries - 1 WHERE id = 0;
+END;
+"""
+
+
+class SharedCache:
+    """
+    基于本机SQLite文件的跨进程 TTL 缓存
+
+    每个线程使用自己的SQLite连接，fork后的子进程重新建立连接
+    """
+    def __init__(self, path, max_entries=10000, ttl=60, name='shared'):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.name = name
+        self._local = threading.local()
+        self._unsafe_reason = None
+
+    def _check_directory(self, directory):
+        """
+        创建缓存目录（权限 0700）并检查其属主和权限
+
+        Returns:
+            str: 不能使用该目录的原因，可以使用时为None
+        """
+        try:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            info = os.lstat(directory)
+        except OSError as e:
+            return f"无法创建缓存目录 {directory}: {e}"
+        if not stat.S_ISDIR(info.st_mode):
+            return f"{directory} 不是目录"
+        if info.st_uid != os.getuid():
+            return f"缓存目录 {directory} 属于其他用户（uid {info.st_uid}）"
+        if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            return f"缓存目录 {directory} 允许其他用户写入（权限 {stat.S_IMODE(info.st_mode):o}）"
+        return None
+
+    def _connection(self):
+        """
+        获取当前线程的连接，首次使用时检查缓存目录、建立连接并初始化表结构
+
+        Returns:
+            sqlite3.Connection: 连接，缓存目录不安全时为None（缓存不可用，只记录一次错误日志）
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        if self._unsafe_reason:
+            return None
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        reason = self._check_directory(directory)
+        if reason:
+            self._unsafe_reason = reason
+            logger.error(f"共享缓存 {self.name} 不可用: {reason}")
+            return None
+        conn = sqlite3.connect(self.path, timeout=1, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript(_SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def begin(self, key):
+        """
+        在查询数据库之前调用，返回传给 set() 的 started_at
+
+        Returns:
+            float: 当前时间
+        """
+        return time.time()
+
+    def get(self, key, default=MISSING):
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键（字符串）
+            default: 未命中时的返回值
+
+        Returns:
+            缓存值，未命中、已过期或已失效时返回default
+        """
+        try:
+            conn = self._connection()
+            if conn is None:
+                return default
+            row = conn.execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ? AND value IS NOT NULL",
+                (key, time.time())
+            ).fetchone()
+            value = MISSING if row is None else loads_value(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"读取共享缓存 {self.name} 失败: {e}")
+            return default
+
+        if value is MISSING:
+            metrics.record_cache_lookup(self.name, 'miss')
+            return default
+        metrics.record_cache_lookup(self.name, 'hit')
+        return value
+
+    def set(self, key, value, started_at=None, ttl=None):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键（字符串）
+            value: 可由 dumps_value() 序列化的缓存值
+            started_at: 得到该值的查询开始的时间（time.time()），该键在此之后失效过时不写入
+            ttl: 过期时间（秒），默认使用缓存的ttl
+        """
+        now = time.time()
+        started_at = now if started_at is None else started_at
+        try:
+            conn = self._connection()
+            if conn is None:
+                return
+            conn.execute("""
+            INSERT INTO cache_entries (key, value, expires_at, invalidated_at) VALUES (?, ?, ?, NULL)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+            WHERE cache_entries.invalidated_at IS NULL OR cache_entries.invalidated_at < ?
+               OR cache_entries.expires_at <= ?
+            """, (key, dumps_value(value), now + (self.ttl if ttl is None else ttl), started_at, now))
+            self._evict(conn, now)
+        except (sqlite3.Error, TypeError) as e:
+            logger.warning(f"写入共享缓存 {self.name} 失败: {e}")
+
+    def delete(self, keys):
+        """
+        使缓存条目失效（所有进程立即生效），并阻止失效前开始的查询结果写入
+
+        Args:
+            keys: 缓存键列表
+        """
+        if not keys:
+            return
+        now = time.time()
+        try:
+            conn = self._connection()
+            if conn is None:
+                return
+            conn.executemany("""
+            INSERT INTO cache_entries (key, value, expires_at, invalidated_at) VALUES (?, NULL, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = NULL, expires_at = excluded.expires_at,
+                                           invalidated_at = excluded.invalidated_at
+            """, [(key, now + self.ttl, now) for key in keys])
+        except sqlite3.Error as e:
+            logger.error(f"共享缓存 {self.name} 失效失败: {e}")
+
+    def clear(self):
+        """清空缓存"""
+        try:
+            conn = self._connection()
+            if conn is None:
+                return
+            conn.execute("DELETE FROM cache_entries")
+        except sqlite3.Error as e:
+            logger.error(f"清空共享缓存 {self.name} 失败: {e}")
+
+    def _evict(self, conn, now):
+        """
+        删除过期条目；条目数仍超过上限时按过期时间从早到晚淘汰缓存值
+
+        ttl 秒内失效过的条目（墓碑，以及失效后重新写入的值）不淘汰：删除后失效时间随之丢失，
+        失效前开始的查询结果会重新写入缓存。失效频繁时条目数可能暂时超过上限，
+        超出部分不多于 ttl 秒内失效的键数
+        """
+        expired = conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,)).rowcount
+        if expired:
+            metrics.record_cache_eviction(self.name, 'expiration', expired)
+
+        excess = conn.execute("SELECT entries FROM cache_size WHERE id = 0").fetchone()[0] - self.max_entries
+        if excess > 0:
+            evicted = conn.execute("""
+            DELETE FROM cache_entries WHERE key IN (
+                SELECT key FROM cache_entries
+                WHERE value IS NOT NULL AND (invalidated_at IS NULL OR invalidated_at <= ?)
+                ORDER BY expires_at LIMIT ?
+            )
+            """, (now - self.ttl, excess)).rowcount
+            if evicted:
+                metrics.record_cache_eviction(self.name, 'eviction', evicted)
+
+    def stats(self):
+        """
+        返回缓存统计
+
+        Returns:
+            dict: 有效条目数和容量，缓存文件不可用时条目数为None
+        """
+        try:
+            conn = self._connection()
+            if conn is None:
+                return {'size': None, 'maxsize': self.max_entries}
+            size = conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE value IS NOT NULL AND expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        return {'size': size, 'maxsize': self.max_entries}
+
+
+def remove_cache_file(path):
+    """删除缓存文件（gunicorn主进程启动时调用，上次运行留下的数据可能已过期）"""
+    for suffix in ('', '-wal', '-shm'):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
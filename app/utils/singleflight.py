@@ -0,0 +1,92 @@
+"""
+请求合并（single-flight）- 同一进程内对同一个键的并发调用只执行一次
+
+第一个调用者执行查询，同时到达的其他调用者等待并共享它的结果；有等待者时每个调用者
+（包括执行查询的调用者）各自得到一份深拷贝，互不影响，没有等待者时直接返回结果、不复制。
+执行中抛出的异常同样传给所有等待者。等待超过 timeout 秒的调用者不再等待，自己执行一次查询。
+只在同一worker的多个线程之间生效（默认的 gthread worker；同步worker每个进程同时只处理一个请求，不会合并）。
+"""
+import copy
+import logging
+import threading
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """一次正在执行的调用"""
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    按键合并并发调用
+
+    数据变更提交后调用 forget_all()，之后到达的调用者不再共享变更前开始的查询结果
+    """
+    def __init__(self, name, timeout=5.0):
+        self.name = name
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """
+        执行 func，或等待同一个键上正在执行的调用并共享其结果
+
+        Args:
+            key: 可哈希的键，相同的键表示相同的查询
+            func: 无参数的函数
+
+        Returns:
+            func 的返回值
+
+        Raises:
+            Exception: func 抛出的异常（等待者收到与执行者相同的异常）
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if leader:
+            try:
+                call.result = func()
+            except Exception as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                    # 调用已从表中移除，之后不会再有等待者加入
+                    shared = call.waiters > 0
+                call.done.set()
+            # 等待者从 call.result 复制各自的结果，执行者也不能直接返回并修改它
+            return copy.deepcopy(call.result) if shared else call.result
+
+        if not call.done.wait(self.timeout):
+            metrics.record_singleflight_call(self.name, 'timeout')
+            logger.warning(f"合并请求 {self.name} 等待超过 {self.timeout} 秒，单独执行查询")
+            return func()
+
+        metrics.record_singleflight_call(self.name, 'collapsed')
+        if call.error is not None:
+            raise call.error
+        return copy.deepcopy(call.result)
+
+    def forget_all(self):
+        """之后到达的调用者不再加入当前正在执行的调用（已在等待的调用者不受影响）"""
+        with self._lock:
+            self._calls.clear()
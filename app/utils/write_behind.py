@@ -0,0 +1,222 @@
+"""
+异步写入队列（write-behind）- 把不影响响应结果的写操作交给后台线程批量执行
+
+请求线程只把待写入的数据放入进程内的有界队列，后台线程按批量大小或时间间隔批量写入数据库。
+队列满时按 overflow 策略处理：
+- block: 等待最多 block_timeout 秒，仍然满则丢弃
+- drop: 立即丢弃
+- sync: 由请求线程直接同步写入（把压力反馈给调用方）
+
+worker退出时调用 drain_all() 写完队列中剩余的数据（gunicorn.conf.py 的 worker_exit 中调用，
+须在关闭连接池之前）。
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('block', 'drop', 'sync')
+
+# 本进程创建的所有队列，退出时统一写完
+_queues = []
+_queues_lock = threading.Lock()
+
+
+class WriteBehindQueue:
+    """
+    有界的异步批量写入队列
+
+    flush_func 接收一批数据（列表），返回是否写入成功；失败的批次记录日志后丢弃，不重试
+    """
+    def __init__(self, name, flush_func, max_size=10000, batch_size=200, flush_interval=0.5,
+                 overflow='block', block_timeout=1.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"不支持的队列溢出策略: {overflow}")
+
+        self.name = name
+        self.flush_func = flush_func
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self._lock = threading.Lock()
+        self._reset()
+
+        with _queues_lock:
+            _queues.append(self)
+
+    def _reset(self):
+        """初始化队列和后台线程状态（创建时以及fork后的子进程中调用）"""
+        self._queue = queue.Queue(maxsize=self.max_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = os.getpid()
+
+    def _ensure_started(self):
+        """首次使用时启动后台线程；fork后的子进程丢弃继承来的队列重新开始"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"write-behind-{self.name}", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, item):
+        """
+        提交一条待写入的数据
+
+        Args:
+            item: 待写入的数据，原样传给 flush_func
+
+        Returns:
+            bool: 是否已入队或已同步写入（被丢弃时返回False）
+        """
+        self._ensure_started()
+
+        if self._stop.is_set():
+            # 已开始退出，不再入队，直接同步写入
+            return self._flush([item])
+
+        try:
+            if self.overflow == 'block':
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            if self.overflow == 'sync':
+                return self._flush([item])
+            metrics.record_write_behind_items(self.name, 'dropped', 1)
+            logger.warning(f"异步写入队列 {self.name} 已满（{self.max_size}），丢弃一条数据")
+            return False
+
+        metrics.set_write_behind_depth(self.name, self._queue.qsize())
+        return True
+
+    def _collect(self):
+        """取出一批数据：凑满 batch_size 条或自第一条起等待 flush_interval 秒"""
+        timeout = 0 if self._stop.is_set() else self.flush_interval
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = 0 if self._stop.is_set() else deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=max(remaining, 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        """
+        写入一批数据并记录运行指标
+
+        Args:
+            batch: 数据列表
+
+        Returns:
+            bool: 是否写入成功
+        """
+        started = time.perf_counter()
+        try:
+            success = bool(self.flush_func(batch))
+        except Exception as e:
+            logger.error(f"异步写入队列 {self.name} 写入失败: {e}")
+            success = False
+
+        metrics.observe_write_behind_flush(self.name, time.perf_counter() - started)
+        metrics.record_write_behind_items(self.name, 'flushed' if success else 'failed', len(batch))
+        if not success:
+            logger.error(f"异步写入队列 {self.name} 丢弃写入失败的 {len(batch)} 条数据")
+        return success
+
+    def _run(self):
+        """后台线程：循环取出批次并写入，收到停止信号且队列为空后退出"""
+        while True:
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+                metrics.set_write_behind_depth(self.name, self._queue.qsize())
+            elif self._stop.is_set():
+                break
+
+    def drain(self, timeout=10):
+        """
+        停止后台线程并写完队列中剩余的数据
+
+        Args:
+            timeout: 等待后台线程写完的最长时间（秒）
+
+        Returns:
+            int: 未能写入的剩余数据条数
+        """
+        if self._pid != os.getpid():
+            return 0
+
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+
+        if thread is None or not thread.is_alive():
+            # 后台线程已退出（或从未启动），剩余数据在当前线程写完
+            while True:
+                batch = self._collect()
+                if not batch:
+                    break
+                self._flush(batch)
+
+        remaining = self._queue.qsize()
+        metrics.set_write_behind_depth(self.name, remaining)
+        if remaining:
+            logger.warning(f"异步写入队列 {self.name} 退出时仍有 {remaining} 条数据未写入")
+        return remaining
+
+    def status(self):
+        """
+        获取队列状态
+
+        Returns:
+            dict: 队列名称、当前长度、容量和后台线程是否运行
+        """
+        return {
+            'name': self.name,
+            'depth': self._queue.qsize(),
+            'max_size': self.max_size,
+            'running': self._thread is not None and self._thread.is_alive()
+        }
+
+
+def drain_all(timeout=10):
+    """
+    写完本进程所有异步写入队列中的剩余数据（worker退出时调用）
+
+    Args:
+        timeout: 每个队列等待的最长时间（秒）
+    """
+    with _queues_lock:
+        queues = list(_queues)
+    for write_queue in queues:
+        try:
+            write_queue.drain(timeout)
+        except Exception as e:
+            logger.error(f"异步写入队列 {write_queue.name} 退出处理失败: {e}")
+
+
+# 直接运行应用（非gunicorn）时在进程退出前写完剩余数据
+atexit.register(drain_all)
@@ -15,6 +15,23 @@ PHONE_PATTERN = r'^1[3-9]\d{9}$'
 # 邮箱验证正则表达式
 EMAIL_PATTERN = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
 
+# 受理单记录允许写入的字段
+APPEAL_FIELDS = (
+    'case_number', 'person_name', 'contact_info', 'gender', 'id_card_number', 'address',
+    'incident_time', 'incident_location', 'incident_description', 'people_involved',
+    'submitted_materials', 'handling_department', 'handling_status', 'expected_completion',
+    'create_time', 'qr_code', 'markdown_doc'
+)
+
+# 受理单列表默认返回的字段（不含 markdown_doc 等大文本字段，完整记录按案件编号单独查询）
+APPEAL_LIST_COLUMNS = (
+    'id', 'case_number', 'person_name', 'contact_info', 'id_card_number',
+    'handling_department', 'handling_status', 'expected_completion', 'create_time'
+)
+
+# 受理单记录必填字段
+APPEAL_REQUIRED_FIELDS = ('case_number', 'person_name', 'id_card_number')
+
 def validate_id_card(id_card):
     """
     验证身份证号格式
@@ -213,4 +230,29 @@ def validate_query_params(required_params=None, param_validators=None):
         
         return decorated_function
     
-    return decorator 
\ No newline at end of file
+    return decorator 
+
+def validate_appeal_record(record):
+    """
+    验证一条受理单记录
+    
+    Args:
+        record: 受理单数据
+        
+    Returns:
+        str: 错误信息，验证通过时返回None
+    """
+    if not isinstance(record, dict):
+        return "记录格式错误，应为JSON对象"
+    
+    for field in APPEAL_REQUIRED_FIELDS:
+        if not record.get(field):
+            return f"缺少必要字段: {field}"
+    
+    for field, value in record.items():
+        if field not in APPEAL_FIELDS:
+            return f"未知字段: {field}"
+        if value is not None and not isinstance(value, (str, int, float)):
+            return f"字段格式错误: {field}"
+    
+    return None
@@ -0,0 +1,79 @@
+"""
+Gunicorn 配置文件
+
+用法: gunicorn -c gunicorn.conf.py run:app
+
+- 主进程启动时初始化一次数据库表和测试数据，随后关闭用到的连接，保证fork时没有打开的连接
+- 每个worker在fork之后建立自己的连接池并预先建立若干连接，避免首批请求承担建连延迟，
+  并在后台流式读取 users 表构建已知身份证号的布隆过滤器
+- worker退出时先写完异步写入队列中的剩余数据，再关闭自己的连接池
+- 各worker的运行指标写入 PROMETHEUS_MULTIPROC_DIR，由 /api/metrics 汇总导出
+- 各worker共用 SHARED_CACHE_PATH 处的共享缓存文件，主进程启动时删除上次运行留下的缓存
+- 默认使用线程worker（gthread）：流式导出等长时间的请求不会因超过 timeout 被主进程重启
+"""
+import os
+import shutil
+
+from app.config import API_CONFIG, GUNICORN_CONFIG, METRICS_CONFIG
+
+# 必须在导入 prometheus_client 之前设置
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', METRICS_CONFIG['multiproc_dir'])
+
+bind = f"{API_CONFIG['server_host']}:{API_CONFIG['server_port']}"
+workers = GUNICORN_CONFIG['workers']
+worker_class = GUNICORN_CONFIG['worker_class']
+threads = GUNICORN_CONFIG['threads']
+timeout = GUNICORN_CONFIG['timeout']
+max_requests = GUNICORN_CONFIG['max_requests']
+max_requests_jitter = GUNICORN_CONFIG['max_requests_jitter']
+
+
+def on_starting(server):
+    """
+    主进程启动：清空上次运行留下的指标文件和共享缓存，初始化数据库，然后关闭连接池，不把连接带进worker
+    """
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+    
+    from app import db_pool
+    from app.config import SHARED_CACHE_CONFIG
+    from app.models import database
+    from app.utils.shared_cache import remove_cache_file
+
+    remove_cache_file(SHARED_CACHE_CONFIG['path'])
+
+    database.init_database()
+    db_pool.close_pool()
+
+
+def post_fork(server, worker):
+    """
+    worker启动：建立本进程独立的连接池并预热，在后台构建已知身份证号的布隆过滤器，
+    配置了Redis缓存时订阅其他节点的缓存失效消息
+    """
+    from app import db_pool
+    from app.models import database
+
+    db_pool.init_pool()
+    db_pool.warm_up_pool()
+    database.start_user_filter()
+    database.start_cache_subscriber()
+    server.log.info(f"worker {worker.pid} 数据库连接池已就绪")
+
+
+def worker_exit(server, worker):
+    """worker退出：写完异步写入队列中的剩余数据，然后关闭本进程的连接池"""
+    from app import db_pool
+    from app.utils import write_behind
+
+    write_behind.drain_all()
+    db_pool.close_pool()
+    server.log.info(f"worker {worker.pid} 数据库连接池已关闭")
+
+
+def child_exit(server, worker):
+    """worker进程退出后（在主进程中执行）：清理该worker的实时指标"""
+    from app.utils import metrics
+
+    metrics.mark_process_dead(worker.pid)
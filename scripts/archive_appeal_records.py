@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""
+受理单归档脚本 - 将已结案且超过保留期的受理单分批移入 appeal_records_archive
+
+每批一个事务，可在服务运行时执行；归档后的受理单只在查询接口传入 include_archive=true 时返回，
+受理单摘要只统计未归档的记录。已经没有记录的过期月份分区在归档后删除。
+
+用法示例:
+    python scripts/archive_appeal_records.py --retention-days 730 --statuses 已结案 --batch-size 500
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db_pool
+from app.config import ARCHIVE_CONFIG
+from app.models import database
+
+
+def main():
+    parser = argparse.ArgumentParser(description='归档已结案的历史受理单')
+    parser.add_argument('--retention-days', type=int, default=ARCHIVE_CONFIG['retention_days'],
+                        help='创建超过多少天的受理单可以归档')
+    parser.add_argument('--statuses', default=','.join(ARCHIVE_CONFIG['statuses']),
+                        help='可以归档的办理状态，多个用逗号分隔')
+    parser.add_argument('--batch-size', type=int, default=ARCHIVE_CONFIG['batch_size'], help='每个事务归档的记录数')
+    args = parser.parse_args()
+
+    statuses = [status.strip() for status in args.statuses.split(',') if status.strip()]
+    try:
+        total = database.archive_appeal_records(
+            retention_days=args.retention_days,
+            statuses=statuses,
+            batch_size=args.batch_size
+        )
+        print(f"受理单归档完成，共 {total} 条")
+        return True
+    except Exception as e:
+        print(f"受理单归档失败: {e}")
+        return False
+    finally:
+        db_pool.close_pool()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,577 @@
+#!/usr/bin/env python
+"""
+性能基准测试脚本 - 对矛盾调解受理服务的API接口进行压测
+
+用法示例:
+    # 对身份验证接口压测30秒，并发16
+    python scripts/benchmark.py http --scenario verify --concurrency 16 --duration 30
+
+    # 在改动前后分别运行同一命令，对比输出的 requests/sec 即可
+
+    # 为一个身份证号准备10000条受理单，对比受理单摘要的两种实现
+    python scripts/benchmark.py summary --records 10000 --iterations 50
+
+    # 分别用单条接口和批量接口写入2000条受理单，对比 records/sec
+    python scripts/benchmark.py ingest --records 2000 --batch-size 500 --cleanup
+
+    # 准备100万条受理单，对比全文检索与 LIKE '%关键词%' 的查询延迟
+    python scripts/benchmark.py fulltext --records 1000000 --keywords 装修噪音 车位 --iterations 20
+"""
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import threading
+import time
+
+import requests
+
+# 直接访问数据库的基准测试需要导入app包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 受理单摘要基准测试使用的身份证号，测试数据的案件编号以 BENCH- 开头
+SUMMARY_ID_CARD = '990101199001010000'
+SUMMARY_STATUSES = ['待受理', '办理中', '已结案', '已撤回']
+SUMMARY_DEPARTMENTS = ['矛盾调解中心', '街道办事处', '司法所', '信访办', '派出所']
+
+# 全文检索基准测试使用的身份证号，测试数据的案件编号以 BENCH-FT- 开头
+FULLTEXT_ID_CARD = '990101199001010001'
+FULLTEXT_TOPICS = ['装修噪音扰民', '车位被长期占用', '物业费收取纠纷', '楼上卫生间漏水', '宠物犬咬伤路人',
+                   '拖欠装修工人工资', '房屋租赁押金不退', '广场舞音响噪音', '共用楼道堆放杂物', '电动车楼道充电']
+FULLTEXT_PLACES = ['幸福里小区', '阳光花园', '锦绣家园', '翠湖苑', '滨江新城', '和平街社区', '东方明珠公寓']
+FULLTEXT_KEYWORDS = ['装修噪音', '车位', '押金不退', '阳光花园']
+
+# 压测场景：名称 -> (HTTP方法, 路径, 查询参数, 请求体)
+HTTP_SCENARIOS = {
+    'verify': ('post', '/identity/verify', None, {"id_card_number": "330102199001011234"}),
+    'verify_batch': ('post', '/identity/verify/batch', None, {"id_card_numbers": [
+        "330102199001011234", "330102199002022345", "330102199003033456",
+        "330102199004044567", "330102199005055678"
+    ]}),
+    'status': ('get', '/identity/status', {"id_card_number": "330102199001011234"}, None),
+    'summary': ('get', '/appeals/summary', {"id_card_number": "330102199912212341"}, None),
+    'search': ('get', '/appeals/search', {"value": "330102199912212341"}, None),
+    'all': ('get', '/appeals/all', {"limit": 20}, None),
+}
+
+
+def percentile(values, pct):
+    """
+    计算百分位数
+
+    Args:
+        values: 已排序的数值列表
+        pct: 百分位（0-100）
+
+    Returns:
+        float: 百分位数值
+    """
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def print_report(title, count, errors, elapsed, latencies):
+    """
+    打印压测结果
+
+    Args:
+        title: 报告标题
+        count: 完成的请求数
+        errors: 失败的请求数
+        elapsed: 总耗时（秒）
+        latencies: 每个请求的耗时列表（秒）
+    """
+    latencies = sorted(latencies)
+    print("=" * 50)
+    print(title)
+    print("=" * 50)
+    print(f"请求总数: {count}，失败: {errors}，耗时: {elapsed:.2f}秒")
+    print(f"吞吐量: {count / elapsed if elapsed else 0:.1f} requests/sec")
+    if latencies:
+        print(f"延迟(ms): 平均 {statistics.mean(latencies) * 1000:.1f}，"
+              f"p50 {percentile(latencies, 50) * 1000:.1f}，"
+              f"p95 {percentile(latencies, 95) * 1000:.1f}，"
+              f"p99 {percentile(latencies, 99) * 1000:.1f}")
+
+
+def run_http_benchmark(args):
+    """
+    对指定场景的HTTP接口进行并发压测
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        bool: 是否全部请求成功
+    """
+    method, path, params, body = HTTP_SCENARIOS[args.scenario]
+    url = f"http://{args.host}:{args.port}/api{path}"
+    headers = {"token": args.token}
+    deadline = time.time() + args.duration
+
+    lock = threading.Lock()
+    latencies = []
+    stats = {'count': 0, 'errors': 0}
+
+    def worker():
+        session = requests.Session()
+        local_latencies = []
+        count = errors = 0
+        while time.time() < deadline:
+            start = time.perf_counter()
+            try:
+                resp = session.request(method, url, params=params, json=body,
+                                       headers=headers, timeout=args.timeout)
+                if resp.status_code >= 400:
+                    errors += 1
+            except requests.RequestException:
+                errors += 1
+            local_latencies.append(time.perf_counter() - start)
+            count += 1
+        with lock:
+            latencies.extend(local_latencies)
+            stats['count'] += count
+            stats['errors'] += errors
+
+    print(f"压测目标: {method.upper()} {url}，并发: {args.concurrency}，时长: {args.duration}秒")
+    started = time.time()
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+
+    print_report(f"场景 {args.scenario} 压测结果", stats['count'], stats['errors'], elapsed, latencies)
+    return stats['errors'] == 0
+
+
+def seed_summary_records(id_card_number, count):
+    """
+    为指定身份证号补足测试受理单记录
+
+    Args:
+        id_card_number: 身份证号
+        count: 需要的记录总数
+
+    Returns:
+        int: 新插入的记录数
+    """
+    from app.db_pool import get_cursor
+
+    with get_cursor(name='benchmark_count') as cursor:
+        cursor.execute("SELECT COUNT(*) AS total FROM appeal_records WHERE id_card_number = %s", (id_card_number,))
+        existing = cursor.fetchone()['total']
+
+    missing = count - existing
+    if missing <= 0:
+        return 0
+
+    query = """
+    INSERT INTO appeal_records (case_number, person_name, id_card_number, handling_department,
+                                handling_status, incident_description, markdown_doc, create_time)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    start_time = datetime.datetime(2024, 1, 1)
+    description = '基准测试数据' * 20
+    markdown_doc = '# 受理单详情\n\n' + '- 基准测试数据\n' * 100
+
+    for chunk_start in range(existing, count, 1000):
+        rows = []
+        for i in range(chunk_start, min(chunk_start + 1000, count)):
+            rows.append((
+                f"BENCH-{id_card_number}-{i:06d}", '基准测试', id_card_number,
+                SUMMARY_DEPARTMENTS[i % len(SUMMARY_DEPARTMENTS)],
+                SUMMARY_STATUSES[i % len(SUMMARY_STATUSES)],
+                description, markdown_doc,
+                start_time + datetime.timedelta(minutes=i)
+            ))
+        with get_cursor(commit=True, name='benchmark_seed') as cursor:
+            cursor.executemany("INSERT IGNORE INTO appeal_case_numbers (case_number) VALUES (%s)",
+                               [(row[0],) for row in rows])
+            cursor.executemany(query, rows)
+            index_benchmark_texts(cursor, [row[0] for row in rows])
+
+    return missing
+
+
+def index_benchmark_texts(cursor, case_numbers):
+    """
+    将直接插入的测试受理单写入全文检索表（已存在的跳过）
+
+    Args:
+        cursor: 数据库游标
+        case_numbers: 案件编号列表
+    """
+    cursor.execute(f"""
+    INSERT IGNORE INTO appeal_search_texts (id, create_time, incident_description, incident_location, address)
+    SELECT id, create_time, incident_description, incident_location, address
+    FROM appeal_records
+    WHERE case_number IN ({', '.join(['%s'] * len(case_numbers))})
+    """, case_numbers)
+
+
+def legacy_summary(id_card_number):
+    """
+    旧的摘要实现：取出该身份证号的全部记录，在Python中统计（作为对比基线）
+
+    Args:
+        id_card_number: 身份证号
+
+    Returns:
+        dict: 摘要信息
+    """
+    from app.db_pool import get_cursor
+
+    with get_cursor(name='benchmark_legacy_summary', readonly=True) as cursor:
+        cursor.execute("SELECT * FROM appeal_records WHERE id_card_number = %s ORDER BY create_time DESC",
+                       (id_card_number,))
+        records = cursor.fetchall()
+
+    status_stats = {}
+    for record in records:
+        status = record.get('handling_status') or '未知'
+        status_stats[status] = status_stats.get(status, 0) + 1
+
+    return {
+        'person_name': records[0]['person_name'] if records else None,
+        'appeal_count': len(records),
+        'latest_appeal': max(record['create_time'] for record in records) if records else None,
+        'handling_status_stats': status_stats,
+        'departments': list(set(record.get('handling_department') or '未知' for record in records))
+    }
+
+
+def time_calls(func, iterations):
+    """
+    重复调用函数并记录每次耗时
+
+    Args:
+        func: 无参数的函数
+        iterations: 调用次数
+
+    Returns:
+        tuple: (总耗时, 每次耗时列表)
+    """
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - call_start)
+    return time.perf_counter() - started, latencies
+
+
+def run_summary_benchmark(args):
+    """
+    对比受理单摘要的SQL聚合实现与逐行统计实现
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        bool: 两种实现的统计结果是否一致
+    """
+    from app.db_pool import get_cursor
+    from app.models import database
+
+    inserted = seed_summary_records(args.id_card_number, args.records)
+    print(f"身份证号 {args.id_card_number}: 新插入 {inserted} 条记录，目标 {args.records} 条")
+
+    try:
+        summary = database.get_appeal_summary_by_id_card(args.id_card_number)
+        baseline = legacy_summary(args.id_card_number)
+        consistent = (
+            summary is not None
+            and summary['appeal_count'] == baseline['appeal_count']
+            and summary['handling_status_stats'] == baseline['handling_status_stats']
+            and sorted(summary['departments']) == sorted(baseline['departments'])
+        )
+        print(f"结果一致: {'是' if consistent else '否'}，记录数: {summary['appeal_count'] if summary else 0}")
+
+        elapsed, latencies = time_calls(lambda: database.get_appeal_summary_by_id_card(args.id_card_number),
+                                        args.iterations)
+        print_report("SQL聚合（单条查询）", args.iterations, 0, elapsed, latencies)
+
+        elapsed, latencies = time_calls(lambda: legacy_summary(args.id_card_number), args.iterations)
+        print_report("逐行取出后在Python中统计", args.iterations, 0, elapsed, latencies)
+    finally:
+        if args.cleanup:
+            delete_benchmark_records(args.id_card_number)
+
+    return consistent
+
+
+def delete_benchmark_records(id_card_number):
+    """
+    删除测试身份证号下的基准测试数据及其摘要
+
+    Args:
+        id_card_number: 测试数据使用的身份证号
+    """
+    from app.db_pool import get_cursor
+
+    with get_cursor(commit=True, name='benchmark_cleanup') as cursor:
+        cursor.execute("""
+        DELETE c FROM appeal_case_numbers c
+        JOIN appeal_records r ON r.case_number = c.case_number
+        WHERE r.id_card_number = %s AND r.case_number LIKE 'BENCH-%%'
+        """, (id_card_number,))
+        cursor.execute("""
+        DELETE t FROM appeal_search_texts t
+        JOIN appeal_records r ON r.id = t.id AND r.create_time = t.create_time
+        WHERE r.id_card_number = %s AND r.case_number LIKE 'BENCH-%%'
+        """, (id_card_number,))
+        cursor.execute("DELETE FROM appeal_records WHERE id_card_number = %s AND case_number LIKE 'BENCH-%%'",
+                       (id_card_number,))
+        cursor.execute("DELETE FROM appeal_summaries WHERE id_card_number = %s", (id_card_number,))
+    print("已删除测试数据")
+
+
+def make_ingest_record(prefix, index):
+    """
+    生成一条写入基准测试使用的受理单
+
+    Args:
+        prefix: 案件编号前缀
+        index: 序号
+
+    Returns:
+        dict: 受理单数据
+    """
+    return {
+        "case_number": f"{prefix}-{index:06d}",
+        "person_name": "基准测试",
+        "id_card_number": SUMMARY_ID_CARD,
+        "handling_department": SUMMARY_DEPARTMENTS[index % len(SUMMARY_DEPARTMENTS)],
+        "handling_status": SUMMARY_STATUSES[index % len(SUMMARY_STATUSES)],
+        "incident_description": "基准测试数据"
+    }
+
+
+def run_ingest_benchmark(args):
+    """
+    对比单条添加接口与批量添加接口的写入吞吐量
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        bool: 是否全部记录写入成功
+    """
+    base_url = f"http://{args.host}:{args.port}/api/appeals"
+    session = requests.Session()
+    session.headers.update({"token": args.token})
+    run_id = time.strftime('%Y%m%d%H%M%S')
+    errors = 0
+
+    try:
+        # 单条接口
+        latencies = []
+        single_errors = 0
+        started = time.perf_counter()
+        for i in range(args.records):
+            call_start = time.perf_counter()
+            resp = session.post(base_url, json=make_ingest_record(f"BENCH-S-{run_id}", i), timeout=args.timeout)
+            latencies.append(time.perf_counter() - call_start)
+            if resp.status_code >= 400 or resp.json().get('success') != 1:
+                single_errors += 1
+        single_elapsed = time.perf_counter() - started
+        print_report("单条接口 POST /api/appeals（每请求1条）", args.records, single_errors, single_elapsed, latencies)
+
+        # 批量接口
+        latencies = []
+        batch_errors = 0
+        started = time.perf_counter()
+        for start in range(0, args.records, args.batch_size):
+            records = [make_ingest_record(f"BENCH-B-{run_id}", i)
+                       for i in range(start, min(start + args.batch_size, args.records))]
+            call_start = time.perf_counter()
+            resp = session.post(f"{base_url}/batch", json={"records": records}, timeout=args.timeout)
+            latencies.append(time.perf_counter() - call_start)
+            if resp.status_code >= 400:
+                batch_errors += len(records)
+            else:
+                batch_errors += resp.json()['data']['failed']
+        batch_elapsed = time.perf_counter() - started
+        print_report(f"批量接口 POST /api/appeals/batch（每请求{args.batch_size}条）",
+                     args.records, batch_errors, batch_elapsed, latencies)
+
+        single_rate = args.records / single_elapsed if single_elapsed else 0
+        batch_rate = args.records / batch_elapsed if batch_elapsed else 0
+        print(f"写入速度: 单条 {single_rate:.1f} records/sec，批量 {batch_rate:.1f} records/sec，"
+              f"提升 {batch_rate / single_rate if single_rate else 0:.1f} 倍")
+        errors = single_errors + batch_errors
+    finally:
+        if args.cleanup:
+            delete_benchmark_records(SUMMARY_ID_CARD)
+
+    return errors == 0
+
+
+def seed_fulltext_records(count):
+    """
+    补足全文检索基准测试的受理单记录，事件描述由若干固定话题和地点组合生成
+
+    Args:
+        count: 需要的记录总数
+
+    Returns:
+        int: 新插入的记录数
+    """
+    from app.db_pool import get_cursor
+
+    with get_cursor(name='benchmark_count') as cursor:
+        cursor.execute("SELECT COUNT(*) AS total FROM appeal_records WHERE id_card_number = %s", (FULLTEXT_ID_CARD,))
+        existing = cursor.fetchone()['total']
+
+    missing = count - existing
+    if missing <= 0:
+        return 0
+
+    query = """
+    INSERT INTO appeal_records (case_number, person_name, id_card_number, handling_department, handling_status,
+                                incident_location, address, incident_description, create_time)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    start_time = datetime.datetime(2024, 1, 1)
+
+    for chunk_start in range(existing, count, 1000):
+        rows = []
+        for i in range(chunk_start, min(chunk_start + 1000, count)):
+            topic = FULLTEXT_TOPICS[i % len(FULLTEXT_TOPICS)]
+            other_topic = FULLTEXT_TOPICS[(i // len(FULLTEXT_TOPICS)) % len(FULLTEXT_TOPICS)]
+            place = FULLTEXT_PLACES[(i // 7) % len(FULLTEXT_PLACES)]
+            building = i % 30 + 1
+            rows.append((
+                f"BENCH-FT-{i:07d}", '基准测试', FULLTEXT_ID_CARD,
+                SUMMARY_DEPARTMENTS[i % len(SUMMARY_DEPARTMENTS)],
+                SUMMARY_STATUSES[i % len(SUMMARY_STATUSES)],
+                f"{place}{building}号楼", f"测试市测试区{place}{building}号楼{i % 6 + 1}单元",
+                f"当事人反映{place}{building}号楼{topic}，此前曾因{other_topic}与对方协商，"
+                f"经社区多次调解未果，现申请调解处理。",
+                start_time + datetime.timedelta(seconds=i * 30)
+            ))
+        with get_cursor(commit=True, name='benchmark_seed') as cursor:
+            cursor.executemany("INSERT IGNORE INTO appeal_case_numbers (case_number) VALUES (%s)",
+                               [(row[0],) for row in rows])
+            cursor.executemany(query, rows)
+            index_benchmark_texts(cursor, [row[0] for row in rows])
+        done = chunk_start - existing + len(rows)
+        if done % 100000 == 0 or done == missing:
+            print(f"已插入 {done} / {missing} 条")
+
+    return missing
+
+
+def like_search(keyword, limit):
+    """全文索引之前的检索方式：三个字段做 LIKE '%关键词%' 匹配，只能全表扫描"""
+    from app.db_pool import get_cursor
+
+    pattern = f"%{keyword}%"
+    with get_cursor(name='benchmark_like_search', readonly=True) as cursor:
+        cursor.execute("""
+        SELECT * FROM appeal_records
+        WHERE incident_description LIKE %s OR incident_location LIKE %s OR address LIKE %s
+        ORDER BY create_time DESC, id DESC
+        LIMIT %s
+        """, (pattern, pattern, pattern, limit))
+        return cursor.fetchall()
+
+
+def run_fulltext_benchmark(args):
+    """
+    对比FULLTEXT全文检索与 LIKE '%关键词%' 模糊匹配的查询延迟
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        bool: 全文检索是否对每个关键词都有结果
+    """
+    from app.models import database
+
+    started = time.perf_counter()
+    inserted = seed_fulltext_records(args.records)
+    print(f"全文检索测试数据: 新插入 {inserted} 条记录，目标 {args.records} 条，"
+          f"用时 {time.perf_counter() - started:.1f} 秒")
+
+    all_found = True
+    try:
+        for keyword in args.keywords:
+            _, records = database.fulltext_search_appeal_records(keyword, mode=args.mode, limit=args.limit,
+                                                                 include_total=False)
+            all_found = all_found and bool(records)
+            print(f"\n关键词 \"{keyword}\": 全文检索返回 {len(records)} 条，"
+                  f"LIKE 返回 {len(like_search(keyword, args.limit))} 条")
+
+            elapsed, latencies = time_calls(
+                lambda: database.fulltext_search_appeal_records(keyword, mode=args.mode, limit=args.limit,
+                                                                include_total=False),
+                args.iterations
+            )
+            print_report(f"FULLTEXT ngram（{args.mode}）", args.iterations, 0, elapsed, latencies)
+
+            elapsed, latencies = time_calls(lambda: like_search(keyword, args.limit), args.iterations)
+            print_report("LIKE '%关键词%'", args.iterations, 0, elapsed, latencies)
+    finally:
+        if args.cleanup:
+            delete_benchmark_records(FULLTEXT_ID_CARD)
+
+    return all_found
+
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description='矛盾调解受理服务性能基准测试')
+    subparsers = parser.add_subparsers(dest='command')
+
+    http_parser = subparsers.add_parser('http', help='HTTP接口并发压测')
+    http_parser.add_argument('--host', default='127.0.0.1', help='API服务器主机名或IP')
+    http_parser.add_argument('--port', type=int, default=8701, help='API服务器端口')
+    http_parser.add_argument('--token', default='api_token_2025', help='API令牌')
+    http_parser.add_argument('--scenario', default='verify', choices=sorted(HTTP_SCENARIOS), help='压测场景')
+    http_parser.add_argument('--concurrency', type=int, default=8, help='并发线程数')
+    http_parser.add_argument('--duration', type=int, default=30, help='压测时长(秒)')
+    http_parser.add_argument('--timeout', type=int, default=10, help='单个请求超时时间(秒)')
+    http_parser.set_defaults(func=run_http_benchmark)
+
+    summary_parser = subparsers.add_parser('summary', help='受理单摘要SQL聚合与逐行统计对比')
+    summary_parser.add_argument('--id-card-number', default=SUMMARY_ID_CARD, help='测试数据使用的身份证号')
+    summary_parser.add_argument('--records', type=int, default=10000, help='该身份证号的受理单数量')
+    summary_parser.add_argument('--iterations', type=int, default=50, help='每种实现的调用次数')
+    summary_parser.add_argument('--cleanup', action='store_true', help='结束后删除测试数据')
+    summary_parser.set_defaults(func=run_summary_benchmark)
+
+    ingest_parser = subparsers.add_parser('ingest', help='单条与批量添加受理单接口的写入吞吐量对比')
+    ingest_parser.add_argument('--host', default='127.0.0.1', help='API服务器主机名或IP')
+    ingest_parser.add_argument('--port', type=int, default=8701, help='API服务器端口')
+    ingest_parser.add_argument('--token', default='api_token_2025', help='API令牌')
+    ingest_parser.add_argument('--records', type=int, default=2000, help='每种方式写入的记录数')
+    ingest_parser.add_argument('--batch-size', type=int, default=500, help='批量接口每个请求的记录数')
+    ingest_parser.add_argument('--timeout', type=int, default=60, help='单个请求超时时间(秒)')
+    ingest_parser.add_argument('--cleanup', action='store_true', help='结束后删除测试数据（需要数据库连接配置）')
+    ingest_parser.set_defaults(func=run_ingest_benchmark)
+
+    fulltext_parser = subparsers.add_parser('fulltext', help='FULLTEXT全文检索与LIKE模糊匹配的查询延迟对比')
+    fulltext_parser.add_argument('--records', type=int, default=1000000, help='测试受理单数量')
+    fulltext_parser.add_argument('--keywords', nargs='+', default=FULLTEXT_KEYWORDS, help='检索关键词')
+    fulltext_parser.add_argument('--mode', default='natural', choices=['natural', 'phrase'], help='全文检索模式')
+    fulltext_parser.add_argument('--limit', type=int, default=20, help='每次查询返回的记录数')
+    fulltext_parser.add_argument('--iterations', type=int, default=20, help='每个关键词每种方式的调用次数')
+    fulltext_parser.add_argument('--cleanup', action='store_true', help='结束后删除测试数据')
+    fulltext_parser.set_defaults(func=run_fulltext_benchmark)
+
+    return parser
+
+
+if __name__ == "__main__":
+    parser = build_parser()
+    args = parser.parse_args()
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        sys.exit(1)
+    sys.exit(0 if args.func(args) else 1)
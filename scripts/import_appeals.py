@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+"""
+受理单历史数据导入脚本 - 从CSV或NDJSON文件批量导入受理单记录
+
+逐行读取文件，内存占用与文件大小无关；每条记录按接口相同的规则验证，并校验身份证号和联系电话，
+验证失败或写入失败的记录连同原因写入拒绝文件（NDJSON）。通过验证的记录按 --chunk-size 条一批，
+由 --workers 个线程并发写入，每批一个事务（与 POST /api/appeals/batch 相同，同时更新受理单摘要）。
+
+已完成的行数记录在检查点文件中，中断后重新执行同一命令会从检查点继续；检查点之后正在写入的
+几批记录重新导入时会因案件编号已存在被拒绝，可以忽略。
+
+已清洗过的CSV文件可以使用 --load-data 通过 LOAD DATA LOCAL INFILE 直接导入（不做验证、
+不记录检查点，每个文件一个事务，有重复或已存在的案件编号时整个文件回滚）。提交后按 --chunk-size
+个身份证号一批重新计算导入涉及的受理单摘要，并使这些摘要和案件编号的缓存失效。
+需要MySQL服务端开启 local_infile。
+
+用法示例:
+    python scripts/import_appeals.py data/appeals_2023.csv data/appeals_2024.ndjson --workers 4
+    python scripts/import_appeals.py data/cleaned.csv --load-data
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql.connector
+
+from app import db_pool
+from app.config import BATCH_CONFIG, DB_CONFIG
+from app.models import database
+from app.validators import APPEAL_FIELDS, validate_appeal_record, validate_id_card, validate_phone
+
+# 导出文件中的自增ID，导入时忽略
+IGNORED_FIELDS = ('id',)
+
+
+def detect_format(path, file_format):
+    """根据参数或扩展名确定文件格式"""
+    if file_format != 'auto':
+        return file_format
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+
+def read_records(path, file_format):
+    """
+    逐行读取文件中的记录
+
+    Yields:
+        tuple: (行号, 记录, None)；无法解析的行为 (行号, None, 错误信息)
+    """
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if file_format == 'csv':
+            for row_number, row in enumerate(csv.DictReader(f), start=1):
+                yield row_number, row, None
+        else:
+            for row_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    yield row_number, None, "空行"
+                    continue
+                try:
+                    yield row_number, json.loads(line), None
+                except ValueError as e:
+                    yield row_number, None, f"JSON格式错误: {e}"
+
+
+def clean_record(record):
+    """
+    整理并验证一条记录
+
+    空字符串视为未填写（使用数据库默认值），导出文件中的 id 字段被忽略
+
+    Returns:
+        tuple: (整理后的记录, 错误信息或None)
+    """
+    if not isinstance(record, dict):
+        return record, "记录格式错误，应为JSON对象"
+
+    record = {
+        field: value for field, value in record.items()
+        if field not in IGNORED_FIELDS and value is not None and value != ''
+    }
+
+    error = validate_appeal_record(record)
+    if error:
+        return record, error
+    if not validate_id_card(str(record['id_card_number'])):
+        return record, "身份证号格式错误"
+    if record.get('contact_info') and not validate_phone(str(record['contact_info'])):
+        return record, "联系电话格式错误"
+
+    return record, None
+
+
+class Checkpoint:
+    """
+    导入检查点 - 记录每个文件已连续完成的行数
+
+    各批次由不同线程写入，完成顺序不固定，只有某一行之前的所有批次都完成后检查点才前移
+    """
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.files = json.load(f)
+
+    def rows_done(self, source):
+        return self.files.get(source, {}).get('rows_done', 0)
+
+    def save(self, source, rows_done):
+        self.files[source] = {'rows_done': rows_done, 'update_time': time.strftime('%Y-%m-%d %H:%M:%S')}
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.files, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+
+class Importer:
+    """按批次并发写入受理单记录，并汇总进度"""
+    def __init__(self, args):
+        self.args = args
+        self.checkpoint = Checkpoint(args.checkpoint)
+        self.dead_letter = open(args.dead_letter, 'a', encoding='utf-8')
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self.stats = {'read': 0, 'imported': 0, 'rejected': 0}
+
+    def close(self):
+        self.dead_letter.close()
+
+    def reject(self, source, row_number, record, error):
+        """将被拒绝的记录写入拒绝文件"""
+        self.stats['rejected'] += 1
+        self.dead_letter.write(json.dumps(
+            {'file': source, 'row': row_number, 'error': error, 'record': record},
+            ensure_ascii=False, default=str
+        ) + '\n')
+
+    def report(self, force=False):
+        """每隔 --progress-interval 秒输出一次进度"""
+        now = time.monotonic()
+        if not force and now - self.last_report < self.args.progress_interval:
+            return
+        self.last_report = now
+        elapsed = max(now - self.started, 1e-6)
+        print(
+            f"已读取 {self.stats['read']} 条，导入 {self.stats['imported']} 条，"
+            f"拒绝 {self.stats['rejected']} 条，{self.stats['imported'] / elapsed:.0f} 条/秒"
+        )
+
+    def import_file(self, path):
+        """导入一个文件，从检查点记录的位置继续"""
+        source = os.path.abspath(path)
+        file_format = detect_format(path, self.args.format)
+        skip = self.checkpoint.rows_done(source)
+        if skip:
+            print(f"{path}: 从检查点继续，跳过前 {skip} 行")
+
+        # 已完成批次的 起始行号 -> 结束行号，按行号顺序推进检查点
+        finished_ranges = {}
+        rows_done = skip
+        futures = {}
+        chunk = []
+        chunk_start = None
+
+        def advance_checkpoint():
+            nonlocal rows_done
+            while rows_done + 1 in finished_ranges:
+                rows_done = finished_ranges.pop(rows_done + 1)
+            self.checkpoint.save(source, rows_done)
+
+        def collect(done):
+            for future in done:
+                start, end, items = futures.pop(future)
+                for (row_number, record), (_, success, message) in zip(items, future.result()):
+                    if success:
+                        self.stats['imported'] += 1
+                    else:
+                        self.reject(source, row_number, record, message)
+                finished_ranges[start] = end
+            advance_checkpoint()
+            self.report()
+
+        def submit(start, end, items):
+            # 限制同时在途的批次数，保证内存占用恒定
+            while len(futures) >= self.args.workers * 2:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = executor.submit(
+                database.add_appeal_records_batch,
+                [(position, record) for position, (_, record) in enumerate(items)],
+                len(items)
+            )
+            futures[future] = (start, end, items)
+
+        with ThreadPoolExecutor(max_workers=self.args.workers) as executor:
+            for row_number, record, error in read_records(path, file_format):
+                if row_number <= skip:
+                    continue
+                self.stats['read'] += 1
+                if chunk_start is None:
+                    chunk_start = row_number
+
+                if error is None:
+                    record, error = clean_record(record)
+                if error:
+                    self.reject(source, row_number, record, error)
+                else:
+                    chunk.append((row_number, record))
+
+                if len(chunk) >= self.args.chunk_size:
+                    submit(chunk_start, row_number, chunk)
+                    chunk = []
+                    chunk_start = None
+
+            if chunk_start is not None:
+                if chunk:
+                    submit(chunk_start, row_number, chunk)
+                else:
+                    # 最后几行全部被拒绝
+                    finished_ranges[chunk_start] = row_number
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        advance_checkpoint()
+        self.dead_letter.flush()
+        print(f"{path}: 导入完成，共 {rows_done} 行")
+
+
+def load_data(path, chunk_size):
+    """
+    通过 LOAD DATA LOCAL INFILE 导入已清洗的CSV文件（首行为字段名）
+
+    提交后按 chunk_size 个一批，重新计算导入涉及的身份证号的摘要并使缓存失效，
+    最后使导入的案件编号的缓存失效（此前查询过的编号可能缓存了"不存在"以外的旧数据）
+
+    Returns:
+        tuple: (导入的行数, 重新计算的摘要数量)
+    """
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        header = next(csv.reader(f), None)
+    if not header:
+        raise ValueError(f"{path} 缺少表头")
+
+    columns = []
+    for column in header:
+        column = column.strip()
+        if column in IGNORED_FIELDS:
+            columns.append('@ignored')
+        elif column in APPEAL_FIELDS:
+            columns.append(column)
+        else:
+            raise ValueError(f"{path} 包含未知字段: {column}")
+
+    fields = [column for column in columns if column != '@ignored']
+    conn = mysql.connector.connect(**DB_CONFIG, allow_local_infile=True)
+    try:
+        cursor = conn.cursor()
+        # 先导入临时表，登记案件编号后再写入受理单表；有重复或已存在的案件编号时整个文件回滚
+        cursor.execute(f"""
+        CREATE TEMPORARY TABLE appeal_import_staging (INDEX (id_card_number), INDEX (case_number))
+        SELECT {', '.join(fields)} FROM appeal_records LIMIT 0
+        """)
+        cursor.execute(f"""
+        LOAD DATA LOCAL INFILE %s INTO TABLE appeal_import_staging
+        CHARACTER SET utf8mb4
+        FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+        LINES TERMINATED BY '\\n'
+        IGNORE 1 LINES
+        ({', '.join(columns)})
+        """, (os.path.abspath(path),))
+        loaded = cursor.rowcount
+        try:
+            cursor.execute("INSERT INTO appeal_case_numbers (case_number) SELECT case_number FROM appeal_import_staging")
+        except mysql.connector.errors.IntegrityError as e:
+            raise ValueError(f"{path} 中有重复或已存在的案件编号，请改用逐条验证的方式导入: {e}")
+        cursor.execute(f"""
+        INSERT INTO appeal_records ({', '.join(fields)})
+        SELECT {', '.join(fields)} FROM appeal_import_staging
+        """)
+        cursor.execute("""
+        INSERT INTO appeal_search_texts (id, create_time, incident_description, incident_location, address)
+        SELECT r.id, r.create_time, r.incident_description, r.incident_location, r.address
+        FROM appeal_records r
+        JOIN appeal_import_staging s ON s.case_number = r.case_number
+        """)
+        conn.commit()
+
+        # 导入的记录没有经过 add_appeal_records_batch，提交后补上摘要和缓存失效
+        summaries = 0
+        for id_card_numbers in _staged_values(cursor, 'id_card_number', chunk_size):
+            summaries += database.refresh_imported_appeals(id_card_numbers, [])
+        for case_numbers in _staged_values(cursor, 'case_number', chunk_size):
+            database.refresh_imported_appeals([], case_numbers)
+        cursor.close()
+        return loaded, summaries
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _staged_values(cursor, column, chunk_size):
+    """
+    按索引顺序分批读取临时表中某个字段的不重复值
+
+    Yields:
+        list: 一批值
+    """
+    last_value = ''
+    while True:
+        cursor.execute(f"""
+        SELECT DISTINCT {column} FROM appeal_import_staging WHERE {column} > %s ORDER BY {column} LIMIT %s
+        """, (last_value, chunk_size))
+        values = [row[0] for row in cursor.fetchall()]
+        if not values:
+            return
+        yield values
+        last_value = values[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='从CSV/NDJSON文件导入受理单历史数据')
+    parser.add_argument('files', nargs='+', help='要导入的文件，CSV首行为字段名，NDJSON每行一个JSON对象')
+    parser.add_argument('--format', choices=['auto', 'csv', 'ndjson'], default='auto',
+                        help='文件格式，默认按扩展名判断')
+    parser.add_argument('--chunk-size', type=int, default=BATCH_CONFIG['chunk_size'], help='每个事务写入的记录数')
+    parser.add_argument('--workers', type=int, default=4, help='并发写入的线程数（不应超过连接池大小）')
+    parser.add_argument('--checkpoint', default='import_appeals.checkpoint.json', help='检查点文件')
+    parser.add_argument('--dead-letter', default='import_appeals.rejected.ndjson', help='被拒绝记录的输出文件')
+    parser.add_argument('--progress-interval', type=float, default=5, help='输出进度的间隔(秒)')
+    parser.add_argument('--load-data', action='store_true',
+                        help='使用 LOAD DATA LOCAL INFILE 导入已清洗的CSV文件（不验证、不记录检查点）')
+    args = parser.parse_args()
+
+    try:
+        if args.load_data:
+            for path in args.files:
+                if detect_format(path, args.format) != 'csv':
+                    print(f"{path}: --load-data 只支持CSV文件")
+                    return False
+                started = time.monotonic()
+                loaded, summaries = load_data(path, args.chunk_size)
+                print(f"{path}: 导入 {loaded} 行，更新 {summaries} 个身份证号的摘要，"
+                      f"用时 {time.monotonic() - started:.1f} 秒")
+            return True
+
+        importer = Importer(args)
+        try:
+            for path in args.files:
+                importer.import_file(path)
+        finally:
+            importer.report(force=True)
+            importer.close()
+        if importer.stats['rejected']:
+            print(f"被拒绝的记录已写入 {args.dead_letter}")
+        return True
+    except KeyboardInterrupt:
+        print("导入已中断，重新执行同一命令将从检查点继续")
+        return False
+    except Exception as e:
+        print(f"导入受理单失败: {e}")
+        return False
+    finally:
+        db_pool.close_pool()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
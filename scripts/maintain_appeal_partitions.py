@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""
+受理单分区维护脚本 - 提前创建 appeal_records 之后几个月的月份分区
+
+可重复执行，建议每天通过cron执行一次（服务启动时也会执行一次）；新分区从空的 pmax 分区中拆分，
+不复制数据。漏执行期间写入的记录保存在 pmax 中，下次执行时复制到对应的月份分区；
+表中没有 pmax 分区时先补上。
+
+用法示例:
+    python scripts/maintain_appeal_partitions.py --months-ahead 3
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db_pool
+from app.config import ARCHIVE_CONFIG
+from app.models import database
+
+
+def main():
+    parser = argparse.ArgumentParser(description='创建受理单表之后几个月的分区')
+    parser.add_argument('--months-ahead', type=int, default=ARCHIVE_CONFIG['partition_months_ahead'],
+                        help='当前月份之后需要存在的分区数')
+    args = parser.parse_args()
+
+    try:
+        created = database.ensure_appeal_partitions(months_ahead=args.months_ahead)
+        print(f"受理单分区检查完成，新建 {created} 个分区")
+        return True
+    except Exception as e:
+        print(f"受理单分区维护失败: {e}")
+        return False
+    finally:
+        db_pool.close_pool()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
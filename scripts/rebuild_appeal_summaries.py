@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+"""
+受理单摘要重建脚本 - 根据受理单记录分批重建 appeal_summaries 表
+
+上线摘要表（执行 sql/migrations/003_appeal_summaries.sql）后执行一次，
+或怀疑摘要与受理单记录不一致时重新执行；每批一个事务，可在服务运行时执行。
+
+用法示例:
+    python scripts/rebuild_appeal_summaries.py --chunk-size 500
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db_pool
+from app.models import database
+
+
+def main():
+    parser = argparse.ArgumentParser(description='重建受理单摘要表')
+    parser.add_argument('--chunk-size', type=int, default=500, help='每批处理的身份证号数量')
+    args = parser.parse_args()
+
+    try:
+        total = database.rebuild_appeal_summaries(chunk_size=args.chunk_size)
+        print(f"受理单摘要重建完成，共 {total} 个身份证号")
+        return True
+    except Exception as e:
+        print(f"受理单摘要重建失败: {e}")
+        return False
+    finally:
+        db_pool.close_pool()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
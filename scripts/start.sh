@@ -42,12 +42,12 @@ echo "启动矛盾调解受理服务API..."
 # 根据环境选择启动方式
 if [ "$FLASK_ENV" = "production" ]; then
   # 生产环境：使用Gunicorn
-  gunicorn -w 4 -b ${SERVER_HOST:-0.0.0.0}:${SERVER_PORT:-8701} run:app \
+  gunicorn -c gunicorn.conf.py -w ${GUNICORN_WORKERS:-4} -b ${SERVER_HOST:-0.0.0.0}:${SERVER_PORT:-8701} run:app \
            --timeout 120 --access-logfile "$ROOT_DIR/logs/access.log" \
            --error-logfile "$ROOT_DIR/logs/error.log" --daemon
 else
   # 开发环境：使用Gunicorn但启用自动重载
-  gunicorn -w 2 -b ${SERVER_HOST:-0.0.0.0}:${SERVER_PORT:-8701} run:app \
+  gunicorn -c gunicorn.conf.py -w 2 -b ${SERVER_HOST:-0.0.0.0}:${SERVER_PORT:-8701} run:app \
            --timeout 120 --reload --access-logfile "$ROOT_DIR/logs/access.log" \
            --error-logfile "$ROOT_DIR/logs/error.log" --daemon
 fi
@@ -24,9 +24,9 @@ CREATE TABLE IF NOT EXISTS verification_logs (
     FOREIGN KEY (user_id) REFERENCES users(id)
 ) COMMENT='身份验证日志表';
 
--- 创建历史受理单记录表
+-- 创建历史受理单记录表（按创建时间月份分区，之后的月份分区由 scripts/maintain_appeal_partitions.py 添加）
 CREATE TABLE IF NOT EXISTS appeal_records (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
     case_number VARCHAR(50) NOT NULL COMMENT '受理编号',
     person_name VARCHAR(50) NOT NULL COMMENT '姓名',
     contact_info VARCHAR(20) DEFAULT NULL COMMENT '联系方式',
@@ -41,13 +41,90 @@ CREATE TABLE IF NOT EXISTS appeal_records (
     handling_department VARCHAR(50) DEFAULT NULL COMMENT '处理部门',
     handling_status VARCHAR(20) DEFAULT NULL COMMENT '处理状态',
     expected_completion VARCHAR(50) DEFAULT NULL COMMENT '预计完成时间',
-    create_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    create_time DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    qr_code VARCHAR(255) DEFAULT NULL COMMENT '二维码URL或数据',
+    markdown_doc TEXT COMMENT 'Markdown格式文档',
+    PRIMARY KEY (id, create_time)
+) COMMENT='历史受理单记录表'
+PARTITION BY RANGE (TO_DAYS(create_time)) (
+    PARTITION p202610 VALUES LESS THAN (TO_DAYS('2026-11-01')),
+    -- 兜底分区：之后的记录在月份分区创建之前都写入 pmax，分区维护漏执行也不会写入失败；
+    -- scripts/maintain_appeal_partitions.py 用 REORGANIZE PARTITION 从 pmax 拆分出之后的月份分区
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- 创建案件编号登记表（分区表的唯一索引必须包含分区字段，案件编号的全局唯一由该表保证）
+CREATE TABLE IF NOT EXISTS appeal_case_numbers (
+    case_number VARCHAR(50) NOT NULL PRIMARY KEY COMMENT '受理编号',
+    create_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '登记时间'
+) COMMENT='受理单案件编号登记表';
+
+-- 创建受理单全文检索表（分区表不支持FULLTEXT索引，检索字段单独保存，随受理单写入和归档维护）
+CREATE TABLE IF NOT EXISTS appeal_search_texts (
+    id INT NOT NULL PRIMARY KEY COMMENT '受理单ID',
+    create_time DATETIME NOT NULL COMMENT '受理单创建时间',
+    incident_description TEXT COMMENT '事件描述',
+    incident_location VARCHAR(255) DEFAULT NULL COMMENT '事件地点',
+    address VARCHAR(255) DEFAULT NULL COMMENT '地址',
+    INDEX idx_search_create_time (create_time),
+    FULLTEXT INDEX ft_appeal_search (incident_description, incident_location, address) WITH PARSER ngram
+) COMMENT='受理单全文检索表';
+
+-- 创建受理单归档表（已结案且超过保留期的受理单，字段顺序与 appeal_records 相同）
+CREATE TABLE IF NOT EXISTS appeal_records_archive (
+    id INT NOT NULL PRIMARY KEY,
+    case_number VARCHAR(50) NOT NULL COMMENT '受理编号',
+    person_name VARCHAR(50) NOT NULL COMMENT '姓名',
+    contact_info VARCHAR(20) DEFAULT NULL COMMENT '联系方式',
+    gender VARCHAR(10) DEFAULT NULL COMMENT '性别',
+    id_card_number VARCHAR(20) DEFAULT NULL COMMENT '身份证号',
+    address VARCHAR(255) DEFAULT NULL COMMENT '地址',
+    incident_time VARCHAR(50) DEFAULT NULL COMMENT '事件时间',
+    incident_location VARCHAR(255) DEFAULT NULL COMMENT '事件地点',
+    incident_description TEXT COMMENT '事件描述',
+    people_involved VARCHAR(10) DEFAULT NULL COMMENT '涉及人数',
+    submitted_materials TEXT COMMENT '提交材料',
+    handling_department VARCHAR(50) DEFAULT NULL COMMENT '处理部门',
+    handling_status VARCHAR(20) DEFAULT NULL COMMENT '处理状态',
+    expected_completion VARCHAR(50) DEFAULT NULL COMMENT '预计完成时间',
+    create_time DATETIME NOT NULL COMMENT '创建时间',
     qr_code VARCHAR(255) DEFAULT NULL COMMENT '二维码URL或数据',
-    markdown_doc TEXT COMMENT 'Markdown格式文档'
-) COMMENT='历史受理单记录表';
+    markdown_doc TEXT COMMENT 'Markdown格式文档',
+    UNIQUE KEY uk_archive_case_number (case_number),
+    INDEX idx_archive_create_time (create_time, id),
+    INDEX idx_archive_id_card_time (id_card_number, create_time, id),
+    INDEX idx_archive_contact_time (contact_info, create_time, id),
+    INDEX idx_archive_person_name_time (person_name, create_time, id)
+) COMMENT='历史受理单归档表';
+
+-- 创建受理单摘要表（按身份证号汇总，随受理单写入增量维护）
+CREATE TABLE IF NOT EXISTS appeal_summaries (
+    id_card_number VARCHAR(20) NOT NULL PRIMARY KEY COMMENT '身份证号',
+    person_name VARCHAR(50) DEFAULT NULL COMMENT '最新一条受理单的姓名',
+    appeal_count INT NOT NULL DEFAULT 0 COMMENT '受理单数量',
+    latest_time DATETIME DEFAULT NULL COMMENT '最新受理时间',
+    status_stats JSON NOT NULL COMMENT '办理状态 -> 数量',
+    department_stats JSON NOT NULL COMMENT '办理部门 -> 数量',
+    update_time DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) COMMENT='受理单摘要表';
+
+-- 创建幂等键表（保存带 Idempotency-Key 的写请求的响应，重试时直接返回）
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idempotency_key VARCHAR(128) NOT NULL PRIMARY KEY COMMENT '幂等键',
+    request_hash CHAR(64) NOT NULL COMMENT '请求方法、路径和请求体的SHA-256',
+    status_code INT NOT NULL COMMENT '响应状态码',
+    response_body MEDIUMTEXT NOT NULL COMMENT '响应内容',
+    create_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    INDEX idx_idempotency_create_time (create_time)
+) COMMENT='写请求幂等键表';
 
 -- 创建索引
 CREATE INDEX IF NOT EXISTS idx_users_id_card_number ON users(id_card_number);
-CREATE INDEX IF NOT EXISTS idx_appeal_id_card_number ON appeal_records(id_card_number);
 CREATE INDEX IF NOT EXISTS idx_appeal_case_number ON appeal_records(case_number);
-CREATE INDEX IF NOT EXISTS idx_appeal_contact_info ON appeal_records(contact_info); 
\ No newline at end of file
+-- 列表按 create_time DESC, id DESC 排序，复合索引同时支持过滤、排序和游标分页定位
+CREATE INDEX IF NOT EXISTS idx_appeal_create_time ON appeal_records(create_time, id);
+CREATE INDEX IF NOT EXISTS idx_appeal_id_card_time ON appeal_records(id_card_number, create_time, id);
+CREATE INDEX IF NOT EXISTS idx_appeal_contact_time ON appeal_records(contact_info, create_time, id);
+-- 未指定类型的搜索按姓名精确/前缀匹配
+CREATE INDEX IF NOT EXISTS idx_appeal_person_name_time ON appeal_records(person_name, create_time, id);
+CREATE INDEX IF NOT EXISTS idx_appeal_id_card_summary ON appeal_records(id_card_number, handling_status, handling_department, create_time); 
\ No newline at end of file
@@ -0,0 +1,12 @@
+-- 受理单列表游标分页（keyset pagination）所需的复合索引
+-- 列表查询按 create_time DESC, id DESC 排序，游标条件为 (create_time, id) 小于上一页最后一条记录
+
+ALTER TABLE appeal_records
+    ADD INDEX idx_appeal_create_time (create_time, id),
+    ADD INDEX idx_appeal_id_card_time (id_card_number, create_time, id),
+    ADD INDEX idx_appeal_contact_time (contact_info, create_time, id);
+
+-- 新的复合索引以原单列索引为前缀，原索引不再需要
+ALTER TABLE appeal_records
+    DROP INDEX idx_appeal_id_card_number,
+    DROP INDEX idx_appeal_contact_info;
@@ -0,0 +1,5 @@
+-- 受理单摘要（/api/appeals/summary）聚合查询所需的覆盖索引
+-- 按身份证号定位后，GROUP BY handling_status, handling_department 及 MAX(create_time) 只需扫描该索引，不回表
+
+ALTER TABLE appeal_records
+    ADD INDEX idx_appeal_id_card_summary (id_card_number, handling_status, handling_department, create_time);
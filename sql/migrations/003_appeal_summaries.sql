@@ -0,0 +1,13 @@
+-- 受理单摘要表：按身份证号汇总受理单数量、最新受理时间、办理状态和部门统计
+-- /api/appeals/summary 改为按主键读取该表；新增受理单和修改办理状态时在同一事务中增量更新
+-- 执行后运行 python scripts/rebuild_appeal_summaries.py 回填已有数据
+
+CREATE TABLE IF NOT EXISTS appeal_summaries (
+    id_card_number VARCHAR(20) NOT NULL PRIMARY KEY COMMENT '身份证号',
+    person_name VARCHAR(50) DEFAULT NULL COMMENT '最新一条受理单的姓名',
+    appeal_count INT NOT NULL DEFAULT 0 COMMENT '受理单数量',
+    latest_time DATETIME DEFAULT NULL COMMENT '最新受理时间',
+    status_stats JSON NOT NULL COMMENT '办理状态 -> 数量',
+    department_stats JSON NOT NULL COMMENT '办理部门 -> 数量',
+    update_time DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) COMMENT='受理单摘要表';
@@ -0,0 +1,21 @@
+-- 案件编号唯一约束：插入时由唯一索引判断重复，不再预先查询；并发的相同请求也只有一条能写入
+-- 执行前先确认没有重复的案件编号（下面的查询应返回空结果），有重复时需先人工处理
+
+SELECT case_number, COUNT(*) AS count
+FROM appeal_records
+GROUP BY case_number
+HAVING COUNT(*) > 1;
+
+ALTER TABLE appeal_records
+    ADD UNIQUE KEY uk_appeal_case_number (case_number),
+    DROP INDEX idx_appeal_case_number;
+
+-- 幂等键表：保存带 Idempotency-Key 请求头的写请求的响应，重试时直接返回
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idempotency_key VARCHAR(128) NOT NULL PRIMARY KEY COMMENT '幂等键',
+    request_hash CHAR(64) NOT NULL COMMENT '请求方法、路径和请求体的SHA-256',
+    status_code INT NOT NULL COMMENT '响应状态码',
+    response_body MEDIUMTEXT NOT NULL COMMENT '响应内容',
+    create_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    INDEX idx_idempotency_create_time (create_time)
+) COMMENT='写请求幂等键表';
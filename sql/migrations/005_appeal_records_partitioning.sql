@@ -0,0 +1,56 @@
+-- appeal_records 按创建时间月份分区，并新增归档表
+-- 分区表的主键和唯一索引必须包含分区字段：主键改为 (id, create_time)，
+-- 案件编号的全局唯一改由 appeal_case_numbers 登记表保证（归档后的编号也保留在登记表中）
+-- ALTER TABLE 会重建整张表，请在业务低峰期执行；执行后运行
+--     python scripts/maintain_appeal_partitions.py
+-- 创建之后几个月的分区（p202610 保存2026年10月及更早的全部记录）
+
+CREATE TABLE IF NOT EXISTS appeal_case_numbers (
+    case_number VARCHAR(50) NOT NULL PRIMARY KEY COMMENT '受理编号',
+    create_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '登记时间'
+) COMMENT='受理单案件编号登记表';
+
+INSERT IGNORE INTO appeal_case_numbers (case_number, create_time)
+SELECT case_number, create_time FROM appeal_records;
+
+CREATE TABLE IF NOT EXISTS appeal_records_archive (
+    id INT NOT NULL PRIMARY KEY,
+    case_number VARCHAR(50) NOT NULL COMMENT '受理编号',
+    person_name VARCHAR(50) NOT NULL COMMENT '姓名',
+    contact_info VARCHAR(20) DEFAULT NULL COMMENT '联系方式',
+    gender VARCHAR(10) DEFAULT NULL COMMENT '性别',
+    id_card_number VARCHAR(20) DEFAULT NULL COMMENT '身份证号',
+    address VARCHAR(255) DEFAULT NULL COMMENT '地址',
+    incident_time VARCHAR(50) DEFAULT NULL COMMENT '事件时间',
+    incident_location VARCHAR(255) DEFAULT NULL COMMENT '事件地点',
+    incident_description TEXT COMMENT '事件描述',
+    people_involved VARCHAR(10) DEFAULT NULL COMMENT '涉及人数',
+    submitted_materials TEXT COMMENT '提交材料',
+    handling_department VARCHAR(50) DEFAULT NULL COMMENT '处理部门',
+    handling_status VARCHAR(20) DEFAULT NULL COMMENT '处理状态',
+    expected_completion VARCHAR(50) DEFAULT NULL COMMENT '预计完成时间',
+    create_time DATETIME NOT NULL COMMENT '创建时间',
+    qr_code VARCHAR(255) DEFAULT NULL COMMENT '二维码URL或数据',
+    markdown_doc TEXT COMMENT 'Markdown格式文档',
+    UNIQUE KEY uk_archive_case_number (case_number),
+    INDEX idx_archive_create_time (create_time, id),
+    INDEX idx_archive_id_card_time (id_card_number, create_time, id),
+    INDEX idx_archive_contact_time (contact_info, create_time, id)
+) COMMENT='历史受理单归档表';
+
+UPDATE appeal_records SET create_time = NOW() WHERE create_time IS NULL;
+
+ALTER TABLE appeal_records
+    MODIFY create_time DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, create_time),
+    DROP INDEX uk_appeal_case_number,
+    ADD INDEX idx_appeal_case_number (case_number);
+
+ALTER TABLE appeal_records
+PARTITION BY RANGE (TO_DAYS(create_time)) (
+    PARTITION p202610 VALUES LESS THAN (TO_DAYS('2026-11-01')),
+    -- 兜底分区：之后的记录在月份分区创建之前都写入 pmax，分区维护漏执行也不会写入失败；
+    -- scripts/maintain_appeal_partitions.py 用 REORGANIZE PARTITION 从 pmax 拆分出之后的月份分区
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
@@ -0,0 +1,8 @@
+-- 未指定类型的受理单搜索在一条查询中同时匹配身份证号、联系方式、案件编号和姓名，
+-- 姓名的精确匹配和前缀匹配需要以 person_name 开头的索引（同时支持按 create_time DESC, id DESC 排序）
+
+ALTER TABLE appeal_records
+    ADD INDEX idx_appeal_person_name_time (person_name, create_time, id);
+
+ALTER TABLE appeal_records_archive
+    ADD INDEX idx_archive_person_name_time (person_name, create_time, id);
@@ -0,0 +1,21 @@
+-- 受理单全文检索：在事件描述、事件地点、地址上建立 ngram 分词的 FULLTEXT 索引，
+-- 替代 LIKE '%关键词%' 的全表扫描。appeal_records 是分区表，InnoDB 分区表不支持 FULLTEXT 索引，
+-- 因此检索字段单独保存在未分区的 appeal_search_texts 中，按 (id, create_time) 与受理单关联。
+-- 只索引未归档的受理单，归档时同时删除对应的检索记录。
+-- ngram 分词的最小长度由服务端参数 ngram_token_size 决定（默认2），修改后需要重建索引。
+
+CREATE TABLE IF NOT EXISTS appeal_search_texts (
+    id INT NOT NULL PRIMARY KEY COMMENT '受理单ID',
+    create_time DATETIME NOT NULL COMMENT '受理单创建时间',
+    incident_description TEXT COMMENT '事件描述',
+    incident_location VARCHAR(255) DEFAULT NULL COMMENT '事件地点',
+    address VARCHAR(255) DEFAULT NULL COMMENT '地址',
+    INDEX idx_search_create_time (create_time)
+) COMMENT='受理单全文检索表';
+
+-- 先写入已有数据再建全文索引，比逐行维护索引快得多
+INSERT IGNORE INTO appeal_search_texts (id, create_time, incident_description, incident_location, address)
+SELECT id, create_time, incident_description, incident_location, address FROM appeal_records;
+
+ALTER TABLE appeal_search_texts
+    ADD FULLTEXT INDEX ft_appeal_search (incident_description, incident_location, address) WITH PARSER ngram;
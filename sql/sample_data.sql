@@ -53,4 +53,12 @@ VALUES
  '电梯维修费用分摊问题引发业主纠纷', '10', '业主群聊天记录', '矛盾调解中心', '已接收', '7个工作日内', 
  '2024-02-16 09:30:45',
  'https://example.com/qr/MTDJ-20250520-093045-567890.png',
- '# 受理单详情\n\n- **案件编号**: MTDJ-20250520-093045-567890\n- **申请人**: 赵六\n- **事件**: 电梯维修费用分摊问题'); 
\ No newline at end of file
+ '# 受理单详情\n\n- **案件编号**: MTDJ-20250520-093045-567890\n- **申请人**: 赵六\n- **事件**: 电梯维修费用分摊问题');
+
+-- 登记案件编号（案件编号的唯一性由登记表保证）
+INSERT INTO appeal_case_numbers (case_number, create_time)
+SELECT case_number, create_time FROM appeal_records;
+
+-- 写入全文检索表
+INSERT INTO appeal_search_texts (id, create_time, incident_description, incident_location, address)
+SELECT id, create_time, incident_description, incident_location, address FROM appeal_records;